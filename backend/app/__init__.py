@@ -7,6 +7,7 @@ from dotenv import load_dotenv
 from app.models import db, FormulaISO
 from app.views.routes import init_routes
 from app.utils.formulas import FORMULAS_DEFINICION
+from app.utils import json_rapido
 from config import config
 
 load_dotenv()
@@ -22,8 +23,18 @@ def create_app(config_name='development'):
     app = Flask(__name__)
     app.config.from_object(config[config_name])
     
+    # Respuestas y columnas JSON con orjson si está instalado
+    app.json = json_rapido.ProveedorJSON(app)
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = {
+        **app.config.get('SQLALCHEMY_ENGINE_OPTIONS', {}),
+        'json_serializer': json_rapido.dumps,
+        'json_deserializer': json_rapido.loads
+    }
+    logger.info(f"Serializador JSON: {json_rapido.BACKEND}")
+    
     db.init_app(app)
-    CORS(app)
+    # El cursor de la página siguiente de los listados viaja en cabeceras
+    CORS(app, expose_headers=['Link', 'X-Siguiente-Cursor'])
     
     with app.app_context():
         try:
@@ -91,7 +102,13 @@ def _init_formulas():
         db.session.rollback()
         raise
 
-app = create_app(os.environ.get('FLASK_ENV', 'development'))
+def __getattr__(name):
+    # La app se crea al primer acceso (``from app import app``) y no al importar
+    # el paquete, para poder usar app.utils sin conexión a la BD (benchmarks)
+    if name == 'app':
+        globals()['app'] = create_app(os.environ.get('FLASK_ENV', 'development'))
+        return globals()['app']
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 if __name__ == '__main__':
-    app.run(debug=True, host='0.0.0.0', port=5000)
+    create_app(os.environ.get('FLASK_ENV', 'development')).run(debug=True, host='0.0.0.0', port=5000)
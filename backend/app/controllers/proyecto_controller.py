@@ -1,23 +1,136 @@
-from flask import request, jsonify
-from ..models import db, Proyecto, MetricaBase, HistoricoCalculo
-from ..utils.github_analyzer import GitHubAnalyzer
+from flask import request, jsonify, Response, stream_with_context
+from ..models import (db, Proyecto, MetricaBase, HistoricoCalculo, TrabajoAnalisis, ChurnCommit, ChurnAcumulado,
+                      TendenciaMetrica)
+from ..utils.github_analyzer import GitHubAnalyzer, METRICAS_DISPONIBLES, METRICAS_POR_DEFECTO
+from ..utils.cache_metricas import CacheMetricas
+from ..utils.cache_clones import CacheClones, borrar_directorio
+from ..utils.escaner_fuentes import VERSION_ANALIZADOR
+from ..utils.bloqueo_proyecto import bloqueo_proyecto, ProyectoOcupado
+from ..utils.limites_analisis import LimitesAnalisis
+from ..utils.tendencia import MODOS_TENDENCIA
+from ..utils.instrumentacion import perfilar
+from ..utils import paginacion, serializacion
 from sqlalchemy import exc
+from sqlalchemy.orm import aliased, defer
+from datetime import datetime, timedelta
+from urllib.parse import urlencode
+import json
 import os
-import shutil
-import stat
+import time
 import logging
 
 logger = logging.getLogger(__name__)
 
+# Segundos entre consultas de estado mientras se transmite un lote
+INTERVALO_LOTE = 1.0
+# Claves por consulta IN al acumular churn por autor/archivo
+LOTE_CHURN = 500
+# Cálculos recientes incluidos en el detalle de un proyecto
+HISTORICO_DETALLE = 20
+
+def consulta_detalle(id, limite_historico):
+    """Filas (proyecto, última métrica, cálculo, total de cálculos) del detalle de
+    un proyecto en un solo SELECT: la métrica por idx_metricas_proyecto_fecha y
+    los limite+1 cálculos más recientes y el total por idx_historico_proyecto_fecha
+    (uno de más indica si hay otra página). Sin cálculos queda una fila con
+    cálculo None."""
+    total = db.select(db.func.count(HistoricoCalculo.id)).where(
+        HistoricoCalculo.proyecto_id == Proyecto.id
+    ).correlate(Proyecto).scalar_subquery()
+    ultima_metrica = db.select(MetricaBase.id).where(
+        MetricaBase.proyecto_id == Proyecto.id
+    ).order_by(MetricaBase.fecha_calculo.desc(), MetricaBase.id.desc()).limit(1).correlate(Proyecto).scalar_subquery()
+    recientes = db.select(HistoricoCalculo).where(
+        HistoricoCalculo.proyecto_id == id
+    ).order_by(HistoricoCalculo.fecha_calculo.desc(), HistoricoCalculo.id.desc()).limit(limite_historico + 1).subquery()
+    calculo = aliased(HistoricoCalculo, recientes)
+    return db.session.query(Proyecto, MetricaBase, calculo, total.label('historico_total')).outerjoin(
+        MetricaBase, MetricaBase.id == ultima_metrica
+    ).outerjoin(
+        calculo, calculo.proyecto_id == Proyecto.id
+    ).options(
+        # La métrica se repite en cada fila: sin las columnas grandes que to_dict no usa
+        defer(MetricaBase.series_commits), defer(MetricaBase.instrumentacion)
+    ).filter(Proyecto.id == id)
+
 class ProyectoController:
     
     def __init__(self, config):
         self.config = config
+        self.cola = None  # ColaTrabajos, asignada en init_routes
+        self.limites = LimitesAnalisis(config.get('CLONE_CONCURRENCIA', 4), config.get('SCAN_CONCURRENCIA', 1))
+        self._cache_metricas = None
+        self._cache_clones = None
+    
+    def _obtener_cache_metricas(self):
+        """Caché por blob compartida por todos los análisis (None si está desactivada)"""
+        if self._cache_metricas is None and self.config.get('METRICS_CACHE_PATH'):
+            try:
+                self._cache_metricas = CacheMetricas(
+                    self.config['METRICS_CACHE_PATH'],
+                    self.config.get('METRICS_CACHE_MAX_MB', 512) * 1024 * 1024,
+                    VERSION_ANALIZADOR
+                )
+            except Exception as e:
+                logger.warning(f"Caché de métricas no disponible: {e}")
+        return self._cache_metricas
+    
+    def _obtener_cache_clones(self):
+        """Índice LRU de los clones de REPOS_DIR (None si no se pudo abrir)"""
+        if self._cache_clones is None:
+            try:
+                self._cache_clones = CacheClones(
+                    self.config['REPOS_DIR'],
+                    self.config.get('REPOS_MAX_MB', 10240) * 1024 * 1024,
+                    self.config.get('REPOS_COMPACTAR', True)
+                )
+            except Exception as e:
+                logger.warning(f"Caché de clones no disponible: {e}")
+        return self._cache_clones
+    
+    def timeouts_fases(self):
+        """{fase del análisis: segundos} según la configuración (0 = sin límite)"""
+        return {
+            'clonando': self.config.get('TIMEOUT_CLONADO', 0),
+            'commits': self.config.get('TIMEOUT_COMMITS', 0),
+            'churn': self.config.get('TIMEOUT_CHURN', 0),
+            'tendencia': self.config.get('TIMEOUT_TENDENCIA', 0),
+            'escaneando': self.config.get('TIMEOUT_ESCANEO', 0)
+        }
+    
+    def cache(self):
+        """Aciertos, fallos y expulsiones de las cachés de clones y de métricas"""
+        cache_clones = self._obtener_cache_clones()
+        cache_metricas = self._obtener_cache_metricas()
+        return jsonify({
+            'clones': cache_clones.estadisticas() if cache_clones else None,
+            'metricas': cache_metricas.estadisticas() if cache_metricas else None
+        })
+    
+    def _listado(self, modelo, filtros, orden, descendente):
+        """Página de `modelo` según ?limit=&cursor=&fields=, transmitida como array JSON por
+        bloques (serializacion.flujo_json); el cursor de la siguiente va en X-Siguiente-Cursor y Link"""
+        try:
+            limite, cursor, campos = paginacion.leer_parametros(
+                request.args, modelo.CAMPOS, limite_maximo=paginacion.LIMITE_MAXIMO_FLUJO
+            )
+            condiciones, siguiente = paginacion.rango_pagina(filtros, orden, limite, cursor, descendente)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        consulta = serializacion.consulta(modelo, campos, condiciones, orden, descendente)
+        respuesta = Response(stream_with_context(serializacion.flujo_json(consulta, modelo, campos)),
+                             mimetype='application/json')
+        if siguiente:
+            argumentos = request.args.to_dict()
+            argumentos['cursor'] = siguiente
+            respuesta.headers['X-Siguiente-Cursor'] = siguiente
+            respuesta.headers['Link'] = f'<{request.base_url}?{urlencode(argumentos)}>; rel="next"'
+        return respuesta
     
     def listar(self):
+        """Proyectos por id, paginados: ?limit=N&cursor=...&fields=id,nombre,..."""
         try:
-            proyectos = Proyecto.query.all()
-            return jsonify([p.to_dict() for p in proyectos])
+            return self._listado(Proyecto, [], [Proyecto.id], descendente=False)
         except exc.OperationalError as e:
             logger.error(f"Error de conexión DB: {str(e)}")
             return jsonify({'error': 'Error temporal de conexión. Reintentar.'}), 503
@@ -26,16 +139,26 @@ class ProyectoController:
             return jsonify({'error': 'Error interno'}), 500
     
     def obtener(self, id):
+        """Proyecto, su última métrica y los cálculos más recientes (?historico=N, por
+        defecto HISTORICO_DETALLE) en una sola consulta. Si hay más cálculos,
+        historico_siguiente es el cursor para seguir en /historico; historico_total
+        es el número de cálculos del proyecto."""
         try:
-            proyecto = Proyecto.query.get_or_404(id)
+            try:
+                limite = int(request.args.get('historico', HISTORICO_DETALLE))
+            except ValueError:
+                return jsonify({'error': 'historico debe ser un entero'}), 400
+            if not 1 <= limite <= paginacion.LIMITE_MAXIMO:
+                return jsonify({'error': f'historico debe estar entre 1 y {paginacion.LIMITE_MAXIMO}'}), 400
+            
+            filas = consulta_detalle(id, limite).all()
+            if not filas:
+                return jsonify({'error': 'Proyecto no encontrado'}), 404
+            proyecto, metrica = filas[0][0], filas[0][1]
             data = proyecto.to_dict()
-            logger.info(f"Datos del proyecto: {data}")
             
-            # Obtener métricas
-            metrica = MetricaBase.query.filter_by(proyecto_id=id).first()
             if metrica:
                 data['metrica_base'] = metrica.to_dict()
-                logger.info(f"Métricas encontradas: {data['metrica_base']}")
             else:
                 # Retornar estructura vacía si no hay métricas
                 data['metrica_base'] = {
@@ -47,14 +170,21 @@ class ProyectoController:
                     'complejidad': 1.0,
                     'tiempo_promedio_commit': 0.0
                 }
-                logger.info(f"Sin métricas, usando valores por defecto: {data['metrica_base']}")
             
-            # Obtener histórico
-            historico = HistoricoCalculo.query.filter_by(proyecto_id=id).all()
+            # Las filas llegan sin orden (ordenar la tabla derivada costaría un sort en la BD)
+            historico = sorted((h for _, _, h, _ in filas if h is not None),
+                               key=lambda h: (h.fecha_calculo, h.id), reverse=True)
+            data['historico_siguiente'] = None
+            if len(historico) > limite:
+                historico = historico[:limite]
+                data['historico_siguiente'] = paginacion.codificar_cursor(
+                    [historico[-1].fecha_calculo, historico[-1].id])
             data['historico'] = [h.to_dict() for h in historico]
-            logger.info(f"Histórico cargado: {len(data['historico'])} registros")
+            data['historico_total'] = filas[0][3]
             
-            logger.info(f"Respuesta completa: {data}")
+            # Formatear la respuesta completa es caro: solo con el logger en DEBUG
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug(f"Respuesta completa: {data}")
             return jsonify(data)
         except exc.OperationalError as e:
             logger.error(f"Error de conexión DB: {str(e)}")
@@ -63,6 +193,49 @@ class ProyectoController:
             logger.error(f"Error obteniendo proyecto: {str(e)}")
             return jsonify({'error': 'Error interno'}), 500
     
+    def historico(self, id):
+        """Cálculos de fórmulas del proyecto, del más reciente al más antiguo, paginados
+        por (fecha_calculo, id): ?limit=N&cursor=...&fields=formula,resultado,..."""
+        try:
+            return self._listado(HistoricoCalculo, [HistoricoCalculo.proyecto_id == id],
+                                 [HistoricoCalculo.fecha_calculo, HistoricoCalculo.id], descendente=True)
+        except exc.OperationalError as e:
+            logger.error(f"Error de conexión DB: {str(e)}")
+            return jsonify({'error': 'Error temporal de conexión. Reintentar.'}), 503
+        except Exception as e:
+            logger.error(f"Error obteniendo histórico: {str(e)}")
+            return jsonify({'error': 'Error interno'}), 500
+    
+    def actividad(self, id):
+        """Histograma de commits del último análisis (?periodo=dia|semana|mes), sin tocar el repo"""
+        try:
+            periodo = request.args.get('periodo', 'semana')
+            if periodo not in ('dia', 'semana', 'mes'):
+                return jsonify({'error': 'periodo debe ser dia, semana o mes'}), 400
+            
+            if not db.session.get(Proyecto, id):
+                return jsonify({'error': 'Proyecto no encontrado'}), 404
+            metrica = MetricaBase.query.filter(
+                MetricaBase.proyecto_id == id, MetricaBase.series_commits.isnot(None)
+            ).order_by(MetricaBase.fecha_calculo.desc(), MetricaBase.id.desc()).first()
+            if not metrica:
+                return jsonify({'error': 'Sin histogramas: analizar el proyecto'}), 404
+            
+            serie = metrica.get_series_commits()[periodo]
+            return jsonify({
+                'proyecto_id': id,
+                'periodo': periodo,
+                'inicio': serie['inicio'],
+                'conteos': serie['conteos'],
+                'fecha_calculo': metrica.to_dict()['fecha_calculo']
+            })
+        except exc.OperationalError as e:
+            logger.error(f"Error de conexión DB: {str(e)}")
+            return jsonify({'error': 'Error temporal de conexión. Reintentar.'}), 503
+        except Exception as e:
+            logger.error(f"Error obteniendo actividad: {str(e)}")
+            return jsonify({'error': 'Error interno'}), 500
+    
     def crear(self):
         try:
             data = request.json
@@ -87,34 +260,281 @@ class ProyectoController:
             db.session.rollback()
             return jsonify({'error': 'Error interno'}), 500
     
+    def _leer_parametros(self, datos):
+        """Parámetros del trabajo: métricas pedidas (por defecto METRICAS_POR_DEFECTO;
+        'churn' y 'tendencia' hay que pedirlas) y opciones de la tendencia"""
+        metricas = datos.get('metricas') or list(METRICAS_POR_DEFECTO)
+        invalidas = [m for m in metricas if m not in METRICAS_DISPONIBLES]
+        if invalidas:
+            raise ValueError(f'Métricas no soportadas: {invalidas}')
+        parametros = {'metricas': metricas}
+        
+        if 'tendencia' in metricas:
+            opciones = datos.get('tendencia') or {}
+            modo = opciones.get('modo', 'commits')
+            cada = opciones.get('cada', 100)
+            if modo not in MODOS_TENDENCIA:
+                raise ValueError(f'Modo de tendencia no soportado: {modo}')
+            if not isinstance(cada, int) or cada < 1:
+                raise ValueError('tendencia.cada debe ser un entero positivo')
+            parametros['tendencia'] = {'modo': modo, 'cada': cada}
+        
+        # Muestreo estratificado: LOC y complejidad estimadas bajo un presupuesto
+        muestreo = datos.get('muestreo')
+        if muestreo:
+            opciones = muestreo if isinstance(muestreo, dict) else {}
+            max_archivos = opciones.get('max_archivos', self.config.get('MUESTREO_MAX_ARCHIVOS', 2000))
+            max_segundos = opciones.get('max_segundos', self.config.get('MUESTREO_MAX_SEGUNDOS', 30))
+            confianza = opciones.get('confianza', 0.95)
+            if not isinstance(max_archivos, int) or max_archivos < 1:
+                raise ValueError('muestreo.max_archivos debe ser un entero positivo')
+            if not isinstance(max_segundos, (int, float)) or max_segundos <= 0:
+                raise ValueError('muestreo.max_segundos debe ser positivo')
+            if not isinstance(confianza, (int, float)) or not 0 < confianza < 1:
+                raise ValueError('muestreo.confianza debe estar entre 0 y 1')
+            parametros['muestreo'] = {'max_archivos': max_archivos, 'max_segundos': max_segundos, 'confianza': confianza}
+        
+        # Volcado de cProfile de esta corrida (ANALISIS_PERFIL lo activa para todas)
+        perfil = datos.get('perfil', False)
+        if not isinstance(perfil, bool):
+            raise ValueError('perfil debe ser true o false')
+        if perfil:
+            parametros['perfil'] = True
+        return parametros
+    
+    def _encolar(self, proyecto_id, parametros):
+        """Encola el análisis; devuelve (trabajo, creado, conflicto).
+        
+        Single-flight: si ya hay un análisis activo del proyecto se comparte ese.
+        conflicto=True si el trabajo en curso no calcula todo lo pedido.
+        """
+        trabajo, creado = self.cola.encolar(proyecto_id, parametros)
+        conflicto = False
+        if not creado:
+            en_curso = trabajo.get_parametros()
+            metricas_en_curso = en_curso.get('metricas') or list(METRICAS_POR_DEFECTO)
+            conflicto = not set(parametros['metricas']) <= set(metricas_en_curso) or (
+                'tendencia' in parametros and parametros['tendencia'] != en_curso.get('tendencia')) or (
+                # Un análisis exacto sirve a quien pidió muestreo, pero no al revés
+                'muestreo' in en_curso and 'muestreo' not in parametros)
+        return trabajo, creado, conflicto
+    
     def analizar(self, id):
-        proyecto = None
+        """Encola el análisis y responde 202 con el trabajo; el estado se consulta en /api/jobs/<id>"""
         try:
+            try:
+                parametros = self._leer_parametros(request.get_json(silent=True) or {})
+            except ValueError as e:
+                return jsonify({'error': str(e)}), 400
+            
             proyecto = Proyecto.query.get_or_404(id)
+            trabajo, creado, conflicto = self._encolar(proyecto.id, parametros)
+            if conflicto:
+                return jsonify({
+                    'error': 'Ya hay un análisis en curso con otras métricas; reintentar al terminar',
+                    'trabajo': trabajo.to_dict()
+                }), 409
+            
+            respuesta = jsonify(dict(trabajo.to_dict(), coalescido=not creado))
+            respuesta.headers['Location'] = f"/api/jobs/{trabajo.id}"
+            return respuesta, 202
+        except exc.OperationalError as e:
+            logger.error(f"Error de conexión DB: {str(e)}")
+            db.session.rollback()
+            return jsonify({'error': 'Error temporal de conexión. Reintentar.'}), 503
+        except Exception as e:
+            logger.error(f"Error encolando análisis del proyecto {id}: {str(e)}")
+            db.session.rollback()
+            return jsonify({'error': f'Error en análisis: {str(e)}'}), 500
+    
+    def _ids_desactualizados(self):
+        """Proyectos sin análisis, con error o cuyo último análisis supera ANALISIS_VIGENCIA_HORAS"""
+        limite = datetime.now() - timedelta(hours=self.config.get('ANALISIS_VIGENCIA_HORAS', 24))
+        ultimo = db.session.query(
+            MetricaBase.proyecto_id, db.func.max(MetricaBase.fecha_calculo).label('fecha')
+        ).group_by(MetricaBase.proyecto_id).subquery()
+        filas = db.session.query(Proyecto.id).outerjoin(ultimo, ultimo.c.proyecto_id == Proyecto.id).filter(
+            db.or_(ultimo.c.fecha.is_(None), ultimo.c.fecha < limite, Proyecto.estado == 'error')
+        ).order_by(Proyecto.id)
+        return [id for (id,) in filas]
+    
+    def analizar_lote(self):
+        """Encola el análisis de varios proyectos y transmite cada resultado al terminar.
+        
+        Cuerpo: {"ids": [..]} o {"desactualizados": true}, y opcionalmente "metricas"
+        (y "tendencia", como en analizar).
+        Responde 200 con NDJSON: una línea 'encolados' con los trabajos y luego
+        una línea 'resultado' por proyecto en el orden en que van terminando.
+        Los clones y los escaneos se limitan por separado (CLONE_CONCURRENCIA,
+        SCAN_CONCURRENCIA); cortar la conexión no cancela los trabajos.
+        """
+        try:
+            datos = request.get_json(silent=True) or {}
+            try:
+                parametros = self._leer_parametros(datos)
+            except ValueError as e:
+                return jsonify({'error': str(e)}), 400
+            
+            if datos.get('desactualizados'):
+                ids = self._ids_desactualizados()
+            else:
+                ids = datos.get('ids')
+                if not isinstance(ids, list) or not all(isinstance(i, int) for i in ids):
+                    return jsonify({'error': 'Se requiere "ids" (lista de enteros) o "desactualizados": true'}), 400
+                ids = list(dict.fromkeys(ids))
+            
+            existentes = {id for (id,) in db.session.query(Proyecto.id).filter(Proyecto.id.in_(ids))} if ids else set()
+            trabajos = {}
+            rechazados = []
+            for id in ids:
+                if id not in existentes:
+                    rechazados.append({'evento': 'resultado', 'proyecto_id': id, 'estado': 'error',
+                                       'error': 'Proyecto no encontrado'})
+                    continue
+                trabajo, creado, conflicto = self._encolar(id, parametros)
+                if conflicto:
+                    rechazados.append({'evento': 'resultado', 'proyecto_id': id, 'estado': 'error',
+                                       'trabajo_id': trabajo.id,
+                                       'error': 'Ya hay un análisis en curso con otras métricas'})
+                    continue
+                trabajos[trabajo.id] = {'proyecto_id': id, 'coalescido': not creado}
+        except exc.OperationalError as e:
+            logger.error(f"Error de conexión DB: {str(e)}")
+            db.session.rollback()
+            return jsonify({'error': 'Error temporal de conexión. Reintentar.'}), 503
+        except Exception as e:
+            logger.error(f"Error encolando análisis en lote: {str(e)}")
+            db.session.rollback()
+            return jsonify({'error': f'Error en análisis: {str(e)}'}), 500
+        
+        logger.info(f"Análisis en lote: {len(trabajos)} encolados, {len(rechazados)} rechazados")
+        encolados = {
+            'evento': 'encolados',
+            'trabajos': [dict(info, trabajo_id=t) for t, info in trabajos.items()]
+        }
+        return Response(
+            stream_with_context(self._seguir_lote(trabajos, [encolados] + rechazados)),
+            mimetype='application/x-ndjson'
+        )
+    
+    def _seguir_lote(self, trabajos, iniciales):
+        """Genera las líneas NDJSON del lote consultando los trabajos hasta que terminan"""
+        for linea in iniciales:
+            yield json.dumps(linea) + '\n'
+        pendientes = dict(trabajos)
+        while pendientes:
+            # Cerrar la transacción para ver lo que escriben los hilos de la cola
+            db.session.commit()
+            terminados = TrabajoAnalisis.query.filter(
+                TrabajoAnalisis.id.in_(list(pendientes)),
+                TrabajoAnalisis.estado.in_(('completado', 'error'))
+            ).all()
+            for trabajo in terminados:
+                info = pendientes.pop(trabajo.id)
+                linea = dict(trabajo.to_dict(), evento='resultado', trabajo_id=trabajo.id,
+                             coalescido=info['coalescido'])
+                yield json.dumps(linea) + '\n'
+            if pendientes:
+                time.sleep(INTERVALO_LOTE)
+    
+    def ejecutar_analisis(self, trabajo, reportar, control=None):
+        """Ejecuta un trabajo de la cola (hilo del pool, con app context) y devuelve su resumen.
+        
+        control: ControlAnalisis del trabajo (plazos por fase y cancelación).
+        """
+        proyecto = db.session.get(Proyecto, trabajo.proyecto_id)
+        if proyecto is None:
+            raise ValueError(f'Proyecto {trabajo.proyecto_id} no existe')
+        parametros = trabajo.get_parametros()
+        metricas = parametros.get('metricas') or list(METRICAS_POR_DEFECTO)
+        
+        try:
             proyecto.estado = 'procesando'
             db.session.commit()
             
             repos_dir = self.config['REPOS_DIR']
             proyecto_dir = os.path.join(repos_dir, str(proyecto.id))
             
-            analyzer = GitHubAnalyzer(proyecto.url_github, self.config.get('GITHUB_TOKEN'))
-            resultado = analyzer.analyze(proyecto_dir)
+            analyzer = GitHubAnalyzer(
+                proyecto.url_github,
+                self.config.get('GITHUB_TOKEN'),
+                mirror=self.config.get('REPOS_MIRROR', True),
+                blobless=self.config.get('CLONE_BLOBLESS', True),
+                procesos=self.config.get('SCAN_PROCESOS', 1),
+                cache=self._obtener_cache_metricas(),
+                max_bytes=self.config.get('SCAN_MAX_BYTES', 2 * 1024 * 1024),
+                reportar=reportar,
+                limites=self.limites,
+                backend_commits=self.config.get('COMMITS_BACKEND', 'git'),
+                control=control,
+                recursos_escaneo={
+                    'memoria_bytes': self.config.get('SCAN_MAX_MEMORIA_MB', 0) * 1024 * 1024,
+                    'cpu_segundos': self.config.get('SCAN_MAX_CPU_SEGUNDOS', 0)
+                }
+            )
+            cache_clones = self._obtener_cache_clones()
+            # Un solo análisis a la vez sobre REPOS_DIR/<id>, aunque venga de otro proceso
+            with bloqueo_proyecto(repos_dir, proyecto.id):
+                if cache_clones:
+                    cache_clones.usar(proyecto.id)
+                tendencia = None
+                if 'tendencia' in metricas:
+                    # Las revisiones con punto ya guardado no se vuelven a medir
+                    excluir = [sha for (sha,) in db.session.query(TendenciaMetrica.sha).filter_by(proyecto_id=proyecto.id)]
+                    tendencia = dict(parametros.get('tendencia') or {}, excluir=excluir)
+                ruta_perfil = None
+                if parametros.get('perfil') or self.config.get('ANALISIS_PERFIL', False):
+                    ruta_perfil = os.path.join(self.config.get('ANALISIS_PERFIL_DIR') or os.path.join(repos_dir, 'perfiles'),
+                                               f'proyecto{proyecto.id}_trabajo{trabajo.id}.prof')
+                with perfilar(ruta_perfil):
+                    resultado = analyzer.analyze(proyecto_dir, metricas, churn_desde=proyecto.churn_sha,
+                                                 tendencia=tendencia, muestreo=parametros.get('muestreo'))
+                if cache_clones:
+                    cache_clones.registrar(proyecto.id)
+            if cache_clones:
+                # Proyectos en curso o en cola (incluido este) no se expulsan
+                activos = {pid for (pid,) in db.session.query(TrabajoAnalisis.proyecto_activo).filter(
+                    TrabajoAnalisis.proyecto_activo.isnot(None))}
+                liberados = cache_clones.expulsar(protegidos=activos)
+                if any(liberados.values()):
+                    logger.info(f"Caché de clones: {liberados['compactados']} compactados, "
+                                f"{liberados['expulsados']} expulsados")
+            reportar('guardando', 95)
+            inicio_guardado = time.perf_counter()
             
             if resultado['commits']:
                 proyecto.total_commits = resultado['commits']['commits_totales']
                 # Actualizar fechas del repositorio si están disponibles
                 if resultado['commits'].get('fecha_creacion_repo'):
-                    from datetime import datetime
                     proyecto.fecha_creacion = datetime.strptime(resultado['commits']['fecha_creacion_repo'], '%Y-%m-%d %H:%M:%S')
                 if resultado['commits'].get('fecha_ultima_modificacion'):
-                    from datetime import datetime
                     proyecto.fecha_actualizacion = datetime.strptime(resultado['commits']['fecha_ultima_modificacion'], '%Y-%m-%d %H:%M:%S')
             
             if resultado['loc']:
                 proyecto.total_loc = resultado['loc']['total_lineas']
             
-            proyecto.complejidad_ciclomatica = resultado['complejidad_ciclomatica']
+            # Las métricas no calculadas en esta corrida conservan su último valor
+            if resultado['complejidad_ciclomatica'] is not None:
+                proyecto.complejidad_ciclomatica = resultado['complejidad_ciclomatica']
+            if resultado.get('head_sha'):
+                proyecto.ultimo_sha = resultado['head_sha']
+            if resultado.get('churn'):
+                self._guardar_churn(proyecto, resultado['churn'])
+                proyecto.churn_sha = resultado['head_sha']
+            if resultado.get('tendencia'):
+                db.session.bulk_insert_mappings(TendenciaMetrica, [{
+                    'proyecto_id': proyecto.id,
+                    'sha': punto['sha'],
+                    'etiqueta': punto['etiqueta'][:255] if punto['etiqueta'] else None,
+                    'fecha': datetime.fromtimestamp(punto['timestamp']),
+                    'total_loc': punto['total_loc'],
+                    'complejidad_ciclomatica': punto['complejidad_ciclomatica'],
+                    'archivos': punto['archivos']
+                } for punto in resultado['tendencia']['puntos']])
+                for sha, etiqueta in resultado['tendencia'].get('etiquetas', {}).items():
+                    TendenciaMetrica.query.filter_by(proyecto_id=proyecto.id, sha=sha).update({'etiqueta': etiqueta[:255]})
             proyecto.estado = 'analizado'
+            proyecto.error_analisis = None
             db.session.commit()
             
             metrica = MetricaBase(
@@ -122,34 +542,178 @@ class ProyectoController:
                 commits_totales=resultado['commits']['commits_totales'] if resultado['commits'] else 0,
                 commits_mes=resultado['commits'].get('commits_mes', 0) if resultado['commits'] else 0,
                 commits_semana=resultado['commits'].get('commits_semana', 0) if resultado['commits'] else 0,
-                lineas_codigo=resultado['loc']['total_lineas'] if resultado['loc'] else 0,
-                complejidad=resultado['complejidad_ciclomatica'],
+                lineas_codigo=resultado['loc']['total_lineas'] if resultado['loc'] else proyecto.total_loc,
+                complejidad=proyecto.complejidad_ciclomatica,
                 tiempo_promedio_commit=resultado['commits'].get('tiempo_promedio', 0) if resultado['commits'] else 0
             )
             
+            # El muestreo no desglosa comentarios: en ese caso queda el valor por defecto
+            if resultado['loc'] and 'lineas_comentarios' in resultado['loc']:
+                metrica.lineas_comentarios = resultado['loc']['lineas_comentarios']
+            
+            # Las cifras de LOC/complejidad de un muestreo quedan marcadas como estimación
+            instrumentacion = resultado.get('instrumentacion')
+            if instrumentacion:
+                instrumentacion['fases']['guardando'] = round(time.perf_counter() - inicio_guardado, 3)
+                instrumentacion['total_segundos'] = round(sum(instrumentacion['fases'].values()), 3)
+                instrumentacion['perfil'] = ruta_perfil
+                metrica.set_instrumentacion(instrumentacion)
+            if resultado.get('estimacion'):
+                metrica.es_estimacion = True
+                metrica.set_estimacion(resultado['estimacion'])
+            
             # Guardar últimos commits
             if resultado['commits'] and resultado['commits'].get('ultimos_commits'):
                 metrica.set_ultimos_commits(resultado['commits']['ultimos_commits'])
+            if resultado['commits']:
+                metrica.set_series_commits(resultado['commits'].get('series'))
             
             db.session.add(metrica)
             db.session.commit()
             
-            return jsonify({'mensaje': 'Análisis completado exitosamente', 'proyecto': proyecto.to_dict()}), 200
+            return {
+                'mensaje': 'Análisis completado exitosamente',
+                'proyecto': proyecto.to_dict(),
+                'funciones_complejas': resultado.get('funciones_complejas', []),
+                'archivos_omitidos': resultado['loc'].get('omitidos', {}) if resultado['loc'] else {},
+                'churn_commits_procesados': len(resultado['churn']['commits']) if resultado.get('churn') else None,
+                'tendencia_puntos_nuevos': len(resultado['tendencia']['puntos']) if resultado.get('tendencia') else None,
+                'estimacion': resultado.get('estimacion'),
+                'instrumentacion': instrumentacion
+            }
+        except Exception as e:
+            db.session.rollback()
+            # El motivo (cancelación, plazo, límite de recursos o error) queda en el proyecto
+            proyecto.estado = 'error'
+            proyecto.error_analisis = str(e)
+            db.session.commit()
+            raise
+    
+    def _guardar_churn(self, proyecto, churn):
+        """Inserta el churn por commit y suma los totales por autor/archivo (en la sesión, sin commit)"""
+        if not churn['incremental']:
+            ChurnCommit.query.filter_by(proyecto_id=proyecto.id).delete()
+            ChurnAcumulado.query.filter_by(proyecto_id=proyecto.id).delete()
+        
+        db.session.bulk_insert_mappings(ChurnCommit, [{
+            'proyecto_id': proyecto.id,
+            'sha': sha,
+            'autor': autor[:255],
+            'fecha': datetime.fromtimestamp(timestamp),
+            'lineas_agregadas': agregadas,
+            'lineas_eliminadas': eliminadas,
+            'archivos': archivos
+        } for sha, timestamp, autor, agregadas, eliminadas, archivos in churn['commits']])
+        
+        for dimension, totales in (('autor', churn['autores']), ('archivo', churn['archivos'])):
+            # Claves recortadas al largo de la columna; dos rutas con el mismo prefijo se suman
+            recortados = {}
+            for clave, (commits, agregadas, eliminadas) in totales.items():
+                acumulado = recortados.setdefault(clave[:512], [0, 0, 0])
+                acumulado[0] += commits
+                acumulado[1] += agregadas
+                acumulado[2] += eliminadas
+            
+            claves = list(recortados)
+            nuevas = set(claves)
+            for i in range(0, len(claves), LOTE_CHURN):
+                for fila in ChurnAcumulado.query.filter(
+                        ChurnAcumulado.proyecto_id == proyecto.id,
+                        ChurnAcumulado.dimension == dimension,
+                        ChurnAcumulado.clave.in_(claves[i:i + LOTE_CHURN])):
+                    commits, agregadas, eliminadas = recortados[fila.clave]
+                    fila.commits += commits
+                    fila.lineas_agregadas += agregadas
+                    fila.lineas_eliminadas += eliminadas
+                    nuevas.discard(fila.clave)
+            db.session.bulk_insert_mappings(ChurnAcumulado, [{
+                'proyecto_id': proyecto.id,
+                'dimension': dimension,
+                'clave': clave,
+                'commits': recortados[clave][0],
+                'lineas_agregadas': recortados[clave][1],
+                'lineas_eliminadas': recortados[clave][2]
+            } for clave in nuevas])
+    
+    def churn(self, id):
+        """Churn guardado: ?dimension=autor|archivo|commit&limite=N (los de mayor churn o los commits más recientes)"""
+        try:
+            dimension = request.args.get('dimension', 'autor')
+            if dimension not in ('autor', 'archivo', 'commit'):
+                return jsonify({'error': 'dimension debe ser autor, archivo o commit'}), 400
+            limite = min(request.args.get('limite', 50, type=int), 1000)
+            
+            proyecto = db.session.get(Proyecto, id)
+            if not proyecto:
+                return jsonify({'error': 'Proyecto no encontrado'}), 404
+            
+            commits, agregadas, eliminadas = db.session.query(
+                db.func.count(ChurnCommit.id),
+                db.func.coalesce(db.func.sum(ChurnCommit.lineas_agregadas), 0),
+                db.func.coalesce(db.func.sum(ChurnCommit.lineas_eliminadas), 0)
+            ).filter(ChurnCommit.proyecto_id == id).one()
             
+            if dimension == 'commit':
+                filas = ChurnCommit.query.filter_by(proyecto_id=id).order_by(
+                    ChurnCommit.fecha.desc(), ChurnCommit.id.desc()).limit(limite)
+            else:
+                filas = ChurnAcumulado.query.filter_by(proyecto_id=id, dimension=dimension).order_by(
+                    (ChurnAcumulado.lineas_agregadas + ChurnAcumulado.lineas_eliminadas).desc()).limit(limite)
+            
+            return jsonify({
+                'proyecto_id': id,
+                'churn_sha': proyecto.churn_sha,
+                'totales': {
+                    'commits': commits,
+                    'lineas_agregadas': int(agregadas),
+                    'lineas_eliminadas': int(eliminadas)
+                },
+                'dimension': dimension,
+                'items': [f.to_dict() for f in filas]
+            })
         except exc.OperationalError as e:
-            logger.error(f"Error de conexión DB en análisis: {str(e)}")
-            db.session.rollback()
-            if proyecto:
-                proyecto.estado = 'error'
-                db.session.commit()
+            logger.error(f"Error de conexión DB: {str(e)}")
             return jsonify({'error': 'Error temporal de conexión. Reintentar.'}), 503
         except Exception as e:
-            logger.error(f"Error analizando proyecto {id}: {str(e)}")
-            db.session.rollback()
-            if proyecto:
-                proyecto.estado = 'error'
-                db.session.commit()
-            return jsonify({'error': f'Error en análisis: {str(e)}'}), 500
+            logger.error(f"Error obteniendo churn: {str(e)}")
+            return jsonify({'error': 'Error interno'}), 500
+    
+    def tendencia(self, id):
+        """Serie histórica de LOC y complejidad por revisión muestreada, de la más antigua a la más reciente"""
+        try:
+            if not db.session.get(Proyecto, id):
+                return jsonify({'error': 'Proyecto no encontrado'}), 404
+            puntos = TendenciaMetrica.query.filter_by(proyecto_id=id).order_by(
+                TendenciaMetrica.fecha, TendenciaMetrica.id).all()
+            return jsonify({'proyecto_id': id, 'puntos': [p.to_dict() for p in puntos]})
+        except exc.OperationalError as e:
+            logger.error(f"Error de conexión DB: {str(e)}")
+            return jsonify({'error': 'Error temporal de conexión. Reintentar.'}), 503
+        except Exception as e:
+            logger.error(f"Error obteniendo tendencia: {str(e)}")
+            return jsonify({'error': 'Error interno'}), 500
+    
+    def instrumentacion(self, id):
+        """Duración por fase, volumen procesado y memoria pico de los últimos análisis (?limite=, máx. 100)"""
+        try:
+            if not db.session.get(Proyecto, id):
+                return jsonify({'error': 'Proyecto no encontrado'}), 404
+            limite = min(max(request.args.get('limite', 20, type=int), 1), 100)
+            metricas = MetricaBase.query.filter(
+                MetricaBase.proyecto_id == id,
+                MetricaBase.instrumentacion.isnot(None)
+            ).order_by(MetricaBase.fecha_calculo.desc(), MetricaBase.id.desc()).limit(limite).all()
+            corridas = [dict(m.get_instrumentacion(),
+                             metrica_id=m.id,
+                             es_estimacion=bool(m.es_estimacion),
+                             fecha_calculo=m.to_dict()['fecha_calculo']) for m in metricas]
+            return jsonify({'proyecto_id': id, 'corridas': corridas})
+        except exc.OperationalError as e:
+            logger.error(f"Error de conexión DB: {str(e)}")
+            return jsonify({'error': 'Error temporal de conexión. Reintentar.'}), 503
+        except Exception as e:
+            logger.error(f"Error obteniendo instrumentación: {str(e)}")
+            return jsonify({'error': 'Error interno'}), 500
     
     def eliminar(self, id):
         try:
@@ -157,36 +721,26 @@ class ProyectoController:
             repos_dir = self.config['REPOS_DIR']
             proyecto_dir = os.path.join(repos_dir, str(proyecto.id))
             
-            # Intentar eliminar el directorio del proyecto
-            if os.path.exists(proyecto_dir):
-                try:
-                    # En Windows, a veces los archivos Git quedan bloqueados
-                    # Intenta cambiar permisos y luego eliminar
-                    import stat
-                    for root, dirs, files in os.walk(proyecto_dir, topdown=False):
-                        for file in files:
-                            filepath = os.path.join(root, file)
-                            try:
-                                os.chmod(filepath, stat.S_IWRITE)
-                                os.remove(filepath)
-                            except Exception as e:
-                                logger.warning(f"No se pudo eliminar {filepath}: {e}")
-                        for dir in dirs:
-                            dirpath = os.path.join(root, dir)
-                            try:
-                                os.chmod(dirpath, stat.S_IWRITE)
-                                os.rmdir(dirpath)
-                            except Exception as e:
-                                logger.warning(f"No se pudo eliminar dir {dirpath}: {e}")
-                    os.rmdir(proyecto_dir)
-                except Exception as e:
-                    logger.warning(f"Limpieza parcial de {proyecto_dir}: {e}")
-            
-            # Eliminar del BD aunque no se haya limpiado completamente
-            db.session.delete(proyecto)
-            db.session.commit()
+            # No borrar el clon mientras un análisis lo está usando o está en cola
+            with bloqueo_proyecto(repos_dir, proyecto.id, esperar=False):
+                if TrabajoAnalisis.query.filter_by(proyecto_activo=proyecto.id).first():
+                    raise ProyectoOcupado(proyecto.id)
+                # Intentar eliminar el directorio del proyecto
+                if os.path.exists(proyecto_dir):
+                    fallidos = borrar_directorio(proyecto_dir)
+                    if fallidos:
+                        logger.warning(f"Limpieza parcial de {proyecto_dir}: {fallidos} entradas sin borrar")
+                cache_clones = self._obtener_cache_clones()
+                if cache_clones:
+                    cache_clones.olvidar(proyecto.id)
+            
+                # Eliminar del BD aunque no se haya limpiado completamente
+                db.session.delete(proyecto)
+                db.session.commit()
             
             return jsonify({'mensaje': 'Proyecto eliminado'}), 200
+        except ProyectoOcupado:
+            return jsonify({'error': 'Hay un análisis en curso para este proyecto. Reintentar al terminar.'}), 409
         except exc.OperationalError as e:
             logger.error(f"Error de conexión DB: {str(e)}")
             db.session.rollback()
@@ -6,7 +6,6 @@ from reportlab.lib.units import inch
 from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer, PageBreak
 from reportlab.lib import colors
 from datetime import datetime
-import json
 from app.models import db, Proyecto, HistoricoCalculo, FormulaISO, ReferenciaNorma
 
 FORMULAS_NOMBRES = {
@@ -138,7 +137,7 @@ def generar_reporte_pdf(proyecto_id):
                 interpretacion_texto = 'N/A'
                 if calculo.interpretacion_json:
                     try:
-                        interp = json.loads(calculo.interpretacion_json) if isinstance(calculo.interpretacion_json, str) else calculo.interpretacion_json
+                        interp = calculo.get_interpretacion()
                         nivel = interp.get('nivel', 'desconocido').lower()
                         interpretacion_texto = get_interpretacion_texto(nivel)
                     except:
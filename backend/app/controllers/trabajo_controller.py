@@ -0,0 +1,48 @@
+from flask import jsonify
+from ..models import db, TrabajoAnalisis
+from sqlalchemy import exc
+import logging
+
+logger = logging.getLogger(__name__)
+
+class TrabajoController:
+    
+    def __init__(self, cola):
+        self.cola = cola
+    
+    def obtener(self, id):
+        """Estado, fase y progreso de un trabajo de análisis"""
+        try:
+            trabajo = db.session.get(TrabajoAnalisis, id)
+            if not trabajo:
+                return jsonify({'error': 'Trabajo no encontrado'}), 404
+            return jsonify(trabajo.to_dict())
+        except exc.OperationalError as e:
+            logger.error(f"Error de conexión DB: {str(e)}")
+            return jsonify({'error': 'Error temporal de conexión. Reintentar.'}), 503
+        except Exception as e:
+            logger.error(f"Error obteniendo trabajo: {str(e)}")
+            return jsonify({'error': 'Error interno'}), 500
+    
+    def cancelar(self, id):
+        """Cancela un análisis pendiente o en ejecución; termina en estado 'error' con el motivo"""
+        try:
+            trabajo = db.session.get(TrabajoAnalisis, id)
+            if not trabajo:
+                return jsonify({'error': 'Trabajo no encontrado'}), 404
+            resultado = self.cola.cancelar(id)
+            if resultado is None:
+                return jsonify({'error': 'El trabajo ya terminó'}), 409
+            db.session.refresh(trabajo)
+            logger.info(f"Trabajo {id}: {resultado}")
+            # 'cancelando': el proceso que lo ejecuta se detiene al leer la solicitud
+            # (al instante si es este, en su próximo latido si es otro); consultar GET /api/jobs/<id>
+            return jsonify(trabajo.to_dict()), 200 if resultado == 'cancelado' else 202
+        except exc.OperationalError as e:
+            logger.error(f"Error de conexión DB: {str(e)}")
+            db.session.rollback()
+            return jsonify({'error': 'Error temporal de conexión. Reintentar.'}), 503
+        except Exception as e:
+            logger.error(f"Error cancelando trabajo: {str(e)}")
+            db.session.rollback()
+            return jsonify({'error': 'Error interno'}), 500
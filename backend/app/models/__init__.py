@@ -17,28 +17,49 @@ class Proyecto(db.Model):
     total_commits = db.Column(db.Integer, default=0)
     total_loc = db.Column(db.Integer, default=0)
     complejidad_ciclomatica = db.Column(db.Float, default=0.0)
+    ultimo_sha = db.Column(db.String(40))  # Último commit analizado
+    churn_sha = db.Column(db.String(40))  # Último commit con churn guardado
+    error_analisis = db.Column(db.Text)  # Motivo del último análisis fallido, cancelado o vencido
     
     metricas = db.relationship('MetricaBase', backref='proyecto', lazy=True, cascade='all, delete-orphan')
     historico = db.relationship('HistoricoCalculo', backref='proyecto', lazy=True, cascade='all, delete-orphan')
+    trabajos = db.relationship('TrabajoAnalisis', backref='proyecto', lazy=True, cascade='all, delete-orphan')
+    churn_commits = db.relationship('ChurnCommit', backref='proyecto', lazy=True, cascade='all, delete-orphan')
+    churn_acumulado = db.relationship('ChurnAcumulado', backref='proyecto', lazy=True, cascade='all, delete-orphan')
+    tendencia = db.relationship('TendenciaMetrica', backref='proyecto', lazy=True, cascade='all, delete-orphan')
     
-    def to_dict(self):
+    # Campo de to_dict -> columnas que lee (?fields= carga solo esas)
+    CAMPOS = {campo: (campo,) for campo in (
+        'id', 'nombre', 'url_github', 'fecha_creacion', 'fecha_actualizacion', 'estado',
+        'total_commits', 'total_loc', 'complejidad_ciclomatica', 'ultimo_sha', 'error_analisis'
+    )}
+    # Campos que to_dict transforma; los listados (serializacion.flujo_json) hacen lo mismo por columnas
+    FORMATOS = {'fecha_creacion': 'fecha', 'fecha_actualizacion': 'fecha', 'complejidad_ciclomatica': 'redondeo'}
+    
+    def to_dict(self, campos=None):
+        """campos: claves a incluir (None = todas); las demás columnas no se leen"""
         # Formatear fechas como strings legibles
-        fecha_creacion = self.fecha_creacion.strftime('%Y-%m-%d %H:%M:%S') if self.fecha_creacion else None
-        fecha_actualizacion = self.fecha_actualizacion.strftime('%Y-%m-%d %H:%M:%S') if self.fecha_actualizacion else None
-        return {
-            'id': self.id,
-            'nombre': self.nombre,
-            'url_github': self.url_github,
-            'fecha_creacion': fecha_creacion,
-            'fecha_actualizacion': fecha_actualizacion,
-            'estado': self.estado,
-            'total_commits': self.total_commits,
-            'total_loc': self.total_loc,
-            'complejidad_ciclomatica': round(self.complejidad_ciclomatica, 2) if self.complejidad_ciclomatica else 0
+        valores = {
+            'id': lambda: self.id,
+            'nombre': lambda: self.nombre,
+            'url_github': lambda: self.url_github,
+            'fecha_creacion': lambda: self.fecha_creacion.strftime('%Y-%m-%d %H:%M:%S') if self.fecha_creacion else None,
+            'fecha_actualizacion': lambda: self.fecha_actualizacion.strftime('%Y-%m-%d %H:%M:%S') if self.fecha_actualizacion else None,
+            'estado': lambda: self.estado,
+            'total_commits': lambda: self.total_commits,
+            'total_loc': lambda: self.total_loc,
+            'complejidad_ciclomatica': lambda: round(self.complejidad_ciclomatica, 2) if self.complejidad_ciclomatica else 0,
+            'ultimo_sha': lambda: self.ultimo_sha,
+            'error_analisis': lambda: self.error_analisis
         }
+        return {campo: valores[campo]() for campo in (campos or valores)}
 
 class MetricaBase(db.Model):
     __tablename__ = 'metricas_base'
+    __table_args__ = (
+        # Última métrica de un proyecto y sus listados por fecha (el id desempata)
+        db.Index('idx_metricas_proyecto_fecha', 'proyecto_id', 'fecha_calculo', 'id'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     proyecto_id = db.Column(db.Integer, db.ForeignKey('proyectos.id'), nullable=False)
@@ -52,19 +73,47 @@ class MetricaBase(db.Model):
     complejidad = db.Column(db.Float, default=0.0)
     
     tiempo_promedio_commit = db.Column(db.Float, default=0.0)
-    ultimos_commits = db.Column(db.Text, default='[]')  # Almacenar como JSON string
+    ultimos_commits = db.Column(db.JSON(none_as_null=True), default=list)
+    series_commits = db.Column(db.Text(16777215))  # JSON: histogramas de commits por día/semana/mes
+    es_estimacion = db.Column(db.Boolean, default=False)  # LOC/complejidad estimadas por muestreo
+    estimacion = db.Column(db.Text)  # JSON: intervalos de confianza, tamaño de muestra
+    instrumentacion = db.Column(db.Text)  # JSON: segundos por fase, archivos/bytes/commits, memoria pico
     
     fecha_calculo = db.Column(db.DateTime, server_default=db.func.now())
     
     def set_ultimos_commits(self, commits_list):
-        """Almacena la lista de últimos commits como JSON"""
-        self.ultimos_commits = json.dumps(commits_list)
+        """Almacena la lista de últimos commits (columna JSON)"""
+        self.ultimos_commits = commits_list
     
     def get_ultimos_commits(self):
-        """Recupera la lista de últimos commits desde JSON"""
-        if self.ultimos_commits:
-            return json.loads(self.ultimos_commits)
-        return []
+        """Lista de últimos commits; la columna JSON ya llega decodificada"""
+        return self.ultimos_commits or []
+    
+    def set_estimacion(self, estimacion):
+        self.estimacion = json.dumps(estimacion)
+    
+    def get_estimacion(self):
+        if self.estimacion:
+            return json.loads(self.estimacion)
+        return None
+    
+    def set_instrumentacion(self, instrumentacion):
+        self.instrumentacion = json.dumps(instrumentacion)
+    
+    def get_instrumentacion(self):
+        if self.instrumentacion:
+            return json.loads(self.instrumentacion)
+        return None
+    
+    def set_series_commits(self, series):
+        """Almacena los histogramas de actividad como JSON compacto"""
+        self.series_commits = json.dumps(series, separators=(',', ':')) if series else None
+    
+    def get_series_commits(self):
+        """Recupera los histogramas {dia, semana, mes} o None si no se calcularon"""
+        if self.series_commits:
+            return json.loads(self.series_commits)
+        return None
     
     def to_dict(self):
         # Formatear fecha como string legible
@@ -80,48 +129,202 @@ class MetricaBase(db.Model):
             'complejidad': round(self.complejidad, 2) if self.complejidad else 0,
             'tiempo_promedio_commit': round(self.tiempo_promedio_commit, 2) if self.tiempo_promedio_commit else 0,
             'ultimos_commits': self.get_ultimos_commits(),
+            'es_estimacion': bool(self.es_estimacion),
+            'estimacion': self.get_estimacion(),
             'fecha_calculo': fecha_calculo
         }
 
 class HistoricoCalculo(db.Model):
     __tablename__ = 'historico_calculos'
+    __table_args__ = (
+        # Histórico de un proyecto ordenado por fecha, sin recorrer la tabla ni ordenar aparte
+        db.Index('idx_historico_proyecto_fecha', 'proyecto_id', 'fecha_calculo', 'id'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     proyecto_id = db.Column(db.Integer, db.ForeignKey('proyectos.id'), nullable=False)
     
     formula = db.Column(db.String(50), nullable=False)
-    datos_entrada = db.Column(db.Text)
+    # Columnas JSON: se decodifican una vez al leer la fila, no en cada to_dict
+    datos_entrada = db.Column(db.JSON(none_as_null=True))
     resultado = db.Column(db.Float)
-    interpretacion_json = db.Column(db.Text)
+    interpretacion_json = db.Column(db.JSON(none_as_null=True))
     fecha_calculo = db.Column(db.DateTime, server_default=db.func.now())
     
     def set_datos_entrada(self, datos):
-        self.datos_entrada = json.dumps(datos)
+        self.datos_entrada = datos
     
     def get_datos_entrada(self):
-        if self.datos_entrada:
-            return json.loads(self.datos_entrada)
-        return {}
+        return self.datos_entrada or {}
     
     def set_interpretacion(self, interp):
-        self.interpretacion_json = json.dumps(interp)
+        self.interpretacion_json = interp
     
     def get_interpretacion(self):
-        if self.interpretacion_json:
-            return json.loads(self.interpretacion_json)
+        return self.interpretacion_json or {}
+    
+    # Campo de to_dict -> columnas que lee (?fields= carga solo esas)
+    CAMPOS = {
+        'id': ('id',),
+        'proyecto_id': ('proyecto_id',),
+        'formula': ('formula',),
+        'datos_entrada': ('datos_entrada',),
+        'resultado': ('resultado',),
+        'interpretacion': ('interpretacion_json',),
+        'fecha_calculo': ('fecha_calculo',)
+    }
+    FORMATOS = {'datos_entrada': 'json', 'interpretacion': 'json', 'fecha_calculo': 'fecha'}
+    
+    def to_dict(self, campos=None):
+        """campos: claves a incluir (None = todas); las demás columnas no se leen"""
+        # Formatear fecha como string legible
+        valores = {
+            'id': lambda: self.id,
+            'proyecto_id': lambda: self.proyecto_id,
+            'formula': lambda: self.formula,
+            'datos_entrada': self.get_datos_entrada,
+            'resultado': lambda: self.resultado,
+            'interpretacion': self.get_interpretacion,
+            'fecha_calculo': lambda: self.fecha_calculo.strftime('%Y-%m-%d %H:%M:%S') if self.fecha_calculo else None
+        }
+        return {campo: valores[campo]() for campo in (campos or valores)}
+
+class TrabajoAnalisis(db.Model):
+    """Análisis de repositorio encolado; la tabla es la cola (sobrevive a reinicios)"""
+    __tablename__ = 'trabajos_analisis'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    proyecto_id = db.Column(db.Integer, db.ForeignKey('proyectos.id'), nullable=False)
+    # Igual a proyecto_id mientras el trabajo está pendiente o ejecutando y NULL al
+    # terminar: el índice único garantiza un solo análisis activo por proyecto
+    proyecto_activo = db.Column(db.Integer, unique=True)
+    
+    estado = db.Column(db.String(20), nullable=False, default='pendiente')  # pendiente, ejecutando, completado, error
+    fase = db.Column(db.String(50), default='en_cola')
+    progreso = db.Column(db.Integer, default=0)  # 0-100
+    parametros = db.Column(db.Text)  # JSON: métricas solicitadas
+    resultado = db.Column(db.Text)  # JSON: resumen del análisis
+    error = db.Column(db.Text)
+    # Proceso que ejecuta el trabajo ('host:pid') y su último latido: otro proceso
+    # solo lo reclama cuando el latido venció (ANALISIS_LEASE_SEGUNDOS)
+    propietario = db.Column(db.String(100))
+    latido = db.Column(db.DateTime)
+    # Cancelación pedida desde cualquier proceso; el propietario la lee en su latido
+    cancelacion_solicitada = db.Column(db.Boolean, nullable=False, default=False, server_default=db.false())
+    
+    fecha_creacion = db.Column(db.DateTime, server_default=db.func.now())
+    fecha_inicio = db.Column(db.DateTime)
+    fecha_fin = db.Column(db.DateTime)
+    
+    def set_parametros(self, params):
+        self.parametros = json.dumps(params)
+    
+    def get_parametros(self):
+        if self.parametros:
+            return json.loads(self.parametros)
         return {}
     
+    def set_resultado(self, resultado):
+        self.resultado = json.dumps(resultado)
+    
+    def get_resultado(self):
+        if self.resultado:
+            return json.loads(self.resultado)
+        return None
+    
     def to_dict(self):
-        # Formatear fecha como string legible
-        fecha_calculo = self.fecha_calculo.strftime('%Y-%m-%d %H:%M:%S') if self.fecha_calculo else None
+        formato = '%Y-%m-%d %H:%M:%S'
         return {
             'id': self.id,
             'proyecto_id': self.proyecto_id,
-            'formula': self.formula,
-            'datos_entrada': self.get_datos_entrada(),
-            'resultado': self.resultado,
-            'interpretacion': self.get_interpretacion(),
-            'fecha_calculo': fecha_calculo
+            'estado': self.estado,
+            'fase': self.fase,
+            'progreso': self.progreso,
+            'parametros': self.get_parametros(),
+            'resultado': self.get_resultado(),
+            'error': self.error,
+            'cancelacion_solicitada': bool(self.cancelacion_solicitada),
+            'fecha_creacion': self.fecha_creacion.strftime(formato) if self.fecha_creacion else None,
+            'fecha_inicio': self.fecha_inicio.strftime(formato) if self.fecha_inicio else None,
+            'fecha_fin': self.fecha_fin.strftime(formato) if self.fecha_fin else None
+        }
+
+class ChurnCommit(db.Model):
+    """Líneas agregadas/eliminadas de un commit (sin merges)"""
+    __tablename__ = 'churn_commits'
+    __table_args__ = (
+        db.UniqueConstraint('proyecto_id', 'sha', name='uq_churn_commits_proyecto_sha'),
+        db.Index('idx_churn_commits_proyecto_fecha', 'proyecto_id', 'fecha'),
+    )
+    
+    id = db.Column(db.Integer, primary_key=True)
+    proyecto_id = db.Column(db.Integer, db.ForeignKey('proyectos.id'), nullable=False)
+    sha = db.Column(db.String(40), nullable=False)
+    autor = db.Column(db.String(255))
+    fecha = db.Column(db.DateTime)
+    lineas_agregadas = db.Column(db.Integer, default=0)
+    lineas_eliminadas = db.Column(db.Integer, default=0)
+    archivos = db.Column(db.Integer, default=0)
+    
+    def to_dict(self):
+        return {
+            'sha': self.sha,
+            'autor': self.autor,
+            'fecha': self.fecha.strftime('%Y-%m-%d %H:%M:%S') if self.fecha else None,
+            'lineas_agregadas': self.lineas_agregadas,
+            'lineas_eliminadas': self.lineas_eliminadas,
+            'archivos': self.archivos
+        }
+
+class ChurnAcumulado(db.Model):
+    """Churn total por autor o por archivo; se incrementa en cada re-análisis"""
+    __tablename__ = 'churn_acumulado'
+    __table_args__ = (
+        db.UniqueConstraint('proyecto_id', 'dimension', 'clave', name='uq_churn_acumulado_clave'),
+    )
+    
+    id = db.Column(db.Integer, primary_key=True)
+    proyecto_id = db.Column(db.Integer, db.ForeignKey('proyectos.id'), nullable=False)
+    dimension = db.Column(db.String(20), nullable=False)  # autor, archivo
+    clave = db.Column(db.String(512), nullable=False)  # nombre del autor o ruta del archivo
+    commits = db.Column(db.Integer, default=0)
+    lineas_agregadas = db.Column(db.Integer, default=0)
+    lineas_eliminadas = db.Column(db.Integer, default=0)
+    
+    def to_dict(self):
+        return {
+            'dimension': self.dimension,
+            'clave': self.clave,
+            'commits': self.commits,
+            'lineas_agregadas': self.lineas_agregadas,
+            'lineas_eliminadas': self.lineas_eliminadas
+        }
+
+class TendenciaMetrica(db.Model):
+    """LOC y complejidad de una revisión histórica muestreada (cada N commits o cada tag)"""
+    __tablename__ = 'tendencia_metricas'
+    __table_args__ = (
+        db.UniqueConstraint('proyecto_id', 'sha', name='uq_tendencia_proyecto_sha'),
+        db.Index('idx_tendencia_proyecto_fecha', 'proyecto_id', 'fecha'),
+    )
+    
+    id = db.Column(db.Integer, primary_key=True)
+    proyecto_id = db.Column(db.Integer, db.ForeignKey('proyectos.id'), nullable=False)
+    sha = db.Column(db.String(40), nullable=False)
+    etiqueta = db.Column(db.String(255))  # Tag(s) de la revisión, si se muestreó por tags
+    fecha = db.Column(db.DateTime)  # Fecha del commit
+    total_loc = db.Column(db.Integer, default=0)
+    complejidad_ciclomatica = db.Column(db.Float, default=0.0)
+    archivos = db.Column(db.Integer, default=0)
+    
+    def to_dict(self):
+        return {
+            'sha': self.sha,
+            'etiqueta': self.etiqueta,
+            'fecha': self.fecha.strftime('%Y-%m-%d %H:%M:%S') if self.fecha else None,
+            'total_loc': self.total_loc,
+            'complejidad_ciclomatica': round(self.complejidad_ciclomatica, 2) if self.complejidad_ciclomatica else 0,
+            'archivos': self.archivos
         }
 
 class FormulaISO(db.Model):
@@ -161,6 +364,10 @@ class FormulaISO(db.Model):
 class ReferenciaNorma(db.Model):
     """Tabla de referencia con parámetros buenos, malos y aceptables por fórmula"""
     __tablename__ = 'referencias_normas'
+    __table_args__ = (
+        # Se busca por código en cada cálculo de fórmula
+        db.Index('idx_referencias_codigo_formula', 'codigo_formula'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     codigo_formula = db.Column(db.String(50), nullable=False)
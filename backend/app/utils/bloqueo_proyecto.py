@@ -0,0 +1,60 @@
+"""Bloqueo exclusivo por proyecto sobre su directorio en REPOS_DIR"""
+
+import os
+import threading
+from contextlib import contextmanager
+
+if os.name == 'nt':
+    import msvcrt
+else:
+    import fcntl
+
+_bloqueos_hilos = {}
+_registro = threading.Lock()
+
+class ProyectoOcupado(Exception):
+    """El directorio del proyecto está siendo usado por otro análisis"""
+
+def _bloqueo_hilo(clave):
+    with _registro:
+        return _bloqueos_hilos.setdefault(clave, threading.Lock())
+
+def _bloquear_archivo(f, esperar):
+    if os.name == 'nt':
+        modo = msvcrt.LK_LOCK if esperar else msvcrt.LK_NBLCK
+        msvcrt.locking(f.fileno(), modo, 1)
+    else:
+        fcntl.flock(f.fileno(), fcntl.LOCK_EX | (0 if esperar else fcntl.LOCK_NB))
+
+def _liberar_archivo(f):
+    if os.name == 'nt':
+        f.seek(0)
+        msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+    else:
+        fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+
+@contextmanager
+def bloqueo_proyecto(repos_dir, proyecto_id, esperar=True):
+    """Impide que dos análisis (o un análisis y un borrado) usen a la vez REPOS_DIR/<id>.
+
+    Combina un Lock por proyecto (hilos del mismo proceso) con un bloqueo de
+    archivo en REPOS_DIR/<id>.lock (otros procesos). Con esperar=False lanza
+    ProyectoOcupado en lugar de bloquearse.
+    """
+    clave = (os.path.abspath(repos_dir), proyecto_id)
+    bloqueo = _bloqueo_hilo(clave)
+    if not bloqueo.acquire(blocking=esperar):
+        raise ProyectoOcupado(proyecto_id)
+    try:
+        os.makedirs(repos_dir, exist_ok=True)
+        with open(os.path.join(repos_dir, f'{proyecto_id}.lock'), 'a+') as f:
+            try:
+                _bloquear_archivo(f, esperar)
+            except OSError:
+                raise ProyectoOcupado(proyecto_id)
+            try:
+                yield
+            finally:
+                _liberar_archivo(f)
+    finally:
+        bloqueo.release()
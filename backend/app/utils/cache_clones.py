@@ -0,0 +1,248 @@
+"""
+Caché de clones en REPOS_DIR con presupuesto de disco y expulsión LRU.
+
+Cada proyecto tiene su clon en REPOS_DIR/<id>. Un índice SQLite en el mismo
+directorio guarda el tamaño y el último uso de cada clon. Cuando el total
+supera el presupuesto, primero se compactan los clones menos usados (se borra
+el working tree y se conserva .git, que el siguiente fetch + reset --hard
+restaura sin volver a descargar) y, si no alcanza, se borran clones enteros.
+"""
+
+import os
+import sqlite3
+import stat
+import time
+from contextlib import contextmanager
+
+from .bloqueo_proyecto import bloqueo_proyecto, ProyectoOcupado
+
+ARCHIVO_INDICE = '.cache_clones.sqlite'
+
+def tamano_directorio(ruta, excluir=None):
+    """Bytes ocupados en disco por un árbol de archivos (sin seguir enlaces).
+
+    excluir: nombre de una entrada del primer nivel que no se cuenta (p. ej. '.git').
+    """
+    total = 0
+    pendientes = [ruta]
+    while pendientes:
+        actual = pendientes.pop()
+        try:
+            entradas = list(os.scandir(actual))
+        except OSError:
+            continue
+        for entrada in entradas:
+            if actual == ruta and entrada.name == excluir:
+                continue
+            try:
+                if entrada.is_dir(follow_symlinks=False):
+                    pendientes.append(entrada.path)
+                else:
+                    info = entrada.stat(follow_symlinks=False)
+                    # st_blocks refleja el espacio real (archivos dispersos, bloques parciales)
+                    bloques = getattr(info, 'st_blocks', None)
+                    total += bloques * 512 if bloques is not None else info.st_size
+            except OSError:
+                continue
+    return total
+
+def borrar_directorio(ruta, conservar=None):
+    """Borra el contenido de `ruta` (y la carpeta, si no se conserva nada).
+
+    En Windows los objetos de Git quedan de solo lectura: se cambian permisos
+    antes de borrar. Devuelve la cantidad de entradas que no se pudieron borrar.
+    """
+    fallidos = 0
+    for root, dirs, files in os.walk(ruta, topdown=False):
+        if conservar and os.path.relpath(root, ruta).split(os.sep)[0] == conservar:
+            continue
+        for nombre in files:
+            archivo = os.path.join(root, nombre)
+            if root == ruta and nombre == conservar:
+                continue
+            try:
+                os.chmod(archivo, stat.S_IWRITE)
+                os.remove(archivo)
+            except OSError:
+                fallidos += 1
+        for nombre in dirs:
+            if root == ruta and nombre == conservar:
+                continue
+            try:
+                os.chmod(os.path.join(root, nombre), stat.S_IWRITE)
+                os.rmdir(os.path.join(root, nombre))
+            except OSError:
+                fallidos += 1
+    if not conservar:
+        try:
+            os.rmdir(ruta)
+        except OSError:
+            fallidos += 1
+    return fallidos
+
+class CacheClones:
+    """Índice de uso de los clones de REPOS_DIR y expulsión por presupuesto"""
+
+    def __init__(self, repos_dir, max_bytes, compactar=True):
+        self.repos_dir = repos_dir
+        # 0 = sin límite (solo se registran usos y tamaños)
+        self.max_bytes = max_bytes
+        self.compactar = compactar
+        self.aciertos = 0
+        self.fallos = 0
+        self.expulsados = 0
+        self.compactados = 0
+        os.makedirs(repos_dir, exist_ok=True)
+        self.ruta = os.path.join(repos_dir, ARCHIVO_INDICE)
+        with self._conectar() as conn:
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS clones (
+                    proyecto_id INTEGER PRIMARY KEY,
+                    tamano INTEGER NOT NULL,
+                    tamano_arbol INTEGER NOT NULL,
+                    ultimo_uso REAL NOT NULL
+                )
+            """)
+
+    @contextmanager
+    def _conectar(self):
+        # Una conexión por operación: los análisis corren en varios hilos
+        conn = sqlite3.connect(self.ruta, timeout=30)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def _directorio(self, proyecto_id):
+        return os.path.join(self.repos_dir, str(proyecto_id))
+
+    def _medir(self, proyecto_id):
+        """(tamaño total, tamaño del working tree); lo segundo es lo que libera compactar"""
+        directorio = self._directorio(proyecto_id)
+        tamano = tamano_directorio(directorio)
+        if not os.path.isdir(os.path.join(directorio, '.git')):
+            return tamano, 0  # clon bare: no hay working tree
+        return tamano, tamano_directorio(directorio, excluir='.git')
+
+    def usar(self, proyecto_id):
+        """Registra un acierto si el clon existe en disco (se reutiliza con fetch) o un fallo"""
+        directorio = self._directorio(proyecto_id)
+        existe = os.path.isdir(os.path.join(directorio, '.git')) or os.path.isfile(os.path.join(directorio, 'HEAD'))
+        if existe:
+            self.aciertos += 1
+        else:
+            self.fallos += 1
+        return existe
+
+    def registrar(self, proyecto_id):
+        """Mide el clon tras un análisis y lo marca como el más recientemente usado"""
+        if not os.path.isdir(self._directorio(proyecto_id)):
+            self.olvidar(proyecto_id)
+            return
+        tamano, tamano_arbol = self._medir(proyecto_id)
+        with self._conectar() as conn:
+            conn.execute(
+                'INSERT OR REPLACE INTO clones (proyecto_id, tamano, tamano_arbol, ultimo_uso) VALUES (?, ?, ?, ?)',
+                (proyecto_id, tamano, tamano_arbol, time.time())
+            )
+
+    def olvidar(self, proyecto_id):
+        with self._conectar() as conn:
+            conn.execute('DELETE FROM clones WHERE proyecto_id = ?', (proyecto_id,))
+
+    def _sincronizar(self, conn):
+        """Alinea el índice con el disco: descarta clones borrados a mano y adopta
+        los que no están registrados (p. ej. de antes de existir el índice)"""
+        registrados = {pid for (pid,) in conn.execute('SELECT proyecto_id FROM clones')}
+        en_disco = set()
+        # Solo carpetas con id numérico: los *.lock y las cachés SQLite no son clones
+        for entrada in os.scandir(self.repos_dir):
+            if entrada.is_dir(follow_symlinks=False) and entrada.name.isdigit():
+                en_disco.add(int(entrada.name))
+        conn.executemany('DELETE FROM clones WHERE proyecto_id = ?', [(pid,) for pid in registrados - en_disco])
+        for proyecto_id in en_disco - registrados:
+            tamano, tamano_arbol = self._medir(proyecto_id)
+            conn.execute(
+                'INSERT INTO clones (proyecto_id, tamano, tamano_arbol, ultimo_uso) VALUES (?, ?, ?, ?)',
+                (proyecto_id, tamano, tamano_arbol, os.path.getmtime(self._directorio(proyecto_id)))
+            )
+
+    def expulsar(self, protegidos=()):
+        """Libera disco hasta quedar bajo max_bytes, del clon menos usado al más usado.
+
+        protegidos: ids que no se tocan (análisis en curso o en cola). Los clones
+        ocupados por otro proceso también se saltan. Devuelve {'compactados', 'expulsados'}.
+        """
+        liberados = {'compactados': 0, 'expulsados': 0}
+        if not self.max_bytes:
+            return liberados
+        with self._conectar() as conn:
+            self._sincronizar(conn)
+            total = conn.execute('SELECT COALESCE(SUM(tamano), 0) FROM clones').fetchone()[0]
+            if total <= self.max_bytes:
+                return liberados
+            candidatos = [
+                fila for fila in conn.execute('SELECT proyecto_id, tamano, tamano_arbol FROM clones ORDER BY ultimo_uso')
+                if fila[0] not in protegidos
+            ]
+        # Liberar hasta el 90% del presupuesto para no expulsar tras cada análisis
+        sobrante = total - int(self.max_bytes * 0.9)
+
+        # 1) Compactar: se pierde solo el checkout, el historial sigue local
+        if self.compactar:
+            for i, (proyecto_id, tamano, tamano_arbol) in enumerate(candidatos):
+                if sobrante <= 0:
+                    break
+                if tamano_arbol <= 0 or not self._liberar(proyecto_id, conservar='.git'):
+                    continue
+                sobrante -= tamano_arbol
+                candidatos[i] = (proyecto_id, tamano - tamano_arbol, 0)
+                liberados['compactados'] += 1
+
+        # 2) Expulsar clones completos (el próximo análisis vuelve a clonar)
+        for proyecto_id, tamano, _ in candidatos:
+            if sobrante <= 0:
+                break
+            if self._liberar(proyecto_id):
+                sobrante -= tamano
+                liberados['expulsados'] += 1
+
+        self.compactados += liberados['compactados']
+        self.expulsados += liberados['expulsados']
+        return liberados
+
+    def _liberar(self, proyecto_id, conservar=None):
+        """Compacta (conservar='.git') o borra un clon bajo su bloqueo de proyecto"""
+        directorio = self._directorio(proyecto_id)
+        try:
+            with bloqueo_proyecto(self.repos_dir, proyecto_id, esperar=False):
+                borrar_directorio(directorio, conservar)
+                if conservar:
+                    # Conserva su último uso: compactar no cuenta como usarlo
+                    with self._conectar() as conn:
+                        conn.execute(
+                            'UPDATE clones SET tamano = tamano - tamano_arbol, tamano_arbol = 0 WHERE proyecto_id = ?',
+                            (proyecto_id,)
+                        )
+                    print(f"Clon compactado (sin working tree): {directorio}")
+                else:
+                    self.olvidar(proyecto_id)
+                    print(f"Clon expulsado de la caché: {directorio}")
+            return True
+        except ProyectoOcupado:
+            return False
+
+    def estadisticas(self):
+        with self._conectar() as conn:
+            clones, total = conn.execute('SELECT COUNT(*), COALESCE(SUM(tamano), 0) FROM clones').fetchone()
+        return {
+            'aciertos': self.aciertos,
+            'fallos': self.fallos,
+            'expulsados': self.expulsados,
+            'compactados': self.compactados,
+            'clones': clones,
+            'bytes': total,
+            'max_bytes': self.max_bytes
+        }
@@ -0,0 +1,134 @@
+"""
+Caché persistente de métricas por archivo, direccionada por contenido.
+
+La clave es (blob SHA de git, extensión, versión del analizador): un archivo
+con el mismo contenido produce las mismas métricas en cualquier proyecto, así
+que los archivos sin cambios (o vendorizados en varios repos) no se vuelven a
+leer. Se guarda en SQLite y se limita por tamaño con expulsión LRU.
+"""
+
+import json
+import os
+import sqlite3
+import time
+from contextlib import contextmanager
+
+from .escaner_tokens import OMITIDO_TAMANO
+
+# Límite de variables por sentencia en SQLite antiguos
+TAMANO_LOTE = 500
+
+class CacheMetricas:
+    """Caché blob -> métricas compartida entre proyectos y procesos"""
+
+    def __init__(self, ruta, max_bytes, version):
+        self.ruta = ruta
+        self.max_bytes = max_bytes
+        self.version = version
+        self.aciertos = 0
+        self.fallos = 0
+        self.expulsados = 0
+        directorio = os.path.dirname(os.path.abspath(ruta))
+        os.makedirs(directorio, exist_ok=True)
+        with self._conectar() as conn:
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS metricas_archivo (
+                    blob TEXT NOT NULL,
+                    extension TEXT NOT NULL,
+                    version TEXT NOT NULL,
+                    metricas TEXT NOT NULL,
+                    tamano INTEGER NOT NULL,
+                    ultimo_uso REAL NOT NULL,
+                    PRIMARY KEY (blob, extension, version)
+                )
+            """)
+            conn.execute('CREATE INDEX IF NOT EXISTS idx_metricas_archivo_uso ON metricas_archivo (ultimo_uso)')
+
+    @contextmanager
+    def _conectar(self):
+        # Una conexión por operación: el analizador puede correr en varios hilos
+        conn = sqlite3.connect(self.ruta, timeout=30)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def obtener(self, claves):
+        """claves: iterable de (blob, extension). Devuelve {(blob, extension): metricas}"""
+        encontrados = {}
+        claves = list(claves)
+        ahora = time.time()
+        with self._conectar() as conn:
+            for i in range(0, len(claves), TAMANO_LOTE):
+                lote = claves[i:i + TAMANO_LOTE]
+                blobs = list({blob for blob, _ in lote})
+                marcas = ','.join('?' * len(blobs))
+                filas = conn.execute(
+                    f'SELECT blob, extension, metricas FROM metricas_archivo '
+                    f'WHERE version = ? AND blob IN ({marcas})',
+                    [self.version] + blobs
+                ).fetchall()
+                pedidas = set(lote)
+                usados = []
+                for blob, extension, metricas in filas:
+                    if (blob, extension) in pedidas:
+                        encontrados[(blob, extension)] = json.loads(metricas)
+                        usados.append((ahora, blob, extension, self.version))
+                conn.executemany(
+                    'UPDATE metricas_archivo SET ultimo_uso = ? WHERE blob = ? AND extension = ? AND version = ?',
+                    usados
+                )
+        self.aciertos += len(encontrados)
+        self.fallos += len(claves) - len(encontrados)
+        return encontrados
+
+    def guardar(self, entradas):
+        """entradas: {(blob, extension): metricas}; las omisiones por tamaño no se guardan"""
+        if not entradas:
+            return
+        ahora = time.time()
+        filas = []
+        for (blob, extension), metricas in entradas.items():
+            if metricas.get('omitido') == OMITIDO_TAMANO:
+                # Depende de SCAN_MAX_BYTES, no del contenido: no sobreviviría a un cambio del límite
+                continue
+            texto = json.dumps(metricas, separators=(',', ':'))
+            filas.append((blob, extension, self.version, texto, len(texto), ahora))
+        with self._conectar() as conn:
+            conn.executemany(
+                'INSERT OR REPLACE INTO metricas_archivo '
+                '(blob, extension, version, metricas, tamano, ultimo_uso) VALUES (?, ?, ?, ?, ?, ?)',
+                filas
+            )
+        self.expulsar()
+
+    def expulsar(self):
+        """Elimina las entradas menos usadas hasta quedar bajo max_bytes.
+
+        Primero se descartan las entradas de versiones anteriores del analizador.
+        """
+        with self._conectar() as conn:
+            conn.execute('DELETE FROM metricas_archivo WHERE version != ?', (self.version,))
+            total = conn.execute('SELECT COALESCE(SUM(tamano), 0) FROM metricas_archivo').fetchone()[0]
+            if total <= self.max_bytes:
+                return 0
+            # Liberar hasta el 90% del presupuesto para no expulsar en cada escritura
+            sobrante = total - int(self.max_bytes * 0.9)
+            victimas = []
+            for blob, extension, tamano in conn.execute(
+                    'SELECT blob, extension, tamano FROM metricas_archivo ORDER BY ultimo_uso'):
+                victimas.append((blob, extension, self.version))
+                sobrante -= tamano
+                if sobrante <= 0:
+                    break
+            conn.executemany(
+                'DELETE FROM metricas_archivo WHERE blob = ? AND extension = ? AND version = ?',
+                victimas
+            )
+        self.expulsados += len(victimas)
+        return len(victimas)
+
+    def estadisticas(self):
+        return {'aciertos': self.aciertos, 'fallos': self.fallos, 'expulsados': self.expulsados}
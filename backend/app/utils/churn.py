@@ -0,0 +1,64 @@
+"""Churn de código (líneas agregadas/eliminadas) a partir de `git log --numstat` en streaming"""
+
+# Cabecera de cada commit en el log: NUL + sha NUL timestamp NUL autor
+FORMATO_LOG = '--format=%x00%H%x00%ct%x00%an'
+
+class AgregadorChurn:
+    """Acumula el churn por commit, por autor y por archivo línea a línea.
+
+    Del log solo se conserva el resumen de cada commit; las líneas de numstat
+    se suman y se descartan. Los merges no traen numstat (git log no los
+    difea por defecto), así que no duplican el churn de sus ramas.
+    """
+
+    def __init__(self):
+        # (sha, timestamp, autor, agregadas, eliminadas, archivos) en el orden del log
+        self.commits = []
+        self.autores = {}   # autor -> [commits, agregadas, eliminadas]
+        self.archivos = {}  # ruta -> [commits, agregadas, eliminadas]
+        self._actual = None
+
+    def procesar(self, lineas):
+        """lineas: iterable de bytes (stdout de git log --numstat con FORMATO_LOG)"""
+        for linea in lineas:
+            linea = linea.rstrip(b'\n')
+            if linea.startswith(b'\0'):
+                self._cerrar_commit()
+                sha, timestamp, autor = linea[1:].split(b'\0', 2)
+                self._actual = [sha.decode(), int(timestamp), autor.decode('utf-8', 'replace') or 'Unknown', 0, 0, 0]
+            elif linea and self._actual is not None:
+                agregadas, eliminadas, ruta = linea.split(b'\t', 2)
+                # Archivos binarios: '-\t-\truta'
+                agregadas = int(agregadas) if agregadas != b'-' else 0
+                eliminadas = int(eliminadas) if eliminadas != b'-' else 0
+                self._actual[3] += agregadas
+                self._actual[4] += eliminadas
+                self._actual[5] += 1
+                archivo = self.archivos.setdefault(ruta.decode('utf-8', 'replace'), [0, 0, 0])
+                archivo[0] += 1
+                archivo[1] += agregadas
+                archivo[2] += eliminadas
+        self._cerrar_commit()
+
+    def _cerrar_commit(self):
+        if self._actual is None:
+            return
+        _, _, autor, agregadas, eliminadas, _ = self._actual
+        self.commits.append(tuple(self._actual))
+        acumulado = self.autores.setdefault(autor, [0, 0, 0])
+        acumulado[0] += 1
+        acumulado[1] += agregadas
+        acumulado[2] += eliminadas
+        self._actual = None
+
+    def resultado(self, desde_sha, incremental):
+        """desde_sha: commit desde el que se procesó; incremental=False reemplaza lo guardado"""
+        return {
+            'desde_sha': desde_sha,
+            'incremental': incremental,
+            'commits': self.commits,
+            'autores': self.autores,
+            'archivos': self.archivos,
+            'lineas_agregadas': sum(c[3] for c in self.commits),
+            'lineas_eliminadas': sum(c[4] for c in self.commits)
+        }
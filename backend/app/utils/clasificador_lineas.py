@@ -0,0 +1,150 @@
+"""
+Clasificación de líneas en código, comentario y blanco, línea a línea y sin
+releer el archivo: el escáner la alimenta con el mismo texto que usa para LOC
+y complejidad.
+
+Criterio (el de cloc): una línea con código y comentario cuenta como código;
+una línea vacía dentro de un comentario de bloque cuenta como blanco. En
+Python los docstrings (cadenas triples que empiezan una sentencia) cuentan
+como comentario.
+"""
+
+import re
+
+CODIGO = 'codigo'
+COMENTARIO = 'comentario'
+BLANCO = 'blanco'
+
+# Cadenas de una línea (con escapes); sin cierre, la cadena llega al final de la línea
+_CADENAS = {
+    '"': re.compile(r'"(?:[^"\\]|\\.)*"'),
+    "'": re.compile(r"'(?:[^'\\]|\\.)*'"),
+    '`': re.compile(r'`(?:[^`\\]|\\.)*`'),
+}
+
+# Familia C: // y /* */; las comillas invertidas (plantillas de JS/TS, raw strings de Go) pueden abarcar líneas
+_PATRON_C = re.compile(r'//|/\*|["\'`]')
+_FIN_BLOQUE_C = re.compile(r'\*/')
+_FIN_MULTILINEA_C = {'`': re.compile(r'(?:[^`\\]|\\.)*`')}
+
+# Python: # y cadenas triples; el prefijo (r, b, u, f) de una cadena no cuenta como código antes de ella
+_PATRON_PY = re.compile(r'#|(?<![\w])[rRbBuUfF]{0,2}(?:"""|\'\'\'|["\'])')
+_FIN_TRIPLE = {
+    '"""': re.compile(r'(?:[^"\\]|\\.|"(?!""))*"""'),
+    "'''": re.compile(r"(?:[^'\\]|\\.|'(?!''))*'''"),
+}
+
+class ClasificadorLineas:
+    """Cuenta líneas de código, comentario y blanco de un archivo.
+
+    linea() recibe las líneas en orden (sin el salto final) y conserva el
+    estado entre ellas: comentario de bloque o cadena abierta.
+    """
+
+    def __init__(self, extension):
+        self.python = extension == '.py'
+        self.conteos = {CODIGO: 0, COMENTARIO: 0, BLANCO: 0}
+        # None, 'bloque' (/* */), '`' o ('"""'|"'''", es_docstring)
+        self._estado = None
+
+    def texto(self, texto):
+        """Clasifica un texto de líneas completas (el último salto de línea es opcional)"""
+        lineas = texto.split('\n')
+        if lineas and not lineas[-1]:
+            lineas.pop()
+        for linea in lineas:
+            self.linea(linea)
+
+    def linea(self, linea):
+        if not linea.strip():
+            tipo = BLANCO
+        elif self.python:
+            tipo = self._python(linea)
+        else:
+            tipo = self._familia_c(linea)
+        self.conteos[tipo] += 1
+        return tipo
+
+    def _familia_c(self, linea):
+        codigo = comentario = False
+        pos = 0
+        while pos < len(linea):
+            if self._estado == 'bloque':
+                fin = _FIN_BLOQUE_C.search(linea, pos)
+                comentario = True
+                if not fin:
+                    break
+                self._estado, pos = None, fin.end()
+                continue
+            if self._estado is not None:
+                fin = _FIN_MULTILINEA_C[self._estado].match(linea, pos)
+                codigo = True
+                if not fin:
+                    break
+                self._estado, pos = None, fin.end()
+                continue
+            m = _PATRON_C.search(linea, pos)
+            if linea[pos:m.start() if m else len(linea)].strip():
+                codigo = True
+            if not m:
+                break
+            marca = m.group()
+            if marca == '//':
+                comentario = True
+                break
+            if marca == '/*':
+                comentario = True
+                self._estado, pos = 'bloque', m.end()
+                continue
+            codigo = True
+            cadena = _CADENAS[marca].match(linea, m.start())
+            if cadena:
+                pos = cadena.end()
+            elif marca in _FIN_MULTILINEA_C:
+                self._estado, pos = marca, m.end()
+            else:
+                break
+        return CODIGO if codigo else COMENTARIO if comentario else BLANCO
+
+    def _python(self, linea):
+        codigo = comentario = False
+        pos = 0
+        while pos < len(linea):
+            if self._estado is not None:
+                cierre, docstring = self._estado
+                fin = _FIN_TRIPLE[cierre].match(linea, pos)
+                if docstring:
+                    comentario = True
+                else:
+                    codigo = True
+                if not fin:
+                    break
+                self._estado, pos = None, fin.end()
+                continue
+            m = _PATRON_PY.search(linea, pos)
+            antes = linea[pos:m.start() if m else len(linea)].strip()
+            if antes:
+                codigo = True
+            if not m:
+                break
+            marca = m.group().lstrip('rRbBuUfF')
+            if marca == '#':
+                comentario = True
+                break
+            if len(marca) == 3:
+                # Docstring: la cadena triple es lo primero de la línea (empieza la sentencia)
+                docstring = not codigo and not linea[:m.start()].strip()
+                self._estado, pos = (marca, docstring), m.end()
+                continue
+            codigo = True
+            cadena = _CADENAS[marca].match(linea, m.end() - 1)
+            if not cadena:
+                break
+            pos = cadena.end()
+        return CODIGO if codigo else COMENTARIO if comentario else BLANCO
+
+def clasificar(texto, extension):
+    """{codigo, comentario, blanco} de un texto completo"""
+    clasificador = ClasificadorLineas(extension)
+    clasificador.texto(texto)
+    return clasificador.conteos
@@ -0,0 +1,258 @@
+"""Cola de análisis en segundo plano respaldada por la tabla trabajos_analisis"""
+
+import json
+import logging
+import os
+import socket
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+from sqlalchemy import exc, or_
+
+from ..models import db, TrabajoAnalisis
+from .control_analisis import ControlAnalisis, MOTIVO_CANCELADO
+
+logger = logging.getLogger(__name__)
+
+class ColaTrabajos:
+    """Pool acotado de hilos que ejecuta los trabajos guardados en la BD.
+
+    Un trabajo se reclama con un UPDATE condicional (pendiente -> ejecutando),
+    de modo que un mismo trabajo nunca corre dos veces aunque se encole de nuevo.
+    No necesita broker externo: la tabla es la cola y sobrevive a reinicios.
+
+    Varios procesos pueden compartir la tabla (reloader de Werkzeug, workers de
+    gunicorn): quien reclama un trabajo queda como propietario y renueva su
+    latido cada lease/3 segundos desde un hilo propio, en el que también atiende
+    las cancelaciones pedidas a través de otro proceso. Solo los trabajos
+    'ejecutando' con el latido vencido se consideran huérfanos y se reencolan.
+    """
+
+    def __init__(self, app, ejecutar, max_workers=2, timeouts=None, lease=60):
+        self.app = app
+        # ejecutar(trabajo, reportar, control) -> dict con el resumen; se llama con app context
+        self.ejecutar = ejecutar
+        self.pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='analisis')
+        # {fase: segundos} para el ControlAnalisis de cada trabajo
+        self.timeouts = timeouts or {}
+        # trabajo_id -> ControlAnalisis de los trabajos de este proceso
+        self.controles = {}
+        self.lease = lease
+        self.propietario = f'{socket.gethostname()}:{os.getpid()}'[:100]
+        self._latidos = None
+        self._candado = threading.Lock()
+
+    def encolar(self, proyecto_id, parametros):
+        """Crea el trabajo y lo envía al pool; devuelve (trabajo, creado).
+
+        Si el proyecto ya tiene un trabajo activo no se crea otro: se devuelve el
+        existente (creado=False) y quien lo pidió comparte su resultado.
+        """
+        for _ in range(3):
+            trabajo = TrabajoAnalisis(
+                proyecto_id=proyecto_id,
+                proyecto_activo=proyecto_id,
+                estado='pendiente',
+                fase='en_cola',
+                progreso=0
+            )
+            trabajo.set_parametros(parametros)
+            db.session.add(trabajo)
+            try:
+                db.session.commit()
+            except exc.IntegrityError:
+                db.session.rollback()
+                activo = TrabajoAnalisis.query.filter_by(proyecto_activo=proyecto_id).first()
+                if activo is not None:
+                    return activo, False
+                # El trabajo activo terminó entre el INSERT y la consulta: reintentar
+                continue
+            self._enviar(trabajo.id)
+            return trabajo, True
+        raise RuntimeError(f'No se pudo encolar el análisis del proyecto {proyecto_id}')
+
+    def reanudar(self):
+        """Vuelve a encolar los trabajos pendientes y los huérfanos (latido vencido).
+
+        Los trabajos que otro proceso vivo está ejecutando no se tocan; enviar al
+        pool un pendiente que otro proceso también tiene es inocuo (_reclamar).
+        """
+        with self.app.app_context():
+            try:
+                self._recuperar_huerfanos()
+                ids = [id for (id,) in db.session.query(TrabajoAnalisis.id).filter_by(estado='pendiente')]
+            finally:
+                db.session.remove()
+        for trabajo_id in ids:
+            self._enviar(trabajo_id)
+        if ids:
+            logger.info(f"Reanudados {len(ids)} trabajos de análisis pendientes")
+        return len(ids)
+
+    def _enviar(self, trabajo_id):
+        self._iniciar_latidos()
+        self.pool.submit(self._ejecutar, trabajo_id)
+
+    def _iniciar_latidos(self):
+        with self._candado:
+            if self._latidos is None:
+                self._latidos = threading.Thread(target=self._latir, daemon=True, name='latidos-analisis')
+                self._latidos.start()
+
+    def _latir(self):
+        """Renueva el latido de los trabajos propios, atiende sus cancelaciones y
+        reencola los huérfanos de otros procesos"""
+        while True:
+            time.sleep(self.lease / 3)
+            with self.app.app_context():
+                try:
+                    self._renovar()
+                    for trabajo_id in self._recuperar_huerfanos():
+                        self.pool.submit(self._ejecutar, trabajo_id)
+                except Exception as e:
+                    logger.warning(f"Latido de la cola de análisis falló: {e}")
+                    db.session.rollback()
+                finally:
+                    db.session.remove()
+
+    def _renovar(self):
+        ids = list(self.controles)
+        if not ids:
+            return
+        TrabajoAnalisis.query.filter(
+            TrabajoAnalisis.id.in_(ids), TrabajoAnalisis.estado == 'ejecutando',
+            TrabajoAnalisis.propietario == self.propietario
+        ).update({'latido': datetime.now()}, synchronize_session=False)
+        db.session.commit()
+        filas = db.session.query(
+            TrabajoAnalisis.id, TrabajoAnalisis.propietario, TrabajoAnalisis.cancelacion_solicitada
+        ).filter(TrabajoAnalisis.id.in_(ids), TrabajoAnalisis.estado == 'ejecutando').all()
+        for trabajo_id, propietario, cancelacion in filas:
+            control = self.controles.get(trabajo_id)
+            if control is None:
+                continue
+            if propietario != self.propietario:
+                # Otro proceso lo reclamó (este no latió a tiempo): detenerlo sin escribir
+                # nada, los UPDATE finales están condicionados al propietario
+                control.interrumpir('Reclamado por otro proceso')
+            elif cancelacion:
+                control.cancelar()
+
+    def _recuperar_huerfanos(self):
+        """Pasa a 'pendiente' los trabajos 'ejecutando' con el latido vencido; devuelve sus ids"""
+        vencidos = or_(TrabajoAnalisis.latido.is_(None),
+                       TrabajoAnalisis.latido < datetime.now() - timedelta(seconds=self.lease))
+        # Los que este proceso sigue ejecutando no son huérfanos aunque su latido se
+        # haya atrasado: el próximo _renovar lo pone al día
+        propios = set(self.controles)
+        ids = [id for (id,) in db.session.query(TrabajoAnalisis.id).filter(
+            TrabajoAnalisis.estado == 'ejecutando', vencidos
+        ) if id not in propios]
+        if not ids:
+            return []
+        # Los que tenían una cancelación pedida no se reintentan
+        TrabajoAnalisis.query.filter(
+            TrabajoAnalisis.id.in_(ids), TrabajoAnalisis.estado == 'ejecutando', vencidos,
+            TrabajoAnalisis.cancelacion_solicitada.is_(True)
+        ).update({'estado': 'error', 'proyecto_activo': None, 'fase': 'cancelado',
+                  'error': MOTIVO_CANCELADO, 'fecha_fin': datetime.now()}, synchronize_session=False)
+        TrabajoAnalisis.query.filter(
+            TrabajoAnalisis.id.in_(ids), TrabajoAnalisis.estado == 'ejecutando', vencidos
+        ).update({'estado': 'pendiente', 'fase': 'en_cola', 'progreso': 0, 'propietario': None, 'latido': None},
+                 synchronize_session=False)
+        db.session.commit()
+        ids = [id for (id,) in db.session.query(TrabajoAnalisis.id).filter(
+            TrabajoAnalisis.id.in_(ids), TrabajoAnalisis.estado == 'pendiente'
+        )]
+        if ids:
+            logger.warning(f"Trabajos de análisis huérfanos reencolados: {ids}")
+        return ids
+
+    def cancelar(self, trabajo_id):
+        """Cancela un trabajo: 'cancelado' si estaba pendiente (ya no se ejecutará),
+        'cancelando' si está en ejecución o None si ya terminó.
+
+        La solicitud queda en la BD: si el trabajo corre en otro proceso, su
+        propietario la atiende en el próximo latido (a lo sumo lease/3 segundos).
+        """
+        filas = TrabajoAnalisis.query.filter(
+            TrabajoAnalisis.id == trabajo_id, TrabajoAnalisis.estado.in_(('pendiente', 'ejecutando'))
+        ).update({'cancelacion_solicitada': True}, synchronize_session=False)
+        db.session.commit()
+        if not filas:
+            return None
+        filas = TrabajoAnalisis.query.filter_by(id=trabajo_id, estado='pendiente').update({
+            'estado': 'error', 'proyecto_activo': None, 'fase': 'cancelado',
+            'error': MOTIVO_CANCELADO, 'fecha_fin': datetime.now()
+        })
+        db.session.commit()
+        if filas:
+            return 'cancelado'
+        control = self.controles.get(trabajo_id)
+        if control is not None:
+            control.cancelar()
+        return 'cancelando'
+
+    def _reclamar(self, trabajo_id):
+        ahora = datetime.now()
+        filas = TrabajoAnalisis.query.filter_by(
+            id=trabajo_id, estado='pendiente', cancelacion_solicitada=False
+        ).update(
+            {'estado': 'ejecutando', 'fase': 'iniciando', 'fecha_inicio': ahora,
+             'propietario': self.propietario, 'latido': ahora}
+        )
+        db.session.commit()
+        return filas == 1
+
+    def _propio(self, trabajo_id):
+        """Filtro del trabajo mientras siga siendo de este proceso"""
+        return TrabajoAnalisis.query.filter_by(id=trabajo_id, propietario=self.propietario)
+
+    def _ejecutar(self, trabajo_id):
+        # Registrado antes de reclamar: una cancelación nunca encuentra el trabajo
+        # en 'ejecutando' sin control al que avisar. Si el mismo id ya corre en este
+        # proceso (enviado dos veces), esta copia no hace nada: no debe pisar su control
+        control = ControlAnalisis(self.timeouts)
+        if self.controles.setdefault(trabajo_id, control) is not control:
+            return
+        with self.app.app_context():
+            try:
+                if not self._reclamar(trabajo_id):
+                    return
+                trabajo = db.session.get(TrabajoAnalisis, trabajo_id)
+
+                def reportar(fase, progreso):
+                    self._propio(trabajo_id).update({'fase': fase, 'progreso': progreso, 'latido': datetime.now()})
+                    db.session.commit()
+
+                resultado = self.ejecutar(trabajo, reportar, control)
+
+                # UPDATE condicionado al propietario: si el lease venció y otro proceso
+                # reclamó el trabajo, este resultado se descarta
+                self._propio(trabajo_id).update({
+                    'estado': 'completado', 'proyecto_activo': None, 'fase': 'completado', 'progreso': 100,
+                    'resultado': json.dumps(resultado), 'fecha_fin': datetime.now()
+                })
+                db.session.commit()
+            except Exception as e:
+                logger.error(f"Error en trabajo de análisis {trabajo_id}: {str(e)}")
+                db.session.rollback()
+                self._marcar_error(trabajo_id, str(e))
+            finally:
+                control.cerrar()
+                if self.controles.get(trabajo_id) is control:
+                    del self.controles[trabajo_id]
+                db.session.remove()
+
+    def _marcar_error(self, trabajo_id, mensaje):
+        try:
+            # Si otro proceso reclamó el trabajo, su resultado es el que vale
+            self._propio(trabajo_id).update(
+                {'estado': 'error', 'proyecto_activo': None, 'error': mensaje, 'fecha_fin': datetime.now()}
+            )
+            db.session.commit()
+        except Exception as e:
+            logger.error(f"No se pudo registrar el error del trabajo {trabajo_id}: {str(e)}")
+            db.session.rollback()
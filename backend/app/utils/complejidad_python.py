@@ -0,0 +1,73 @@
+"""Complejidad ciclomática de Python por función, calculada sobre el AST"""
+
+import ast
+
+class _VisitanteComplejidad(ast.NodeVisitor):
+    """Recorre un módulo y calcula la complejidad de McCabe de cada función.
+
+    Cada función (incluidas las anidadas y los métodos) produce su propio
+    registro; los puntos de decisión de una función interna no se suman a la
+    externa. Cuentan +1: if/elif, expresión condicional, for/while (y su else),
+    cada except, cada case de match, cada for/if de una comprensión y cada
+    operando extra de and/or.
+    """
+
+    def __init__(self):
+        self.funciones = []
+        self._pila = []
+
+    def _visitar_funcion(self, nodo):
+        nombre = '.'.join([n for n, _ in self._pila] + [nodo.name])
+        self._pila.append((nodo.name, [1]))
+        self.generic_visit(nodo)
+        _, contador = self._pila.pop()
+        self.funciones.append((nombre, nodo.lineno, contador[0]))
+
+    visit_FunctionDef = _visitar_funcion
+    visit_AsyncFunctionDef = _visitar_funcion
+
+    def visit_ClassDef(self, nodo):
+        # Las clases solo aportan el prefijo del nombre calificado
+        self._pila.append((nodo.name, None))
+        self.generic_visit(nodo)
+        self._pila.pop()
+
+    def _sumar(self, n):
+        for _, contador in reversed(self._pila):
+            if contador is not None:
+                contador[0] += n
+                return
+
+    def _decision(self, nodo, n=1):
+        self._sumar(n)
+        self.generic_visit(nodo)
+
+    def visit_If(self, nodo):
+        self._decision(nodo)
+
+    visit_IfExp = visit_If
+    visit_ExceptHandler = visit_If
+    visit_match_case = visit_If
+
+    def visit_For(self, nodo):
+        self._decision(nodo, 2 if nodo.orelse else 1)
+
+    visit_AsyncFor = visit_For
+    visit_While = visit_For
+
+    def visit_BoolOp(self, nodo):
+        self._decision(nodo, len(nodo.values) - 1)
+
+    def visit_comprehension(self, nodo):
+        self._decision(nodo, 1 + len(nodo.ifs))
+
+def complejidad_funciones(codigo, nombre_archivo='<desconocido>'):
+    """Devuelve [(funcion, linea, complejidad)] de un módulo Python.
+
+    Lanza SyntaxError (o ValueError) si el código no se puede parsear.
+    """
+    arbol = ast.parse(codigo, filename=nombre_archivo)
+    visitante = _VisitanteComplejidad()
+    visitante.visit(arbol)
+    visitante.funciones.sort(key=lambda f: f[1])
+    return visitante.funciones
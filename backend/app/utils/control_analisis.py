@@ -0,0 +1,98 @@
+"""Tiempo límite por fase y cancelación de un análisis en curso"""
+
+import threading
+import time
+from contextlib import contextmanager
+
+# Motivo que queda en el trabajo y en el proyecto al cancelar desde la API
+MOTIVO_CANCELADO = 'Cancelado por el usuario'
+
+class AnalisisInterrumpido(Exception):
+    """El análisis se detuvo por cancelación, tiempo límite o límite de recursos"""
+
+    def __init__(self, motivo):
+        super().__init__(motivo)
+        self.motivo = motivo
+
+class ControlAnalisis:
+    """Plazos por fase y cancelación cooperativa de un análisis.
+
+    Un hilo no se puede matar desde fuera: el análisis llama a fase() al
+    empezar cada fase y a verificar() dentro de sus bucles, y ambos lanzan
+    AnalisisInterrumpido si se canceló o se agotó el plazo. Los procesos de
+    git registrados con proceso() se terminan en el acto (un vigilante revisa
+    los plazos), así una fase bloqueada en un clone o un log no espera a que
+    git termine por su cuenta.
+    """
+
+    def __init__(self, timeouts=None, intervalo=0.5):
+        # {fase: segundos}; las fases sin entrada (o con 0) no tienen límite
+        self.timeouts = timeouts or {}
+        self.intervalo = intervalo
+        self.motivo = None
+        self.fase_actual = None
+        self._limite = None
+        self._procesos = set()
+        self._candado = threading.Lock()
+        self._fin = threading.Event()
+        self._vigilante = None
+
+    def fase(self, nombre):
+        """Cierra la fase anterior (verifica) y abre el plazo de la nueva"""
+        self.verificar()
+        segundos = self.timeouts.get(nombre)
+        with self._candado:
+            self.fase_actual = nombre
+            self._limite = time.monotonic() + segundos if segundos else None
+            if self._limite is not None and self._vigilante is None:
+                self._vigilante = threading.Thread(target=self._vigilar, daemon=True, name='vigilante-analisis')
+                self._vigilante.start()
+
+    def cancelar(self, motivo=MOTIVO_CANCELADO):
+        self.interrumpir(motivo)
+
+    def interrumpir(self, motivo):
+        """Marca el análisis como detenido (el primer motivo gana) y termina sus procesos"""
+        with self._candado:
+            if self.motivo is None:
+                self.motivo = motivo
+            procesos = list(self._procesos)
+        for proceso in procesos:
+            try:
+                proceso.kill()
+            except OSError:
+                pass
+
+    def _comprobar_plazo(self):
+        with self._candado:
+            if self._limite is None or time.monotonic() <= self._limite:
+                return
+            motivo = f"Tiempo límite agotado en la fase '{self.fase_actual}' ({self.timeouts[self.fase_actual]} s)"
+        self.interrumpir(motivo)
+
+    def verificar(self):
+        self._comprobar_plazo()
+        if self.motivo is not None:
+            raise AnalisisInterrumpido(self.motivo)
+
+    @contextmanager
+    def proceso(self, proceso):
+        """Registra un subprocess.Popen para terminarlo si el análisis se interrumpe"""
+        with self._candado:
+            self._procesos.add(proceso)
+            interrumpido = self.motivo is not None
+        if interrumpido:
+            proceso.kill()
+        try:
+            yield proceso
+        finally:
+            with self._candado:
+                self._procesos.discard(proceso)
+
+    def _vigilar(self):
+        while not self._fin.wait(self.intervalo):
+            self._comprobar_plazo()
+
+    def cerrar(self):
+        """Detiene el vigilante al terminar el análisis"""
+        self._fin.set()
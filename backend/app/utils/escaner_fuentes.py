@@ -0,0 +1,290 @@
+"""
+Escáner de código fuente: una sola enumeración del árbol y medición por archivo
+(LOC + muestras de complejidad) repartida en un pool de procesos.
+"""
+
+import io
+import os
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+
+try:
+    import resource
+except ImportError:  # Windows: sin topes de recursos por proceso
+    resource = None
+
+from .clasificador_lineas import ClasificadorLineas, clasificar, COMENTARIO, BLANCO
+from .complejidad_python import complejidad_funciones
+from .escaner_tokens import (motivo_omision, motivo_omision_contenido, escanear_tokens, contar_tokens,
+                             EXTENSIONES_TOKENS)
+
+EXTENSIONES_LOC = {'.py', '.js', '.java', '.cpp', '.c', '.ts', '.jsx', '.tsx', '.go', '.rs'}
+DIRECTORIOS_IGNORADOS = {'.git', 'node_modules', '.venv', '__pycache__', 'dist', 'build'}
+
+# Incrementar al cambiar cualquier analizador: invalida la caché de métricas por blob
+VERSION_ANALIZADOR = '6'
+
+# Tamaño máximo por archivo; los mayores se omiten (motivo 'tamano')
+MAX_BYTES_ARCHIVO = 2 * 1024 * 1024
+
+# Por debajo de este número de archivos no compensa levantar procesos
+MIN_ARCHIVOS_POOL = 64
+
+def es_fuente(ruta_relativa):
+    """Indica si una ruta relativa es un archivo fuente fuera de directorios ignorados"""
+    partes = ruta_relativa.replace('\\', '/').split('/')
+    return (os.path.splitext(partes[-1])[1] in EXTENSIONES_LOC
+            and not any(p in DIRECTORIOS_IGNORADOS for p in partes[:-1]))
+
+def enumerar_fuentes(raiz):
+    """Genera las rutas relativas (con '/') de los archivos fuente bajo raiz"""
+    for root, dirs, files in os.walk(raiz):
+        # Ignorar carpetas .git y node_modules
+        dirs[:] = [d for d in dirs if d not in DIRECTORIOS_IGNORADOS]
+
+        for file in files:
+            if os.path.splitext(file)[1] in EXTENSIONES_LOC:
+                ruta = os.path.relpath(os.path.join(root, file), raiz)
+                yield ruta.replace(os.sep, '/')
+
+def _clasificacion(metricas, conteos):
+    metricas['comentarios'] = conteos[COMENTARIO]
+    metricas['blancos'] = conteos[BLANCO]
+
+def medir_archivo(filepath, max_bytes=MAX_BYTES_ARCHIVO):
+    """Calcula LOC, líneas de comentario y en blanco y muestras de complejidad de
+    un archivo fuente en una sola lectura (se ejecuta en el worker).
+
+    Los archivos binarios, minificados, generados o mayores que max_bytes no se
+    leen: se devuelven con 'omitido' = motivo y sin líneas.
+    """
+    _tope_cpu_archivo()
+    metricas = {'loc': 0, 'complejidades': []}
+    motivo = motivo_omision(filepath, max_bytes)
+    if motivo:
+        metricas['omitido'] = motivo
+        return metricas
+
+    extension = os.path.splitext(filepath)[1]
+    if extension == '.py':
+        medir_python(filepath, metricas)
+    elif extension in EXTENSIONES_TOKENS:
+        clasificador = ClasificadorLineas(extension)
+        try:
+            lineas, funciones, decisiones = escanear_tokens(filepath, EXTENSIONES_TOKENS[extension], clasificador)
+        except OSError:
+            return metricas
+        metricas['loc'] = lineas
+        _clasificacion(metricas, clasificador.conteos)
+        if funciones > 0:
+            metricas['complejidades'].append(1 + (decisiones / funciones))
+    else:
+        clasificador = ClasificadorLineas(extension)
+        try:
+            with open(filepath, 'r', encoding='utf-8', errors='ignore') as f:
+                for linea in f:
+                    clasificador.linea(linea.rstrip('\n'))
+                    metricas['loc'] += 1
+        except OSError:
+            pass
+        _clasificacion(metricas, clasificador.conteos)
+    return metricas
+
+def medir_python(filepath, metricas):
+    """LOC y complejidad por función de un archivo Python con una sola lectura y un parseo.
+
+    Agrega a metricas 'funciones': [[funcion, linea, complejidad], ...].
+    """
+    try:
+        with open(filepath, 'r', encoding='utf-8', errors='ignore') as f:
+            codigo = f.read()
+    except OSError:
+        return
+    metricas['loc'] = codigo.count('\n') + (1 if codigo and not codigo.endswith('\n') else 0)
+    _clasificacion(metricas, clasificar(codigo, '.py'))
+
+    try:
+        funciones = complejidad_funciones(codigo, filepath)
+    except (SyntaxError, ValueError, RecursionError):
+        # Código no parseable con este intérprete (p. ej. Python 2): heurística por líneas
+        analizar_python(filepath, metricas['complejidades'])
+        return
+    metricas['funciones'] = [list(f) for f in funciones]
+    metricas['complejidades'] = [c for _, _, c in funciones]
+
+def medir_contenido(ruta, datos, max_bytes=MAX_BYTES_ARCHIVO):
+    """Como medir_archivo, sobre el contenido de un blob (bytes) sin archivo en disco.
+
+    Para el mismo contenido devuelve las mismas métricas que medir_archivo, así
+    ambas comparten la caché por blob.
+    """
+    _tope_cpu_archivo()
+    metricas = {'loc': 0, 'complejidades': []}
+    motivo = motivo_omision_contenido(ruta, datos, max_bytes)
+    if motivo:
+        metricas['omitido'] = motivo
+        return metricas
+
+    # Misma decodificación y saltos de línea universales que open(..., 'r')
+    texto = datos.decode('utf-8', errors='ignore').replace('\r\n', '\n').replace('\r', '\n')
+    extension = os.path.splitext(ruta)[1]
+    metricas['loc'] = texto.count('\n') + (1 if texto and not texto.endswith('\n') else 0)
+    _clasificacion(metricas, clasificar(texto, extension))
+    if extension == '.py':
+        try:
+            funciones = complejidad_funciones(texto, ruta)
+        except (SyntaxError, ValueError, RecursionError):
+            analizar_python_lineas(io.StringIO(texto).readlines(), metricas['complejidades'])
+            return metricas
+        metricas['funciones'] = [list(f) for f in funciones]
+        metricas['complejidades'] = [c for _, _, c in funciones]
+    elif extension in EXTENSIONES_TOKENS:
+        _, funciones, decisiones = contar_tokens(texto, EXTENSIONES_TOKENS[extension])
+        if funciones > 0:
+            metricas['complejidades'].append(1 + (decisiones / funciones))
+    return metricas
+
+def _memoria_virtual():
+    """Bytes de memoria virtual del proceso actual (0 si no se puede leer)"""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[0]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, AttributeError):
+        return 0
+
+# Segundos de CPU por archivo en los procesos del pool (0 = sin tope); lo fija _limitar_recursos
+_cpu_por_archivo = 0
+
+def _limitar_recursos(memoria_bytes, cpu_segundos):
+    """Initializer de los procesos del escáner: topes de memoria y CPU.
+
+    La memoria se cuenta sobre lo que el proceso ya hereda del servidor al
+    crearse (fork); al superarla las asignaciones fallan con MemoryError. La
+    CPU se limita por archivo (ver _tope_cpu_archivo): al agotarla el sistema
+    termina el proceso y el pool queda roto.
+    """
+    global _cpu_por_archivo
+    if memoria_bytes:
+        tope = _memoria_virtual() + memoria_bytes
+        resource.setrlimit(resource.RLIMIT_AS, (tope, tope))
+    _cpu_por_archivo = cpu_segundos
+
+def _tope_cpu_archivo():
+    """Corre el límite blando de CPU a lo ya consumido + _cpu_por_archivo.
+
+    RLIMIT_CPU cuenta la CPU acumulada del proceso y el pool vive todo el
+    análisis: fijado una sola vez sería un presupuesto para todos los archivos
+    del proceso, no un tope para uno patológico. El límite duro no se toca
+    (sin privilegios no se podría volver a subir).
+    """
+    if not _cpu_por_archivo:
+        return
+    uso = resource.getrusage(resource.RUSAGE_SELF)
+    _, duro = resource.getrlimit(resource.RLIMIT_CPU)
+    blando = int(uso.ru_utime + uso.ru_stime) + 1 + _cpu_por_archivo
+    if duro != resource.RLIM_INFINITY:
+        blando = min(blando, duro)
+    resource.setrlimit(resource.RLIMIT_CPU, (blando, duro))
+
+def crear_pool(procesos, memoria_bytes=0, cpu_segundos=0):
+    """Pool de procesos del escáner, reutilizable entre llamadas a escanear().
+
+    Los procesos se levantan ya (con fork, todos en el primer envío) para que
+    no hereden pipes de subprocesos abiertos después: un cat-file cuyo stdin
+    quedara abierto en un hijo del pool nunca recibiría EOF al cerrarlo.
+    """
+    if resource is None or not (memoria_bytes or cpu_segundos):
+        pool = ProcessPoolExecutor(max_workers=max(1, procesos))
+    else:
+        pool = ProcessPoolExecutor(
+            max_workers=max(1, procesos),
+            initializer=_limitar_recursos,
+            initargs=(memoria_bytes, cpu_segundos)
+        )
+    pool.submit(int).result()
+    return pool
+
+def _lote_pool(total, procesos):
+    # Lotes grandes para amortizar el envío entre procesos, pero suficientes
+    # para repartir la carga si hay archivos mucho más grandes que otros
+    return max(1, min(256, total // (max(1, procesos) * 4)))
+
+def _medir_contenido_par(par, max_bytes):
+    return medir_contenido(par[0], par[1], max_bytes)
+
+def escanear_contenidos(pares, procesos=1, max_bytes=MAX_BYTES_ARCHIVO, pool=None):
+    """Mide [(ruta, datos)] y devuelve la lista de métricas en el mismo orden.
+
+    pool: pool de crear_pool() a usar siempre (p. ej. con topes de recursos).
+    """
+    medir = partial(_medir_contenido_par, max_bytes=max_bytes)
+    if pool is not None:
+        return list(pool.map(medir, pares, chunksize=_lote_pool(len(pares), procesos)))
+    if procesos <= 1 or len(pares) < MIN_ARCHIVOS_POOL:
+        return [medir(par) for par in pares]
+    with ProcessPoolExecutor(max_workers=procesos) as pool:
+        return list(pool.map(medir, pares, chunksize=_lote_pool(len(pares), procesos)))
+
+def escanear(raiz, rutas, procesos=1, max_bytes=MAX_BYTES_ARCHIVO, pool=None):
+    """Mide las rutas relativas dadas; devuelve {ruta: metricas}.
+
+    Con procesos > 1 los archivos se reparten en lotes entre un pool de procesos.
+    pool: pool de crear_pool() a usar siempre, aunque haya pocos archivos.
+    """
+    rutas = list(rutas)
+    absolutas = [os.path.join(raiz, r) for r in rutas]
+    medir = partial(medir_archivo, max_bytes=max_bytes)
+
+    if pool is not None:
+        return dict(zip(rutas, pool.map(medir, absolutas, chunksize=_lote_pool(len(rutas), procesos))))
+    if procesos <= 1 or len(rutas) < MIN_ARCHIVOS_POOL:
+        return {r: medir(a) for r, a in zip(rutas, absolutas)}
+    with ProcessPoolExecutor(max_workers=procesos) as pool:
+        return dict(zip(rutas, pool.map(medir, absolutas, chunksize=_lote_pool(len(rutas), procesos))))
+
+def analizar_python(filepath, complexities):
+    """Analiza complejidad ciclomática en archivos Python (heurística por líneas, respaldo del AST)"""
+    try:
+        with open(filepath, 'r', encoding='utf-8', errors='ignore') as f:
+            lines = f.readlines()
+    except OSError:
+        return
+    analizar_python_lineas(lines, complexities)
+
+def analizar_python_lineas(lines, complexities):
+    """Heurística por líneas de analizar_python sobre líneas ya leídas"""
+    try:
+        current_complexity = 1
+        in_function = False
+        indent_level = 0
+
+        for line in lines:
+            stripped = line.lstrip()
+            current_indent = len(line) - len(stripped)
+
+            # Detectar definición de función
+            if stripped.startswith('def '):
+                if in_function and current_complexity > 1:
+                    complexities.append(current_complexity)
+                current_complexity = 1
+                in_function = True
+                indent_level = current_indent
+
+            # Contar puntos de decisión dentro de la función
+            if in_function and current_indent > indent_level:
+                decision_keywords = ['if ', 'elif ', 'for ', 'while ', 'try:', 'except', 'and ', 'or ']
+                for keyword in decision_keywords:
+                    if keyword in stripped:
+                        current_complexity += 1
+
+            # Detectar fin de función (siguiente función o fin de indentación)
+            if in_function and stripped and not stripped.startswith('#') and current_indent == indent_level and not stripped.startswith('def'):
+                if current_complexity > 1:
+                    complexities.append(current_complexity)
+                in_function = False
+
+        # Registrar última función
+        if in_function and current_complexity > 1:
+            complexities.append(current_complexity)
+    except:
+        pass
@@ -0,0 +1,144 @@
+"""
+Escáner de tokens para JS/TS y Java: una pasada por bloques con un único patrón
+precompilado por lenguaje, más los filtros que deciden qué archivos no se leen
+(binarios, minificados, generados o demasiado grandes).
+"""
+
+import os
+import re
+
+TAMANO_BLOQUE = 1024 * 1024
+TAMANO_MUESTRA = 8192
+
+# Una línea así de larga en la muestra indica código minificado o generado
+MAX_LARGO_LINEA = 1000
+MARCAS_GENERADO = (b'@generated', b'do not edit', b'auto-generated', b'autogenerated', b'code generated by')
+SUFIJOS_MINIFICADOS = ('.min.js', '.bundle.js', '.min.ts')
+LINEAS_CABECERA = 5
+
+# Motivos de omisión, en el orden en que se comprueban
+OMITIDO_TAMANO = 'tamano'
+OMITIDO_BINARIO = 'binario'
+OMITIDO_MINIFICADO = 'minificado'
+OMITIDO_GENERADO = 'generado'
+
+_DECISIONES_COMUNES = r'\b(?:if|else|switch|case|for|while|catch|try)\b|\|\||&&'
+
+# Grupo 'f': definición de función/método. Grupo 'd': punto de decisión.
+# El ternario '?' excluye '?.', '??' y '?:' (encadenamiento opcional y tipos TS).
+PATRON_JS = re.compile(
+    r'(?P<f>function\s+\w+|=>\s*\{|function\s*\()'
+    r'|(?P<d>' + _DECISIONES_COMUNES + r'|(?<!\?)\?(?![.?:]))'
+)
+
+_MODIFICADORES_JAVA = r'(?:(?:public|private|protected|static|final|abstract|synchronized|native|default)[ \t]+)'
+# Métodos (tipo + nombre) o constructores (modificador + nombre) al inicio de línea.
+# El '?' de los comodines de genéricos (<?>, <? extends T>) no es una decisión.
+PATRON_JAVA = re.compile(
+    r'(?P<f>^[ \t]*' + _MODIFICADORES_JAVA + r'*(?:<[^>\n]*>[ \t]+)?'
+    r'(?!(?:return|new|else|throw|case)\b)[\w<>\[\]?,.]+[ \t]+\w+[ \t]*\('
+    r'|^[ \t]*' + _MODIFICADORES_JAVA + r'+\w+[ \t]*\()'
+    r'|(?P<d>' + _DECISIONES_COMUNES + r'|(?<![<,])(?<![<,] )\?)',
+    re.MULTILINE
+)
+
+PATRONES = {'js': PATRON_JS, 'java': PATRON_JAVA}
+EXTENSIONES_TOKENS = {'.js': 'js', '.ts': 'js', '.jsx': 'js', '.tsx': 'js', '.java': 'java'}
+
+def motivo_omision(filepath, max_bytes):
+    """Devuelve por qué no se debe escanear el archivo, o None si se escanea"""
+    try:
+        tamano = os.path.getsize(filepath)
+        if tamano > max_bytes:
+            return OMITIDO_TAMANO
+        if minificado_por_nombre(filepath):
+            return OMITIDO_MINIFICADO
+        with open(filepath, 'rb') as f:
+            muestra = f.read(TAMANO_MUESTRA)
+    except OSError:
+        return None
+    return _motivo_muestra(filepath, muestra)
+
+def motivo_omision_contenido(nombre, datos, max_bytes):
+    """Igual que motivo_omision, sobre el contenido ya leído (p. ej. un blob de git)"""
+    if len(datos) > max_bytes:
+        return OMITIDO_TAMANO
+    if minificado_por_nombre(nombre):
+        return OMITIDO_MINIFICADO
+    return _motivo_muestra(nombre, datos[:TAMANO_MUESTRA])
+
+def minificado_por_nombre(nombre):
+    """Omisión que depende del nombre y no del contenido: la caché por blob no la
+    puede guardar (el mismo blob puede estar como x.js y como x.min.js)"""
+    return nombre.endswith(SUFIJOS_MINIFICADOS)
+
+def _motivo_muestra(nombre, muestra):
+    """Motivos que dependen solo del contenido (y de la extensión)"""
+    if b'\0' in muestra:
+        return OMITIDO_BINARIO
+    lineas = muestra.split(b'\n')
+    # Solo JS/TS y Java se minifican: en el resto una línea larga (datos, una tabla
+    # en un .py o un .go) no justifica descartar el archivo
+    if os.path.splitext(nombre)[1] in EXTENSIONES_TOKENS:
+        # La última línea de la muestra puede estar cortada; solo cuenta si el archivo terminó
+        completas = lineas[:-1] if len(muestra) == TAMANO_MUESTRA else lineas
+        if any(len(linea) > MAX_LARGO_LINEA for linea in completas) or (
+                len(muestra) == TAMANO_MUESTRA and len(lineas) == 1):
+            return OMITIDO_MINIFICADO
+    cabecera = b'\n'.join(lineas[:LINEAS_CABECERA]).lower()
+    if any(marca in cabecera for marca in MARCAS_GENERADO):
+        return OMITIDO_GENERADO
+    return None
+
+def _contar(patron, texto):
+    funciones = decisiones = 0
+    for m in patron.finditer(texto):
+        if m.lastgroup == 'f':
+            funciones += 1
+        else:
+            decisiones += 1
+    return funciones, decisiones
+
+def escanear_tokens(filepath, lenguaje, clasificador=None):
+    """Lee el archivo por bloques y devuelve (lineas, funciones, decisiones).
+
+    Cada bloque se corta en el último salto de línea y el resto pasa al
+    siguiente, así ningún token queda partido entre bloques. clasificador:
+    ClasificadorLineas que recibe las mismas líneas (comentarios y blancos).
+    """
+    patron = PATRONES[lenguaje]
+    lineas = funciones = decisiones = 0
+    resto = ''
+    termina_en_salto = True
+    with open(filepath, 'r', encoding='utf-8', errors='ignore') as f:
+        while True:
+            bloque = f.read(TAMANO_BLOQUE)
+            if not bloque:
+                break
+            termina_en_salto = bloque.endswith('\n')
+            texto = resto + bloque
+            corte = texto.rfind('\n') + 1
+            if corte == 0 and len(texto) < 4 * TAMANO_BLOQUE:
+                # Línea más larga que un bloque: acumular un poco más
+                resto = texto
+                continue
+            texto, resto = texto[:corte or len(texto)], texto[corte or len(texto):]
+            lineas += texto.count('\n')
+            if clasificador is not None:
+                clasificador.texto(texto)
+            f_bloque, d_bloque = _contar(patron, texto)
+            funciones += f_bloque
+            decisiones += d_bloque
+
+    f_bloque, d_bloque = _contar(patron, resto)
+    if clasificador is not None and resto:
+        clasificador.texto(resto)
+    if not termina_en_salto:
+        lineas += 1
+    return lineas, funciones + f_bloque, decisiones + d_bloque
+
+def contar_tokens(texto, lenguaje):
+    """Como escanear_tokens, sobre un texto completo en memoria (saltos ya normalizados a '\\n')"""
+    funciones, decisiones = _contar(PATRONES[lenguaje], texto)
+    lineas = texto.count('\n') + (1 if texto and not texto.endswith('\n') else 0)
+    return lineas, funciones, decisiones
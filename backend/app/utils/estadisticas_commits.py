@@ -0,0 +1,111 @@
+"""Estadísticas de commits calculadas en streaming (una pasada; memoria por día con commits, no por commit)"""
+
+from datetime import datetime, timedelta
+
+import numpy as np
+
+from .series_commits import histogramas_dias, SEGUNDOS_DIA, MAX_DIAS_SERIE
+
+FORMATO_FECHA = '%Y-%m-%d %H:%M:%S'
+MAX_ULTIMOS_COMMITS = 10
+
+class AgregadorCommits:
+    """Acumula estadísticas de commits recibidos uno a uno en el orden del log.
+
+    El promedio entre commits no necesita ordenar: la suma de los intervalos
+    entre fechas consecutivas es (más reciente - más antigua), así que basta
+    con llevar el mínimo, el máximo y el total. Para los histogramas de
+    actividad basta el número de commits por día, que se acumula al recibirlos.
+    """
+
+    def __init__(self, ahora=None):
+        ahora = ahora or datetime.now()
+        self.limite_semana = (ahora - timedelta(days=7)).timestamp()
+        self.limite_mes = (ahora - timedelta(days=30)).timestamp()
+        self.total = 0
+        self.commits_semana = 0
+        self.commits_mes = 0
+        self.ts_min = None
+        self.ts_max = None
+        self.ultimos_commits = []
+        # Día epoch UTC -> commits ese día
+        self.por_dia = {}
+
+    def agregar(self, timestamp, detalle=None):
+        """Registra un commit.
+
+        detalle: callable sin argumentos que devuelve (hexsha, autor, mensaje);
+        solo se invoca para los primeros MAX_ULTIMOS_COMMITS commits.
+        """
+        self.total += 1
+        dia = int(timestamp) // SEGUNDOS_DIA
+        self.por_dia[dia] = self.por_dia.get(dia, 0) + 1
+        if timestamp > self.limite_mes:
+            self.commits_mes += 1
+            if timestamp > self.limite_semana:
+                self.commits_semana += 1
+
+        if self.ts_min is None or timestamp < self.ts_min:
+            self.ts_min = timestamp
+        if self.ts_max is None or timestamp > self.ts_max:
+            self.ts_max = timestamp
+
+        if detalle is not None and len(self.ultimos_commits) < MAX_ULTIMOS_COMMITS:
+            self.agregar_detalle(timestamp, *detalle())
+
+    def cargar(self, timestamps):
+        """Registra de una vez todos los timestamps (array de enteros), vectorizado con NumPy"""
+        ts = np.asarray(timestamps, dtype=np.int64)
+        if ts.size == 0:
+            return
+        self.total += int(ts.size)
+        dias = ts // SEGUNDOS_DIA
+        # Mismo tope que la serie diaria: una fecha absurda no debe pedir millones de casillas
+        dias = np.maximum(dias, dias.max() - MAX_DIAS_SERIE)
+        primer_dia = int(dias.min())
+        conteos = np.bincount(dias - primer_dia)
+        for dia in np.flatnonzero(conteos).tolist():
+            self.por_dia[primer_dia + dia] = self.por_dia.get(primer_dia + dia, 0) + int(conteos[dia])
+        self.commits_mes += int(np.count_nonzero(ts > self.limite_mes))
+        self.commits_semana += int(np.count_nonzero(ts > self.limite_semana))
+        minimo, maximo = int(ts.min()), int(ts.max())
+        self.ts_min = minimo if self.ts_min is None else min(self.ts_min, minimo)
+        self.ts_max = maximo if self.ts_max is None else max(self.ts_max, maximo)
+
+    def agregar_detalle(self, timestamp, hexsha, autor, mensaje):
+        """Agrega un commit a ultimos_commits (en el orden del log) si aún hay lugar"""
+        if len(self.ultimos_commits) >= MAX_ULTIMOS_COMMITS:
+            return
+        self.ultimos_commits.append({
+            'hash': hexsha[:8],
+            'author': autor or 'Unknown',
+            'message': mensaje.strip()[:100],  # Primeros 100 caracteres
+            'fecha': datetime.fromtimestamp(timestamp).strftime(FORMATO_FECHA)
+        })
+
+    @property
+    def tiempo_promedio(self):
+        """Horas promedio entre commits consecutivos"""
+        if self.total < 2:
+            return 0.0
+        return (self.ts_max - self.ts_min) / 3600 / (self.total - 1)
+
+    def resultado(self):
+        fecha_creacion_repo = None
+        fecha_ultima_modificacion = None
+        if self.total:
+            # Fecha de creación = primer commit (el más antiguo)
+            fecha_creacion_repo = datetime.fromtimestamp(self.ts_min).strftime(FORMATO_FECHA)
+            # Fecha de última modificación = último commit (el más reciente)
+            fecha_ultima_modificacion = datetime.fromtimestamp(self.ts_max).strftime(FORMATO_FECHA)
+
+        return {
+            'commits_totales': self.total,
+            'commits_semana': self.commits_semana,
+            'commits_mes': self.commits_mes,
+            'tiempo_promedio': self.tiempo_promedio,
+            'ultimos_commits': self.ultimos_commits,
+            'fecha_creacion_repo': fecha_creacion_repo,
+            'fecha_ultima_modificacion': fecha_ultima_modificacion,
+            'series': histogramas_dias(list(self.por_dia), list(self.por_dia.values()))
+        }
@@ -1,18 +1,108 @@
 import os
+import heapq
+import json
+import shutil
 import subprocess
-import re
-from datetime import datetime, timedelta
-from git import Repo
+import time
+from concurrent.futures.process import BrokenProcessPool
+from contextlib import nullcontext
+from git import Repo, Git
+from git.exc import GitCommandError, InvalidGitRepositoryError
+import numpy as np
 import requests
 
+from . import escaner_fuentes
+from .escaner_fuentes import es_fuente, enumerar_fuentes, VERSION_ANALIZADOR, MAX_BYTES_ARCHIVO
+from .estadisticas_commits import AgregadorCommits, MAX_ULTIMOS_COMMITS
+from .churn import AgregadorChurn, FORMATO_LOG
+from .escaner_tokens import OMITIDO_TAMANO, minificado_por_nombre
+from .tendencia import LectorBlobs, revisiones_por_commits, revisiones_por_tags
+from .muestreo import plan_muestreo, estimar
+from .control_analisis import ControlAnalisis, AnalisisInterrumpido
+from .instrumentacion import Instrumentacion
+
+# Estado por archivo del último análisis, guardado dentro de .git del mirror
+ARCHIVO_ESTADO = 'metriciso_archivos.json'
+
+# Funciones más complejas que se devuelven en el resultado del análisis
+MAX_FUNCIONES_COMPLEJAS = 20
+
+# Métricas que se pueden pedir a analyze(); 'commits', 'churn' y 'tendencia' no necesitan working tree
+METRICAS_DISPONIBLES = ('commits', 'loc', 'complejidad', 'churn', 'tendencia')
+# Las que se calculan si no se indica nada. 'churn' y 'tendencia' son opcionales:
+# leen blobs de todo el historial, así que necesitan un clon sin blob:none
+METRICAS_POR_DEFECTO = ('commits', 'loc', 'complejidad')
+METRICAS_SIN_WORKING_TREE = {'commits', 'churn', 'tendencia'}
+METRICAS_CON_HISTORIAL = {'churn', 'tendencia'}
+
+# Cómo se recorre el historial en analyze_commits: 'git' (plumbing) o 'gitpython'
+BACKENDS_COMMITS = ('git', 'gitpython')
+# Bytes de salida de rev-list que se convierten a NumPy de una vez
+TAMANO_BLOQUE_LOG = 1024 * 1024
+# Blobs que se leen con cat-file y se miden juntos en la tendencia
+LOTE_BLOBS = 256
+# Archivos medidos entre comprobaciones del presupuesto de tiempo en modo muestreo
+LOTE_MUESTREO = 256
+# Archivos por lote del escaneo completo: entre lotes se atienden cancelaciones y plazos
+LOTE_ESCANEO = 5000
+# Commits recorridos por GitPython entre comprobaciones de cancelación
+LOTE_COMMITS = 10000
+
+def _resumen_blob(metricas):
+    """Lo que la tendencia necesita de las métricas de un blob"""
+    complejidades = metricas['complejidades']
+    return metricas['loc'], sum(complejidades), len(complejidades), metricas.get('omitido')
+
 class GitHubAnalyzer:
     """Analiza repositorios GitHub"""
     
-    def __init__(self, repo_url, token=None):
+    def __init__(self, repo_url, token=None, mirror=True, blobless=True, procesos=1, cache=None,
+                 max_bytes=MAX_BYTES_ARCHIVO, reportar=None, limites=None, backend_commits='git',
+                 control=None, recursos_escaneo=None):
         self.repo_url = repo_url
         self.token = token
+        self.mirror = mirror
+        self.blobless = blobless
+        self.procesos = procesos
+        self.cache = cache
+        self.max_bytes = max_bytes
+        # reportar(fase, progreso 0-100): avance para la cola de trabajos
+        self.reportar = reportar or (lambda fase, progreso: None)
+        # LimitesAnalisis: cupos de clonado y de escaneo compartidos entre análisis
+        self.limites = limites
+        if backend_commits not in BACKENDS_COMMITS:
+            raise ValueError(f'Backend de commits desconocido: {backend_commits}')
+        self.backend_commits = backend_commits
+        # ControlAnalisis: plazos por fase y cancelación (sin límites si no se indica)
+        self.control = control or ControlAnalisis()
+        # {'memoria_bytes', 'cpu_segundos'}: topes de cada proceso del escáner, la CPU por archivo (0 = sin tope)
+        self.recursos_escaneo = recursos_escaneo or {}
+        self._pool = None
+        # Duración por fase, archivos/bytes/commits procesados y memoria pico
+        self.instrumentacion = Instrumentacion()
+        self._tamanos = {}
         self.local_path = None
         self.repo = None
+        # True si el análisis difea commits (churn): el clon necesita todos los blobs
+        self.requiere_blobs = False
+        self.head_sha = None
+        self._estado_previo = None
+        self._metricas_archivos = None
+    
+    def _fase(self, fase, progreso):
+        """Abre el plazo y el cronómetro de la fase (y comprueba la anterior) y avisa a la cola"""
+        self.instrumentacion.fase(fase)
+        self.control.fase(fase)
+        self.reportar(fase, progreso)
+    
+    def _ejecutar_git(self, git, comando, *args, **kwargs):
+        """Comando git largo (clone, fetch, reset...) como proceso registrado en el
+        control: una cancelación o un plazo vencido lo terminan en el acto"""
+        proceso = getattr(git, comando)(*args, as_process=True, **kwargs)
+        with self.control.proceso(proceso.proc):
+            _, errores = proceso.proc.communicate()
+        if proceso.proc.returncode != 0:
+            raise GitCommandError(proceso.args, proceso.proc.returncode, errores)
     
     def extract_repo_info(self):
         if 'github.com/' in self.repo_url:
@@ -20,133 +110,523 @@ class GitHubAnalyzer:
             return {'owner': parts[0], 'name': parts[1] if len(parts) > 1 else ''}
         return None
     
-    def clone_repository(self, target_dir):
+    def clone_repository(self, target_dir, bare=False):
+        """Clona (o actualiza en modo mirror) el repositorio; bare=True omite el working tree"""
         try:
             self.local_path = target_dir
-            if not os.path.exists(target_dir):
-                os.makedirs(target_dir)
-            # Clonar SIN depth para obtener todo el historial
-            Repo.clone_from(self.repo_url, target_dir)
+            # Modo mirror: reutilizar el clon existente y traer solo objetos nuevos.
+            # Un clon con working tree también sirve cuando solo se pide bare.
+            existe_clon = os.path.isdir(os.path.join(target_dir, '.git'))
+            existe_bare = os.path.isfile(os.path.join(target_dir, 'HEAD'))
+            if self.mirror and (existe_clon or (bare and existe_bare)):
+                if self._actualizar_repositorio(target_dir):
+                    return True
+            if os.path.exists(target_dir):
+                # Restos de un clon anterior (fallido, de otra URL o bare sin working tree)
+                shutil.rmtree(target_dir, ignore_errors=True)
+            os.makedirs(target_dir)
+            # Clonar SIN depth para obtener todo el historial. Con blob:none solo se
+            # descargan commits y árboles; el checkout trae únicamente los blobs de HEAD.
+            opciones = {}
+            if self.blobless and not self.requiere_blobs:
+                opciones['filter'] = 'blob:none'
+            if bare:
+                opciones['bare'] = True
+            Git.check_unsafe_protocols(self.repo_url)
+            self._ejecutar_git(Git(), 'clone', '--', self.repo_url, target_dir, **opciones)
             self.repo = Repo(target_dir)
-            print(f"Repositorio clonado en: {target_dir}")
+            self.head_sha = self.repo.head.commit.hexsha
+            print(f"Repositorio clonado en: {target_dir}{' (bare)' if bare else ''}")
             return True
+        except AnalisisInterrumpido:
+            raise
         except Exception as e:
             print(f"Error clonando: {e}")
             return False
     
+    def _actualizar_repositorio(self, target_dir):
+        """Hace fetch sobre un clon existente y lo lleva al HEAD remoto"""
+        try:
+            repo = Repo(target_dir)
+            origin = repo.remotes.origin
+            if origin.url != self.repo_url:
+                print(f"URL remota distinta ({origin.url}), se vuelve a clonar")
+                return False
+            self.repo = repo
+            if self.requiere_blobs and repo.config_reader().has_option('remote "origin"', 'partialclonefilter'):
+                # Mirror creado con blob:none: traer el historial completo una sola vez
+                repo.git.config('--unset', 'remote.origin.partialclonefilter')
+                self._ejecutar_git(repo.git, 'fetch', '--refetch', 'origin')
+                print("Mirror convertido a clon completo (churn/tendencia leen blobs históricos)")
+            if repo.bare:
+                # Los clones bare no tienen refspec de remote-tracking
+                self._ejecutar_git(repo.git, 'fetch', 'origin', '+refs/heads/*:refs/heads/*', prune=True)
+            else:
+                self._ejecutar_git(repo.git, 'fetch', 'origin', prune=True)
+                self._ejecutar_git(repo.git, 'reset', '--hard', 'refs/remotes/origin/HEAD')
+                self._ejecutar_git(repo.git, 'clean', '-fdx')
+                self._estado_previo = self._cargar_estado()
+            if self.backend_commits == 'git':
+                self._escribir_commit_graph(repo)
+            self.head_sha = repo.head.commit.hexsha
+            print(f"Repositorio actualizado (fetch) en: {target_dir}")
+            return True
+        except (GitCommandError, InvalidGitRepositoryError, AttributeError, ValueError) as e:
+            # Un fetch terminado por cancelación no debe llevar a borrar el mirror
+            self.control.verificar()
+            print(f"No se pudo actualizar el mirror, se vuelve a clonar: {e}")
+            return False
+    
+    def _escribir_commit_graph(self, repo):
+        """Mantiene el commit-graph del mirror: rev-list lee fechas y padres sin
+        descomprimir cada commit. Con --split solo se agregan los commits nuevos."""
+        try:
+            self._ejecutar_git(repo.git, 'commit_graph', 'write', '--reachable', '--split')
+        except GitCommandError as e:
+            print(f"No se pudo escribir el commit-graph: {e}")
+    
+    def _ruta_estado(self):
+        return os.path.join(self.repo.git_dir, ARCHIVO_ESTADO)
+    
+    def _cargar_estado(self):
+        """Lee las métricas por archivo del último análisis (None si no existen)"""
+        try:
+            with open(self._ruta_estado(), 'r', encoding='utf-8') as f:
+                estado = json.load(f)
+            # El estado de otra versión del analizador no es reutilizable
+            if (estado.get('sha') and estado.get('version') == VERSION_ANALIZADOR
+                    and isinstance(estado.get('archivos'), dict)):
+                return estado
+        except (OSError, ValueError):
+            pass
+        return None
+    
+    def _guardar_estado(self):
+        if not self.repo or self._metricas_archivos is None:
+            return
+        try:
+            with open(self._ruta_estado(), 'w', encoding='utf-8') as f:
+                json.dump({
+                    'sha': self.head_sha,
+                    'version': VERSION_ANALIZADOR,
+                    'archivos': self._metricas_archivos
+                }, f)
+        except OSError as e:
+            print(f"No se pudo guardar estado por archivo: {e}")
+    
+    def archivos_cambiados(self, desde_sha):
+        """Rutas relativas modificadas entre desde_sha y HEAD (None si no se puede calcular)"""
+        if not self.repo or not desde_sha:
+            return None
+        try:
+            salida = self.repo.git.diff('--name-only', '--no-renames', desde_sha, 'HEAD')
+        except GitCommandError:
+            # SHA desconocido (p. ej. force push): requiere escaneo completo
+            return None
+        return set(line for line in salida.splitlines() if line)
+    
     def analyze_commits(self):
         if not self.repo:
             return None
         try:
-            commits = list(self.repo.iter_commits())
-            total = len(commits)
-            print(f"Total commits encontrados: {total}")
-            
-            now = datetime.now()
+            agregador = None
+            if self.backend_commits == 'git':
+                try:
+                    agregador = self._commits_plumbing()
+                except ValueError as e:
+                    # Solo una salida con formato inesperado justifica el respaldo: GitPython
+                    # ejecuta el mismo git, así que un GitCommandError/OSError fallaría igual
+                    print(f"Salida de rev-list/log no reconocida, usando GitPython: {e}")
+            if agregador is None:
+                agregador = self._commits_gitpython()
             
-            week_ago = now - timedelta(days=7)
-            commits_week = sum(1 for c in commits if datetime.fromtimestamp(c.committed_date) > week_ago)
+            stats = agregador.resultado()
+            self.instrumentacion.sumar('commits', stats['commits_totales'])
+            print(f"Total commits encontrados: {stats['commits_totales']}")
+            print(f"Commits semana: {stats['commits_semana']}, mes: {stats['commits_mes']}, promedio: {stats['tiempo_promedio']:.2f}h")
+            print(f"Primer commit: {stats['fecha_creacion_repo']}")
+            print(f"Último commit: {stats['fecha_ultima_modificacion']}")
             
-            month_ago = now - timedelta(days=30)
-            commits_mes = sum(1 for c in commits if datetime.fromtimestamp(c.committed_date) > month_ago)
+            return stats
+        except Exception as e:
+            print(f"Error en commits: {e}")
+            return None
+    
+    def _commits_gitpython(self):
+        """Una sola pasada sobre el log sin materializar la lista de commits"""
+        agregador = AgregadorCommits()
+        for i, commit in enumerate(self.repo.iter_commits()):
+            if i % LOTE_COMMITS == 0:
+                self.control.verificar()
+            agregador.agregar(commit.committed_date, lambda c=commit: (
+                c.hexsha,
+                c.author.name if c.author else None,
+                c.message
+            ))
+        return agregador
+    
+    def _commits_plumbing(self):
+        """Las fechas salen de un único `git rev-list --timestamp` y se agregan con
+        NumPy; solo los últimos commits se piden con detalle (--max-count)"""
+        agregador = AgregadorCommits()
+        # Líneas '<timestamp> <sha>' leídas por bloques: los timestamps son los tokens pares
+        proceso = self.repo.git.rev_list('--timestamp', 'HEAD', as_process=True)
+        resto = b''
+        with self.control.proceso(proceso.proc):
+            for bloque in iter(lambda: proceso.stdout.read(TAMANO_BLOQUE_LOG), b''):
+                bloque = resto + bloque
+                corte = bloque.rfind(b'\n') + 1
+                bloque, resto = bloque[:corte], bloque[corte:]
+                agregador.cargar(np.array(bloque.split()[::2], dtype=np.int64))
+            agregador.cargar(np.array(resto.split()[::2], dtype=np.int64))
+            proceso.wait()  # GitCommandError si rev-list falló o fue terminado
+        
+        # Registros separados por RS (0x1e), campos por NUL: el mensaje puede tener saltos de línea
+        detalle = self.repo.git.log(f'--max-count={MAX_ULTIMOS_COMMITS}', '--format=%H%x00%ct%x00%an%x00%B%x1e')
+        for registro in detalle.split('\x1e'):
+            registro = registro.strip('\n')
+            if registro:
+                hexsha, timestamp, autor, mensaje = registro.split('\x00', 3)
+                agregador.agregar_detalle(int(timestamp), hexsha, autor, mensaje)
+        return agregador
+    
+    def analizar_churn(self, desde_sha=None):
+        """Churn de los commits nuevos desde desde_sha (o de todo el historial).
+        
+        Si desde_sha ya no es ancestro de HEAD (force push) se recalcula todo y
+        el resultado se marca incremental=False para reemplazar lo guardado.
+        """
+        if not self.repo:
+            return None
+        try:
+            incremental = False
+            if desde_sha:
+                try:
+                    self.repo.git.merge_base('--is-ancestor', desde_sha, 'HEAD')
+                    incremental = True
+                except GitCommandError:
+                    print(f"Churn: {desde_sha[:8]} ya no está en el historial, se recalcula completo")
+            rango = f'{desde_sha}..HEAD' if incremental else 'HEAD'
             
-            # Calcular tiempo promedio entre commits
-            if len(commits) > 1:
-                fechas = sorted([datetime.fromtimestamp(c.committed_date) for c in commits])
-                tiempos = [(fechas[i+1] - fechas[i]).total_seconds() / 3600 for i in range(len(fechas)-1)]
-                tiempo_promedio = sum(tiempos) / len(tiempos)
+            agregador = AgregadorChurn()
+            # Se lee el stdout línea a línea: el log completo nunca está en memoria
+            # core.quotepath=false: rutas no ASCII (tildes, ñ) sin escapar en octal
+            proceso = self.repo.git(c='core.quotepath=false').log(
+                '--numstat', '--no-renames', FORMATO_LOG, rango, as_process=True
+            )
+            with self.control.proceso(proceso.proc):
+                agregador.procesar(proceso.stdout)
+                proceso.wait()
+            resultado = agregador.resultado(desde_sha if incremental else None, incremental)
+            self.instrumentacion.sumar('commits_churn', len(resultado['commits']))
+            print(f"Churn: {len(resultado['commits'])} commits procesados "
+                  f"(+{resultado['lineas_agregadas']} -{resultado['lineas_eliminadas']})")
+            return resultado
+        except Exception as e:
+            print(f"Error calculando churn: {e}")
+            return None
+    
+    def _blobs_fuentes(self):
+        """{ruta: blob SHA} de los archivos fuente en HEAD (None si no se puede listar)"""
+        arbol = self._arbol_fuentes('HEAD')
+        if arbol is None:
+            return None
+        # Los tamaños sirven para contar los bytes escaneados sin otro stat por archivo
+        self._tamanos = {ruta: tamano for ruta, (_, tamano) in arbol.items()}
+        return {ruta: sha for ruta, (sha, _) in arbol.items()}
+    
+    def _arbol_fuentes(self, revision):
+        """{ruta: (blob SHA, bytes)} de los archivos fuente de una revisión (None si falla)"""
+        if not self.repo:
+            return None
+        try:
+            salida = self.repo.git.ls_tree('-r', '-z', '-l', '--full-tree', revision)
+        except GitCommandError:
+            return None
+        arbol = {}
+        for entrada in salida.split('\0'):
+            if not entrada:
+                continue
+            info, ruta = entrada.split('\t', 1)
+            modo, tipo, sha, tamano = info.split()
+            # Se omiten symlinks (120000) y submódulos (tipo commit)
+            if tipo == 'blob' and modo != '120000' and es_fuente(ruta):
+                arbol[ruta] = (sha, int(tamano))
+        return arbol
+    
+    def analizar_tendencia(self, modo='commits', cada=100, excluir=()):
+        """LOC y complejidad promedio en revisiones muestreadas, leyendo blobs sin checkout.
+        
+        modo 'commits': uno de cada `cada` commits de la rama principal; 'tags': cada tag.
+        Cada blob se mide una sola vez en toda la corrida (y se reutiliza de la
+        caché por blob entre corridas). excluir: SHAs con punto ya guardado.
+        """
+        if not self.repo:
+            return None
+        try:
+            if modo == 'tags':
+                revisiones = revisiones_por_tags(self.repo)
             else:
-                tiempo_promedio = 0.0
-            
-            # Extraer fechas del repositorio
-            # Fecha de creación = primer commit (el más antiguo)
-            # Fecha de última modificación = último commit (el más reciente)
-            fecha_creacion_repo = None
-            fecha_ultima_modificacion = None
-            
-            if commits:
-                # Ordenar commits por fecha
-                commits_sorted = sorted(commits, key=lambda c: c.committed_date)
-                # Primer commit (más antiguo)
-                fecha_creacion_repo = datetime.fromtimestamp(commits_sorted[0].committed_date).strftime('%Y-%m-%d %H:%M:%S')
-                # Último commit (más reciente)
-                fecha_ultima_modificacion = datetime.fromtimestamp(commits_sorted[-1].committed_date).strftime('%Y-%m-%d %H:%M:%S')
-            
-            # Extraer últimos 10 commits
-            ultimos_commits = []
-            for i, commit in enumerate(commits[:10]):
-                ultimos_commits.append({
-                    'hash': commit.hexsha[:8],
-                    'author': commit.author.name if commit.author else 'Unknown',
-                    'message': commit.message.strip()[:100],  # Primeros 100 caracteres
-                    'fecha': datetime.fromtimestamp(commit.committed_date).strftime('%Y-%m-%d %H:%M:%S')
-                })
-            
-            print(f"Commits semana: {commits_week}, mes: {commits_mes}, promedio: {tiempo_promedio:.2f}h")
-            print(f"Primer commit: {fecha_creacion_repo}")
-            print(f"Último commit: {fecha_ultima_modificacion}")
+                revisiones = revisiones_por_commits(self.repo, cada)
+            excluir = set(excluir)
+            # Las revisiones ya guardadas solo aportan su tag (puede no tenerlo aún)
+            etiquetas = {sha: etiqueta for sha, _, etiqueta in revisiones if sha in excluir and etiqueta}
+            revisiones = [r for r in revisiones if r[0] not in excluir]
             
-            return {
-                'commits_totales': total,
-                'commits_semana': commits_week,
-                'commits_mes': commits_mes,
-                'tiempo_promedio': tiempo_promedio,
-                'ultimos_commits': ultimos_commits,
-                'fecha_creacion_repo': fecha_creacion_repo,
-                'fecha_ultima_modificacion': fecha_ultima_modificacion
-            }
+            # (blob, extension) -> (loc, suma de complejidades, n complejidades, omitido)
+            medidos = {}
+            puntos = []
+            leidos = 0
+            # El pool del escáner se crea antes que el lector: un proceso hijo creado
+            # después heredaría su stdin y cat-file no recibiría EOF al cerrarlo
+            self._pool_escaneo(LOTE_BLOBS)
+            with LectorBlobs(self.repo.git_dir) as lector, self.control.proceso(lector.proceso):
+                for sha, timestamp, etiqueta in revisiones:
+                    self.control.verificar()
+                    arbol = self._arbol_fuentes(sha) or {}
+                    # Los omitidos por nombre (x.min.js) no se miden: la clave es el contenido
+                    arbol = {ruta: datos for ruta, datos in arbol.items() if not minificado_por_nombre(ruta)}
+                    claves = {}
+                    for ruta, (blob, tamano) in arbol.items():
+                        claves.setdefault((blob, os.path.splitext(ruta)[1]), (ruta, tamano))
+                    leidos += self._medir_blobs(lector, claves, medidos)
+                    
+                    loc = suma = n = archivos = 0
+                    for ruta, (blob, _) in arbol.items():
+                        loc_blob, suma_blob, n_blob, omitido = medidos[(blob, os.path.splitext(ruta)[1])]
+                        if omitido:
+                            continue
+                        loc += loc_blob
+                        suma += suma_blob
+                        n += n_blob
+                        archivos += 1
+                    puntos.append({
+                        'sha': sha,
+                        'timestamp': timestamp,
+                        'etiqueta': etiqueta,
+                        'total_loc': loc,
+                        'complejidad_ciclomatica': suma / n if n else 1.0,
+                        'archivos': archivos
+                    })
+            self.instrumentacion.sumar('revisiones', len(puntos))
+            print(f"Tendencia: {len(puntos)} revisiones, {leidos} blobs leídos de {len(medidos)} distintos")
+            return {'modo': modo, 'puntos': puntos, 'etiquetas': etiquetas}
         except Exception as e:
-            print(f"Error en commits: {e}")
+            print(f"Error calculando tendencia: {e}")
+            return None
+    
+    def _medir_blobs(self, lector, claves, medidos):
+        """Mide los blobs de claves que no estén en medidos (ni en la caché); devuelve cuántos leyó"""
+        faltan = [clave for clave in claves if clave not in medidos]
+        if self.cache is not None and faltan:
+            en_cache = self.cache.obtener(faltan)
+            self.instrumentacion.sumar('archivos_cache', len(en_cache))
+            for clave, metricas in en_cache.items():
+                medidos[clave] = _resumen_blob(metricas)
+            faltan = [clave for clave in faltan if clave not in medidos]
+        
+        for i in range(0, len(faltan), LOTE_BLOBS):
+            lote = []
+            for clave in faltan[i:i + LOTE_BLOBS]:
+                ruta, tamano = claves[clave]
+                if tamano > self.max_bytes:
+                    # No hace falta leer el blob para saber que se omite
+                    medidos[clave] = (0, 0, 0, OMITIDO_TAMANO)
+                    continue
+                lote.append((clave, ruta, lector.leer(clave[0]) or b''))
+            self.control.verificar()
+            resultados = self._con_pool(
+                escaner_fuentes.escanear_contenidos, [(ruta, datos) for _, ruta, datos in lote]
+            )
+            self.instrumentacion.sumar('blobs_escaneados', len(lote))
+            self.instrumentacion.sumar('bytes_escaneados', sum(len(datos) for _, _, datos in lote))
+            nuevos = {clave: metricas for (clave, _, _), metricas in zip(lote, resultados)}
+            if self.cache is not None:
+                self.cache.guardar(nuevos)
+            for clave, metricas in nuevos.items():
+                medidos[clave] = _resumen_blob(metricas)
+        return len(faltan)
+    
+    def _pool_escaneo(self, archivos):
+        """Pool de procesos del escáner para toda la corrida (None: medir en este proceso).
+        
+        Con topes de recursos se usa siempre, así un archivo patológico agota la
+        memoria o la CPU de un proceso del escáner y no la del servidor.
+        """
+        limitado = any(self.recursos_escaneo.values())
+        if self._pool is None and (limitado or (self.procesos > 1 and archivos >= escaner_fuentes.MIN_ARCHIVOS_POOL)):
+            self._pool = escaner_fuentes.crear_pool(self.procesos, **self.recursos_escaneo)
+        return self._pool
+    
+    def _cerrar_pool(self, interrumpido=False):
+        if self._pool is not None:
+            # Interrumpido: no esperar a los lotes en curso ni arrancar los pendientes
+            self._pool.shutdown(wait=not interrumpido, cancel_futures=interrumpido)
+            self._pool = None
+    
+    def _con_pool(self, escanear, *args):
+        """Llama a una función del escáner con el pool de la corrida; la caída de un
+        proceso por los topes de memoria o CPU detiene el análisis con ese motivo"""
+        try:
+            return escanear(*args, self.procesos, self.max_bytes, pool=self._pool_escaneo(len(args[-1])))
+        except MemoryError:
+            self.control.interrumpir('El escaneo superó el límite de memoria por proceso (SCAN_MAX_MEMORIA_MB)')
+        except BrokenProcessPool:
+            self._cerrar_pool(interrumpido=True)
+            self.control.interrumpir('Un proceso del escaneo fue terminado al superar el límite de CPU por archivo o de memoria')
+        self.control.verificar()
+    
+    def _escanear(self, rutas):
+        """escaner_fuentes.escanear por lotes: entre lote y lote se atienden una
+        cancelación o un plazo vencido"""
+        medidos = {}
+        for i in range(0, len(rutas), LOTE_ESCANEO):
+            self.control.verificar()
+            lote = rutas[i:i + LOTE_ESCANEO]
+            medidos.update(self._con_pool(escaner_fuentes.escanear, self.local_path, lote))
+            self.instrumentacion.sumar('archivos_escaneados', len(lote))
+            self.instrumentacion.sumar('bytes_escaneados', sum(self._tamano(ruta) for ruta in lote))
+        return medidos
+    
+    def _tamano(self, ruta):
+        if ruta in self._tamanos:
+            return self._tamanos[ruta]
+        try:
+            return os.path.getsize(os.path.join(self.local_path, ruta))
+        except OSError:
+            return 0
+    
+    def _medir(self, rutas, blobs):
+        """Mide las rutas; con caché, solo los archivos cuyo blob no se midió antes"""
+        if self.cache is None or blobs is None:
+            return self._escanear(rutas)
+        
+        # Las omisiones por nombre (x.min.js) no dependen del blob: se miden sin caché
+        claves = {ruta: (blobs[ruta], os.path.splitext(ruta)[1]) for ruta in rutas
+                  if ruta in blobs and not minificado_por_nombre(ruta)}
+        en_cache = self.cache.obtener(claves.values())
+        resultado = {ruta: en_cache[clave] for ruta, clave in claves.items() if clave in en_cache}
+        pendientes = [ruta for ruta in rutas if ruta not in resultado]
+        
+        medidos = self._escanear(pendientes)
+        self.cache.guardar({claves[ruta]: m for ruta, m in medidos.items() if ruta in claves})
+        self.instrumentacion.sumar('archivos_cache', len(resultado))
+        resultado.update(medidos)
+        print(f"Caché de métricas: {len(resultado) - len(medidos)} archivos reutilizados, {len(medidos)} medidos")
+        return resultado
+    
+    def _escanear_fuentes(self):
+        """Obtiene métricas por archivo; en modo mirror solo re-lee los archivos cambiados"""
+        if self._metricas_archivos is not None:
+            return self._metricas_archivos
+        
+        cambiados = None
+        if self._estado_previo:
+            cambiados = self.archivos_cambiados(self._estado_previo['sha'])
+        
+        if cambiados is not None:
+            archivos = dict(self._estado_previo['archivos'])
+            for ruta in cambiados:
+                archivos.pop(ruta, None)
+            rutas = [r for r in cambiados
+                     if es_fuente(r) and os.path.isfile(os.path.join(self.local_path, r))]
+            blobs = self._blobs_fuentes() if self.cache is not None and rutas else None
+            archivos.update(self._medir(rutas, blobs))
+            print(f"Análisis incremental: {len(cambiados)} archivos cambiados desde {self._estado_previo['sha'][:8]}")
+        else:
+            # El árbol de HEAD da rutas y blobs sin recorrer el disco
+            blobs = self._blobs_fuentes()
+            rutas = list(blobs) if blobs is not None else list(enumerar_fuentes(self.local_path))
+            archivos = self._medir(rutas, blobs)
+        
+        self._metricas_archivos = archivos
+        return archivos
+    
+    def estimar_fuentes(self, max_archivos=2000, max_segundos=30, confianza=0.95):
+        """Estima LOC y complejidad promedio midiendo una muestra estratificada de archivos.
+        
+        Se mide en lotes hasta agotar max_archivos o max_segundos. No toca el
+        estado por archivo del mirror: el próximo análisis exacto sigue siendo
+        incremental respecto del último análisis exacto.
+        """
+        if not self.local_path or (self.repo and self.repo.bare):
             return None
+        inicio = time.monotonic()
+        blobs = self._blobs_fuentes()
+        rutas = list(blobs) if blobs is not None else list(enumerar_fuentes(self.local_path))
+        if not rutas:
+            return None
+        estratos, asignacion, orden = plan_muestreo(rutas, max_archivos, semilla=self.head_sha)
+        
+        muestras = {}
+        funciones = []
+        agotado = False
+        for i in range(0, len(orden), LOTE_MUESTREO):
+            if time.monotonic() - inicio > max_segundos:
+                agotado = True
+                break
+            for ruta, metricas in self._medir(orden[i:i + LOTE_MUESTREO], blobs).items():
+                complejidades = metricas['complejidades']
+                muestras.setdefault(asignacion[ruta], []).append(
+                    (metricas['loc'], sum(complejidades), len(complejidades), 0 if metricas.get('omitido') else 1)
+                )
+                for funcion, linea, complejidad in metricas.get('funciones', ()):
+                    funciones.append({'archivo': ruta, 'funcion': funcion, 'linea': linea, 'complejidad': complejidad})
+        
+        estimacion = estimar(estratos, muestras, confianza)
+        if estimacion is None:
+            return None
+        estimacion['presupuesto_agotado'] = agotado
+        estimacion['segundos'] = round(time.monotonic() - inicio, 2)
+        estimacion['funciones_complejas'] = heapq.nlargest(
+            MAX_FUNCIONES_COMPLEJAS, funciones, key=lambda f: f['complejidad']
+        )
+        print(f"Muestreo: {estimacion['muestra']}/{estimacion['poblacion']} archivos en "
+              f"{estimacion['segundos']}s, LOC ≈ {estimacion['loc']} {estimacion['loc_intervalo']}")
+        return estimacion
     
     def count_loc(self):
-        if not self.local_path:
+        if not self.local_path or (self.repo and self.repo.bare):
             return None
         try:
             total_lines = 0
+            comentarios = 0
+            blancos = 0
             file_count = 0
-            extensions = {'.py', '.js', '.java', '.cpp', '.c', '.ts', '.jsx', '.tsx', '.go', '.rs'}
+            omitidos = {}
+            for metricas in self._escanear_fuentes().values():
+                if metricas.get('omitido'):
+                    omitidos[metricas['omitido']] = omitidos.get(metricas['omitido'], 0) + 1
+                    continue
+                total_lines += metricas['loc']
+                comentarios += metricas.get('comentarios', 0)
+                blancos += metricas.get('blancos', 0)
+                file_count += 1
             
-            for root, dirs, files in os.walk(self.local_path):
-                # Ignorar carpetas .git y node_modules
-                dirs[:] = [d for d in dirs if d not in {'.git', 'node_modules', '.venv', '__pycache__', 'dist', 'build'}]
-                
-                for file in files:
-                    if any(file.endswith(ext) for ext in extensions):
-                        filepath = os.path.join(root, file)
-                        try:
-                            with open(filepath, 'r', encoding='utf-8', errors='ignore') as f:
-                                lines = len(f.readlines())
-                                total_lines += lines
-                                file_count += 1
-                        except:
-                            pass
-            
-            print(f"LOC encontradas: {total_lines} en {file_count} archivos")
-            return {'total_lineas': total_lines, 'archivos': file_count}
+            print(f"LOC encontradas: {total_lines} en {file_count} archivos (omitidos: {omitidos or 0}); "
+                  f"comentarios: {comentarios}, en blanco: {blancos}")
+            return {
+                'total_lineas': total_lines,
+                'lineas_codigo': total_lines - comentarios - blancos,
+                'lineas_comentarios': comentarios,
+                'lineas_blanco': blancos,
+                'archivos': file_count,
+                'omitidos': omitidos
+            }
         except Exception as e:
             print(f"Error contando LOC: {e}")
-            return {'total_lineas': 0, 'archivos': 0}
+            return {'total_lineas': 0, 'archivos': 0, 'omitidos': {}}
     
     def calculate_cyclomatic_complexity(self):
         """Calcula complejidad ciclomática por función/método"""
         if not self.local_path:
             return 1.0
+        if self.repo and self.repo.bare:
+            return None
         try:
-            import re
-            
             complexities = []
-            
-            for root, dirs, files in os.walk(self.local_path):
-                dirs[:] = [d for d in dirs if d not in {'.git', 'node_modules', '.venv', '__pycache__', 'dist', 'build'}]
-                
-                for file in files:
-                    if file.endswith('.py'):
-                        self._analyze_python_file(os.path.join(root, file), complexities)
-                    elif file.endswith(('.js', '.ts', '.jsx', '.tsx')):
-                        self._analyze_js_file(os.path.join(root, file), complexities)
-                    elif file.endswith('.java'):
-                        self._analyze_java_file(os.path.join(root, file), complexities)
+            for metricas in self._escanear_fuentes().values():
+                complexities.extend(metricas['complejidades'])
             
             avg_complexity = sum(complexities) / len(complexities) if complexities else 1.0
             print(f"Complejidad ciclomática promedio: {avg_complexity:.2f}")
@@ -155,106 +635,104 @@ class GitHubAnalyzer:
             print(f"Error calculando complejidad: {e}")
             return 1.0
     
-    def _analyze_python_file(self, filepath, complexities):
-        """Analiza complejidad ciclomática en archivos Python"""
-        try:
-            with open(filepath, 'r', encoding='utf-8', errors='ignore') as f:
-                lines = f.readlines()
-            
-            current_complexity = 1
-            in_function = False
-            indent_level = 0
-            
-            for line in lines:
-                stripped = line.lstrip()
-                current_indent = len(line) - len(stripped)
-                
-                # Detectar definición de función
-                if stripped.startswith('def '):
-                    if in_function and current_complexity > 1:
-                        complexities.append(current_complexity)
-                    current_complexity = 1
-                    in_function = True
-                    indent_level = current_indent
-                
-                # Contar puntos de decisión dentro de la función
-                if in_function and current_indent > indent_level:
-                    decision_keywords = ['if ', 'elif ', 'for ', 'while ', 'try:', 'except', 'and ', 'or ']
-                    for keyword in decision_keywords:
-                        if keyword in stripped:
-                            current_complexity += 1
-                
-                # Detectar fin de función (siguiente función o fin de indentación)
-                if in_function and stripped and not stripped.startswith('#') and current_indent == indent_level and not stripped.startswith('def'):
-                    if current_complexity > 1:
-                        complexities.append(current_complexity)
-                    in_function = False
-            
-            # Registrar última función
-            if in_function and current_complexity > 1:
-                complexities.append(current_complexity)
-        except:
-            pass
-    
-    def _analyze_js_file(self, filepath, complexities):
-        """Analiza complejidad ciclomática en archivos JavaScript/TypeScript"""
-        try:
-            with open(filepath, 'r', encoding='utf-8', errors='ignore') as f:
-                content = f.read()
-            
-            # Contar funciones
-            function_pattern = r'function\s+\w+|=>\s*\{|function\s*\('
-            functions = len(re.findall(function_pattern, content))
-            
-            if functions > 0:
-                # Contar puntos de decisión
-                decision_count = len(re.findall(r'\bif\b|\belse\b|\bswitch\b|\bcase\b|\bfor\b|\bwhile\b|\bcatch\b|\btry\b|\b\|\|\b|\b&&\b|\?\s*:', content))
-                avg_complexity_per_function = 1 + (decision_count / functions)
-                complexities.append(avg_complexity_per_function)
-        except:
-            pass
-    
-    def _analyze_java_file(self, filepath, complexities):
-        """Analiza complejidad ciclomática en archivos Java"""
-        try:
-            with open(filepath, 'r', encoding='utf-8', errors='ignore') as f:
-                content = f.read()
-            
-            # Contar métodos
-            method_pattern = r'(public|private|protected)?\s+\w+\s+\w+\s*\('
-            methods = len(re.findall(method_pattern, content))
-            
-            if methods > 0:
-                # Contar puntos de decisión
-                decision_count = len(re.findall(r'\bif\b|\belse\b|\bswitch\b|\bcase\b|\bfor\b|\bwhile\b|\bcatch\b|\btry\b|\b\|\|\b|\b&&\b|\?', content))
-                avg_complexity_per_method = 1 + (decision_count / methods)
-                complexities.append(avg_complexity_per_method)
-        except:
-            pass
-
-    
+    def funciones_python(self):
+        """Registros {archivo, funcion, linea, complejidad} de cada función Python analizada"""
+        if not self.local_path or (self.repo and self.repo.bare):
+            return []
+        registros = []
+        for ruta, metricas in self._escanear_fuentes().items():
+            for funcion, linea, complejidad in metricas.get('funciones', ()):
+                registros.append({
+                    'archivo': ruta,
+                    'funcion': funcion,
+                    'linea': linea,
+                    'complejidad': complejidad
+                })
+        return registros
     
-    def analyze(self, target_dir):
-        """Ejecuta análisis completo del repositorio"""
+    def analyze(self, target_dir, metricas=None, churn_desde=None, tendencia=None, muestreo=None):
+        """Ejecuta análisis del repositorio.
+        
+        metricas: subconjunto de METRICAS_DISPONIBLES (por defecto METRICAS_POR_DEFECTO).
+        Si no se pide 'loc' ni 'complejidad' se usa un clon bare sin working tree;
+        las métricas no pedidas se devuelven como None. churn_desde: último SHA
+        con churn ya guardado, para procesar solo los commits nuevos. tendencia:
+        argumentos de analizar_tendencia (modo, cada, excluir). muestreo:
+        argumentos de estimar_fuentes; si se da, 'loc' y 'complejidad' son
+        estimaciones con intervalos de confianza ('estimacion' en el resultado).
+        'instrumentacion' trae la duración de cada fase y los contadores de la corrida.
+        Lanza AnalisisInterrumpido si el control se cancela o vence el plazo de una fase.
+        """
         try:
             print(f"Iniciando análisis de: {self.repo_url}")
+            metricas = set(metricas or METRICAS_POR_DEFECTO)
+            self.requiere_blobs = bool(metricas & METRICAS_CON_HISTORIAL)
             
-            if not self.clone_repository(target_dir):
+            with self.limites.clon() if self.limites else nullcontext():
+                # El plazo de la fase corre desde que se obtiene el cupo de clonado
+                self._fase('clonando', 5)
+                clonado = self.clone_repository(target_dir, bare=metricas <= METRICAS_SIN_WORKING_TREE)
+            self.control.verificar()
+            if not clonado:
                 return {
                     'commits': None,
                     'loc': None,
                     'complejidad_ciclomatica': 0
                 }
             
-            commits = self.analyze_commits()
-            loc = self.count_loc()
-            complexity = self.calculate_cyclomatic_complexity()
+            self._fase('commits', 30)
+            commits = self.analyze_commits() if 'commits' in metricas else None
+            churn = None
+            if 'churn' in metricas:
+                self._fase('churn', 40)
+                churn = self.analizar_churn(churn_desde)
+            # La espera por un cupo de escaneo no cuenta en el plazo de ninguna fase
+            self._fase('esperando_escaneo', 45)
+            escanea = metricas - {'commits', 'churn'}
+            with self.limites.escaneo() if self.limites and escanea else nullcontext():
+                datos_tendencia = None
+                if 'tendencia' in metricas:
+                    self._fase('tendencia', 50)
+                    datos_tendencia = self.analizar_tendencia(**(tendencia or {}))
+                if metricas & {'loc', 'complejidad'}:
+                    self._fase('escaneando', 60)
+                estimacion = None
+                if muestreo is not None and metricas & {'loc', 'complejidad'}:
+                    estimacion = self.estimar_fuentes(**muestreo)
+                if estimacion is not None:
+                    funciones_muestra = estimacion.pop('funciones_complejas')
+                    loc = None
+                    if 'loc' in metricas:
+                        loc = {'total_lineas': estimacion['loc'], 'archivos': estimacion['archivos'], 'omitidos': {}}
+                    complexity = (estimacion['complejidad'] or 1.0) if 'complejidad' in metricas else None
+                    funciones_complejas = funciones_muestra if 'complejidad' in metricas else []
+                else:
+                    loc = self.count_loc() if 'loc' in metricas else None
+                    complexity = self.calculate_cyclomatic_complexity() if 'complejidad' in metricas else None
+                    funciones_complejas = []
+                    if 'complejidad' in metricas:
+                        funciones_complejas = heapq.nlargest(
+                            MAX_FUNCIONES_COMPLEJAS, self.funciones_python(), key=lambda f: f['complejidad']
+                        )
+            # Las fases atrapan sus propios errores: un corte a mitad de fase se detecta aquí
+            self.control.verificar()
+            self._guardar_estado()
             
             return {
                 'commits': commits,
                 'loc': loc,
-                'complejidad_ciclomatica': complexity
+                'complejidad_ciclomatica': complexity,
+                'funciones_complejas': funciones_complejas,
+                'churn': churn,
+                'tendencia': datos_tendencia,
+                'estimacion': estimacion,
+                'head_sha': self.head_sha,
+                'instrumentacion': self.instrumentacion.cerrar()
             }
+        except AnalisisInterrumpido as e:
+            print(f"Análisis detenido: {e}")
+            self._cerrar_pool(interrumpido=True)
+            raise
         except Exception as e:
             print(f"Error en análisis: {e}")
             return {
@@ -262,3 +740,6 @@ class GitHubAnalyzer:
                 'loc': None,
                 'complejidad_ciclomatica': 0
             }
+        finally:
+            self._cerrar_pool()
+            self.instrumentacion.cerrar()
@@ -0,0 +1,130 @@
+"""Instrumentación de un análisis: duración por fase, volumen procesado, memoria pico y cProfile opcional"""
+
+import cProfile
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+# Segundos entre muestras de la memoria residente del proceso
+INTERVALO_MEMORIA = 0.05
+
+def memoria_residente():
+    """Bytes de memoria residente (RSS) del proceso actual, o None si no se puede medir"""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, AttributeError):
+        pass
+    if resource is not None:
+        # Sin /proc (macOS, donde ru_maxrss está en bytes): máximo de toda la vida del proceso
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return None
+
+def _mb(valor):
+    return round(valor / (1024 * 1024), 1) if valor else None
+
+class Instrumentacion:
+    """Cronómetro por fase y contadores de un análisis.
+
+    fase() cierra la fase en curso y abre la siguiente; sumar() acumula
+    contadores (archivos, bytes, commits...). Mientras hay una fase abierta un
+    hilo muestrea la memoria residente: el pico es del proceso entero, así que
+    con varios análisis simultáneos incluye lo que usan los demás (y no la de
+    los procesos hijos: git o el pool del escáner).
+    """
+
+    def __init__(self):
+        self.fases = {}
+        self.contadores = {}
+        self.memoria_pico = None
+        self.memoria_fases = {}
+        self._fase = None
+        self._inicio_fase = None
+        self._inicio = None
+        self._fin = threading.Event()
+        self._muestreador = None
+
+    def fase(self, nombre):
+        ahora = time.perf_counter()
+        self._cerrar_fase(ahora)
+        if self._inicio is None:
+            self._inicio = ahora
+            self._muestreador = threading.Thread(target=self._muestrear, daemon=True, name='memoria-analisis')
+            self._muestreador.start()
+        self._fase = nombre
+        self._inicio_fase = ahora
+        if self._muestreador is not None:
+            # Cada fase arranca con una muestra propia aunque dure menos que el intervalo
+            self._medir_memoria()
+
+    def _cerrar_fase(self, ahora):
+        if self._fase is not None:
+            # Una fase puede repetirse (p. ej. reintentos): se suman sus tramos
+            self.fases[self._fase] = self.fases.get(self._fase, 0.0) + ahora - self._inicio_fase
+            self._fase = None
+
+    def sumar(self, contador, cantidad):
+        self.contadores[contador] = self.contadores.get(contador, 0) + cantidad
+
+    def _medir_memoria(self):
+        rss = memoria_residente()
+        if rss is None:
+            return
+        if self.memoria_pico is None or rss > self.memoria_pico:
+            self.memoria_pico = rss
+        fase = self._fase
+        if fase is not None and rss > self.memoria_fases.get(fase, 0):
+            self.memoria_fases[fase] = rss
+
+    def _muestrear(self):
+        self._medir_memoria()
+        while not self._fin.wait(INTERVALO_MEMORIA):
+            self._medir_memoria()
+
+    def cerrar(self):
+        """Cierra la fase en curso y detiene el muestreo de memoria; devuelve resultado()"""
+        self._cerrar_fase(time.perf_counter())
+        self._fin.set()
+        if self._muestreador is not None:
+            self._muestreador.join()
+            self._muestreador = None
+        return self.resultado()
+
+    def resultado(self):
+        total = sum(self.fases.values())
+        return {
+            'fases': {fase: round(segundos, 3) for fase, segundos in self.fases.items()},
+            'total_segundos': round(total, 3),
+            'contadores': dict(self.contadores),
+            'memoria_pico_mb': _mb(self.memoria_pico),
+            'memoria_fases_mb': {fase: _mb(rss) for fase, rss in self.memoria_fases.items()}
+        }
+
+@contextmanager
+def perfilar(ruta):
+    """Perfila con cProfile el hilo actual y vuelca las estadísticas en `ruta`
+    (abrir con pstats o snakeviz). Con ruta=None no hace nada."""
+    if not ruta:
+        yield
+        return
+    perfil = cProfile.Profile()
+    try:
+        perfil.enable()
+    except ValueError as e:
+        # Python 3.12+: solo un perfilador activo a la vez en el proceso
+        print(f"No se pudo activar cProfile: {e}")
+        yield
+        return
+    try:
+        yield
+    finally:
+        perfil.disable()
+        os.makedirs(os.path.dirname(os.path.abspath(ruta)), exist_ok=True)
+        perfil.dump_stats(ruta)
+        print(f"Perfil de cProfile guardado en: {ruta}")
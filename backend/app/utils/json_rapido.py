@@ -0,0 +1,49 @@
+"""
+Serialización JSON con orjson si está instalado (varias veces más rápido que
+json de la biblioteca estándar) y json como respaldo, con la misma salida que
+jsonify: claves ordenadas y fechas sueltas en formato HTTP.
+
+Lo usan las respuestas de Flask (ProveedorJSON) y las columnas JSON de la BD
+(dumps/loads como json_serializer/json_deserializer del engine).
+"""
+
+import json
+
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:  # Dependencia opcional
+    orjson = None
+
+BACKEND = 'orjson' if orjson else 'json'
+
+if orjson:
+    # Claves ordenadas como jsonify; claves no str (int) como json; las fechas pasan
+    # por el default de Flask para no cambiar su formato
+    _OPCIONES = orjson.OPT_SORT_KEYS | orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME
+
+def dumps(obj):
+    """Texto JSON compacto (para columnas JSON)"""
+    if orjson:
+        return orjson.dumps(obj, option=orjson.OPT_NON_STR_KEYS).decode()
+    return json.dumps(obj, separators=(',', ':'))
+
+def loads(texto):
+    if orjson:
+        return orjson.loads(texto)
+    return json.loads(texto)
+
+class ProveedorJSON(DefaultJSONProvider):
+    """JSONProvider de Flask que serializa con orjson cuando está disponible"""
+
+    def dumps(self, obj, **kwargs):
+        if not orjson:
+            return super().dumps(obj, **kwargs)
+        opciones = _OPCIONES | (orjson.OPT_INDENT_2 if kwargs.get('indent') else 0)
+        return orjson.dumps(obj, default=self.default, option=opciones).decode()
+
+    def loads(self, s, **kwargs):
+        if not orjson:
+            return super().loads(s, **kwargs)
+        return orjson.loads(s)
@@ -0,0 +1,32 @@
+"""Límites de concurrencia por fase, compartidos por todos los análisis del proceso"""
+
+import threading
+from contextlib import contextmanager
+
+class LimitesAnalisis:
+    """Semáforos separados para clonar (red/disco) y escanear (CPU).
+
+    Los hilos de la cola pueden ser más que los escaneos permitidos: mientras
+    unos proyectos esperan su turno de CPU, otros ya van clonando, y un clon
+    lento no retiene un cupo de escaneo.
+    """
+
+    def __init__(self, clones=4, escaneos=1):
+        self.max_clones = clones
+        self.max_escaneos = escaneos
+        self._clones = threading.BoundedSemaphore(clones)
+        self._escaneos = threading.BoundedSemaphore(escaneos)
+
+    @contextmanager
+    def _ocupar(self, semaforo):
+        semaforo.acquire()
+        try:
+            yield
+        finally:
+            semaforo.release()
+
+    def clon(self):
+        return self._ocupar(self._clones)
+
+    def escaneo(self):
+        return self._ocupar(self._escaneos)
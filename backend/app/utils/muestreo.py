@@ -0,0 +1,115 @@
+"""
+Muestreo aleatorio estratificado de archivos fuente y estimadores con intervalos
+de confianza para LOC total y complejidad promedio (modo "vistazo rápido").
+"""
+
+import os
+import random
+from statistics import NormalDist
+
+import numpy as np
+
+# Estratos con menos archivos se agrupan por extensión en un estrato '(otros)'
+MIN_TAMANO_ESTRATO = 20
+# Archivos por estrato que se intentan medir como mínimo (permite estimar su varianza)
+MIN_MUESTRA_ESTRATO = 2
+
+def estrato(ruta):
+    """(extensión, directorio de primer nivel) de una ruta relativa con '/'"""
+    partes = ruta.split('/')
+    return os.path.splitext(partes[-1])[1], partes[0] if len(partes) > 1 else '.'
+
+def plan_muestreo(rutas, max_archivos, semilla=None):
+    """Agrupa las rutas en estratos y decide el orden en que se miden.
+
+    Cada estrato recibe una cuota proporcional a su tamaño (mínimo
+    MIN_MUESTRA_ESTRATO) y sus archivos se eligen al azar. El orden intercala
+    los estratos de forma sistemática: el i-ésimo archivo de un estrato con
+    cuota n va en la posición (i + u) / n, así cortar la lista en cualquier
+    punto (por presupuesto de tiempo) deja una muestra casi proporcional.
+
+    Devuelve (estratos {clave: N_h}, asignacion {ruta: clave}, orden [rutas]).
+    """
+    azar = random.Random(semilla)
+    grupos = {}
+    for ruta in rutas:
+        grupos.setdefault(estrato(ruta), []).append(ruta)
+    # Estratos diminutos: se juntan con los de su extensión para no tener miles de estratos
+    for clave in [c for c, g in grupos.items() if len(g) < MIN_TAMANO_ESTRATO and c[1] != '(otros)']:
+        grupos.setdefault((clave[0], '(otros)'), []).extend(grupos.pop(clave))
+
+    total = sum(len(g) for g in grupos.values())
+    estratos, asignacion, claves_orden = {}, {}, []
+    for clave, grupo in grupos.items():
+        estratos[clave] = len(grupo)
+        cuota = min(len(grupo), max(MIN_MUESTRA_ESTRATO, round(max_archivos * len(grupo) / total)))
+        elegidos = azar.sample(grupo, cuota)
+        for i, ruta in enumerate(elegidos):
+            asignacion[ruta] = clave
+            claves_orden.append(((i + azar.random()) / cuota, ruta))
+    claves_orden.sort()
+    return estratos, asignacion, [ruta for _, ruta in claves_orden[:max_archivos]]
+
+def _z(confianza):
+    return NormalDist().inv_cdf((1 + confianza) / 2)
+
+def _varianza(valores, respaldo):
+    """Varianza muestral; con un solo valor se usa la de toda la muestra"""
+    if len(valores) > 1:
+        return valores.var(ddof=1)
+    return respaldo.var(ddof=1) if len(respaldo) > 1 else 0.0
+
+def estimar(estratos, muestras, confianza=0.95):
+    """Estimadores estratificados a partir de las métricas medidas.
+
+    estratos: {clave: N_h}. muestras: {clave: [(loc, suma_complejidades,
+    n_complejidades, incluido)]}, incluido=0 para archivos omitidos.
+    LOC usa el estimador de total estratificado; la complejidad promedio por
+    función, el estimador de razón combinado. Los estratos sin muestra
+    (presupuesto agotado) usan la media global como si tuvieran un archivo.
+    """
+    todas = np.array([m for lista in muestras.values() for m in lista], dtype=float).reshape(-1, 4)
+    if len(todas) == 0:
+        return None
+
+    totales = np.zeros(4)
+    var_loc = 0.0
+    bloques = []
+    for clave, n_poblacion in estratos.items():
+        datos = np.array(muestras.get(clave, []), dtype=float).reshape(-1, 4)
+        if len(datos):
+            # Corrección por población finita: un estrato medido entero no aporta varianza
+            fpc = (1 - len(datos) / n_poblacion) / len(datos)
+        else:
+            datos, fpc = todas, 1.0
+        totales += n_poblacion * datos.mean(axis=0)
+        var_loc += n_poblacion ** 2 * fpc * _varianza(datos[:, 0], todas[:, 0])
+        bloques.append((n_poblacion, fpc, datos))
+    loc, sumas, conteos, archivos = totales
+
+    z = _z(confianza)
+    margen_loc = z * var_loc ** 0.5
+    resultado = {
+        'estimado': True,
+        'confianza': confianza,
+        'muestra': len(todas),
+        'poblacion': sum(estratos.values()),
+        'estratos': len(estratos),
+        'estratos_sin_muestra': sum(1 for clave in estratos if not muestras.get(clave)),
+        'loc': round(loc),
+        'loc_intervalo': [max(0, round(loc - margen_loc)), round(loc + margen_loc)],
+        'archivos': round(archivos),
+        'complejidad': None,
+        'complejidad_intervalo': None
+    }
+    if conteos > 0:
+        razon = sumas / conteos
+        residuos_todas = todas[:, 1] - razon * todas[:, 2]
+        var_razon = sum(
+            n_poblacion ** 2 * fpc * _varianza(datos[:, 1] - razon * datos[:, 2], residuos_todas)
+            for n_poblacion, fpc, datos in bloques
+        )
+        margen = z * var_razon ** 0.5 / conteos
+        resultado['complejidad'] = float(razon)
+        resultado['complejidad_intervalo'] = [float(max(1.0, razon - margen)), float(razon + margen)]
+    return resultado
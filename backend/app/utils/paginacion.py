@@ -0,0 +1,101 @@
+"""
+Paginación por cursor (keyset) y selección de campos (?fields=) para listados.
+
+El cursor es opaco para el cliente: base64 de los valores de la clave de orden
+de la última fila devuelta. La página siguiente se pide con WHERE clave < cursor
+(o >), así la BD lee solo las filas de la página por el índice, sin saltar
+las de páginas anteriores con OFFSET.
+"""
+
+import base64
+import json
+from datetime import datetime
+
+from sqlalchemy import and_, or_, select
+
+from ..models import db
+
+LIMITE_POR_DEFECTO = 100
+LIMITE_MAXIMO = 1000
+# Los listados transmitidos por partes (serializacion.flujo_json) no crecen en memoria con el límite
+LIMITE_MAXIMO_FLUJO = 50000
+
+def codificar_cursor(valores):
+    """Cursor opaco con los valores de la clave de orden (fechas en ISO 8601)"""
+    crudo = json.dumps([v.isoformat() if isinstance(v, datetime) else v for v in valores])
+    return base64.urlsafe_b64encode(crudo.encode()).decode().rstrip('=')
+
+def decodificar_cursor(cursor, tipos):
+    """Valores del cursor convertidos a `tipos` (int, datetime...); ValueError si no es válido"""
+    try:
+        valores = json.loads(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)))
+        if not isinstance(valores, list) or len(valores) != len(tipos):
+            raise ValueError
+        return [datetime.fromisoformat(v) if tipo is datetime else tipo(v) for v, tipo in zip(valores, tipos)]
+    except (ValueError, TypeError, json.JSONDecodeError):
+        raise ValueError('cursor inválido')
+
+def leer_parametros(args, campos_modelo, limite_defecto=LIMITE_POR_DEFECTO, limite_maximo=LIMITE_MAXIMO):
+    """(limite, cursor, campos) de ?limit=&cursor=&fields=; ValueError si son inválidos.
+
+    campos: lista de claves de to_dict pedidas, o None para todas.
+    """
+    try:
+        limite = int(args.get('limit', limite_defecto))
+    except ValueError:
+        raise ValueError('limit debe ser un entero')
+    if not 1 <= limite <= limite_maximo:
+        raise ValueError(f'limit debe estar entre 1 y {limite_maximo}')
+
+    campos = None
+    if args.get('fields'):
+        campos = [c.strip() for c in args['fields'].split(',') if c.strip()]
+        desconocidos = [c for c in campos if c not in campos_modelo]
+        if desconocidos:
+            raise ValueError(f'Campos no soportados: {desconocidos}. Disponibles: {list(campos_modelo)}')
+    return limite, args.get('cursor') or None, campos
+
+def condiciones_pagina(filtros, orden, cursor, descendente=True):
+    """`filtros` más la condición de empezar después de `cursor` (si lo hay);
+    ValueError si el cursor no es válido"""
+    condiciones = list(filtros)
+    if cursor:
+        valores = decodificar_cursor(cursor, [columna.type.python_type for columna in orden])
+        condiciones.append(_despues_de(orden, valores, descendente))
+    return condiciones
+
+def consulta_borde(condiciones, orden, limite, descendente=True):
+    """Clave de orden de las filas `limite` y `limite`+1 de la página: solo lee el índice"""
+    return select(*orden).where(*condiciones).order_by(*_ordenar(orden, descendente)).offset(limite - 1).limit(2)
+
+def rango_pagina(filtros, orden, limite, cursor, descendente=True):
+    """(condiciones de la página, cursor de la siguiente o None), antes de leer las filas.
+
+    La respuesta se transmite por partes y el cursor siguiente va en cabeceras,
+    así que se calcula primero con consulta_borde. La página queda acotada entre
+    el cursor y la clave de su última fila, sin LIMIT: una fila insertada entre
+    las dos consultas entra en la página en lugar de saltarse.
+    """
+    condiciones = condiciones_pagina(filtros, orden, cursor, descendente)
+    borde = db.session.execute(consulta_borde(condiciones, orden, limite, descendente)).all()
+    if len(borde) < 2:
+        return condiciones, None
+    ultima = list(borde[0])
+    condiciones.append(_despues_de(orden, ultima, not descendente, incluida=True))
+    return condiciones, codificar_cursor(ultima)
+
+def _ordenar(orden, descendente):
+    return [c.desc() if descendente else c.asc() for c in orden]
+
+def _despues_de(orden, valores, descendente, incluida=False):
+    """(a, b) < (x, y) desplegado en OR/AND: se resuelve como rango sobre el índice.
+    Con incluida, la fila de la clave (x, y) también cumple."""
+    condiciones = []
+    for i, columna in enumerate(orden):
+        iguales = [orden[j] == valores[j] for j in range(i)]
+        if i == len(orden) - 1 and incluida:
+            borde = columna <= valores[i] if descendente else columna >= valores[i]
+        else:
+            borde = columna < valores[i] if descendente else columna > valores[i]
+        condiciones.append(and_(*iguales, borde))
+    return or_(*condiciones)
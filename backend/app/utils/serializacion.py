@@ -0,0 +1,117 @@
+"""
+Serialización columnar de listados, transmitida por partes.
+
+En lugar de cargar objetos del ORM y llamar a to_dict fila por fila, se
+seleccionan como tuplas solo las columnas de los campos pedidos; las fechas
+llegan ya formateadas desde la BD y las columnas JSON se copian como texto una
+vez validado, sin volver a codificarlas. El array se genera por bloques de
+BLOQUE_FILAS filas para responder con transferencia chunked: la memoria no
+crece con el listado.
+
+Cada objeto tiene los mismos campos y valores que to_dict, pero no el mismo
+texto que jsonify: los campos JSON van primero y sus claves internas en el
+orden guardado, no ordenadas.
+
+Los modelos describen sus campos con CAMPOS (campo -> columnas) y FORMATOS
+(campo -> 'fecha' | 'redondeo' | 'json'); el resto se copia tal cual.
+"""
+
+import logging
+
+from sqlalchemy import String, Text, func, select, type_coerce
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.sql.functions import FunctionElement
+
+from ..models import db
+from . import json_rapido
+
+logger = logging.getLogger(__name__)
+
+BLOQUE_FILAS = 500
+
+class fecha_texto(FunctionElement):
+    """DATETIME como 'YYYY-MM-DD HH:MM:SS' (el formato de to_dict), calculado en la BD"""
+    type = String()
+    inherit_cache = True
+
+@compiles(fecha_texto)
+def _fecha_texto_mysql(elemento, compilador, **kw):
+    return compilador.process(func.date_format(*elemento.clauses, '%Y-%m-%d %H:%i:%s'), **kw)
+
+@compiles(fecha_texto, 'sqlite')
+def _fecha_texto_sqlite(elemento, compilador, **kw):
+    return compilador.process(func.strftime('%Y-%m-%d %H:%M:%S', *elemento.clauses), **kw)
+
+def _expresion(modelo, campo):
+    columna = getattr(modelo, modelo.CAMPOS[campo][0])
+    formato = modelo.FORMATOS.get(campo)
+    if formato == 'fecha':
+        return fecha_texto(columna)
+    if formato == 'json':
+        # El texto guardado, sin pasar por el deserializador de la columna JSON
+        return type_coerce(columna, Text)
+    return columna
+
+def consulta(modelo, campos, condiciones, orden, descendente=True):
+    """SELECT de las columnas de `campos` (todos si None) con las condiciones y el orden de la página"""
+    return select(*(_expresion(modelo, campo).label(campo) for campo in campos or modelo.CAMPOS)).where(
+        *condiciones
+    ).order_by(*(c.desc() if descendente else c.asc() for c in orden))
+
+def _json_crudo(texto):
+    """El texto de una columna JSON como lo devuelve to_dict (valor or {}): los valores
+    falsos ([], 0, "", null) pasan a {}. Devuelve None si no es JSON válido."""
+    if not texto:
+        return '{}'
+    try:
+        valor = json_rapido.loads(texto)
+    except ValueError:
+        return None
+    return texto if valor else '{}'
+
+def flujo_json(consulta, modelo, campos):
+    """Genera el array JSON de las filas de `consulta` (de serializacion.consulta) por bloques"""
+    campos = list(campos or modelo.CAMPOS)
+    formatos = [modelo.FORMATOS.get(campo) for campo in campos]
+    redondeos = [i for i, formato in enumerate(formatos) if formato == 'redondeo']
+    crudos = [i for i, formato in enumerate(formatos) if formato == 'json']
+    escalares = [i for i, formato in enumerate(formatos) if formato != 'json']
+    claves_crudas = [json_rapido.dumps(campos[i]) + ':' for i in crudos]
+
+    invalidos = 0
+    try:
+        resultado = db.session.execute(consulta, execution_options={'yield_per': BLOQUE_FILAS})
+        yield '['
+        separador = ''
+        for filas in resultado.partitions():
+            columnas = list(zip(*filas))
+            for i in redondeos:
+                columnas[i] = [round(v, 2) if v else 0 for v in columnas[i]]
+            filas = list(zip(*columnas))
+            objetos = [{campos[i]: fila[i] for i in escalares} for fila in filas]
+            if not crudos:
+                yield separador + json_rapido.dumps(objetos)[1:-1]
+            else:
+                # Los campos JSON se insertan como texto en el objeto ya codificado
+                textos = []
+                for fila, objeto in zip(filas, objetos):
+                    partes = []
+                    for clave, i in zip(claves_crudas, crudos):
+                        texto = _json_crudo(fila[i])
+                        if texto is None:
+                            # TEXT heredado que no es JSON (SQLite): {} como deja la migración 019
+                            invalidos += 1
+                            texto = '{}'
+                        partes.append(clave + texto)
+                    if objeto:
+                        partes.append(json_rapido.dumps(objeto)[1:-1])
+                    textos.append('{' + ','.join(partes) + '}')
+                yield separador + ','.join(textos)
+            separador = ','
+        yield ']'
+        if invalidos:
+            logger.warning(f"{invalidos} valores JSON no válidos en {modelo.__tablename__} se enviaron como {{}}")
+    except Exception as e:
+        # Las cabeceras ya salieron: el cliente recibe un array truncado
+        logger.error(f"Error transmitiendo listado de {modelo.__tablename__}: {str(e)}")
+        raise
@@ -0,0 +1,49 @@
+"""Histogramas de actividad de commits por día, semana y mes (NumPy)"""
+
+import numpy as np
+
+SEGUNDOS_DIA = 86400
+# Tope del tramo diario: fechas de commit absurdas (p. ej. reloj en 1970) no
+# deben producir series de millones de ceros
+MAX_DIAS_SERIE = 366 * 50
+
+def _serie(indices, pesos, inicio):
+    conteos = np.bincount(indices - indices.min(), weights=pesos).astype(np.int64)
+    return {'inicio': inicio, 'conteos': conteos.tolist()}
+
+def histogramas(timestamps):
+    """Agrupa timestamps (segundos epoch) en series densas por día, semana y mes UTC.
+
+    Devuelve {'dia'|'semana'|'mes': {'inicio', 'conteos'}}, donde 'inicio' es la
+    fecha del primer intervalo (las semanas empiezan el lunes) y 'conteos' tiene
+    un valor por intervalo consecutivo, incluidos los vacíos. None si no hay commits.
+    """
+    ts = np.asarray(timestamps, dtype=np.int64)
+    return histogramas_dias(ts // SEGUNDOS_DIA)
+
+def histogramas_dias(dias, conteos=None):
+    """Igual que histogramas, a partir de días epoch UTC con su número de commits
+    (conteos; None = un commit por día listado, repetidos incluidos)"""
+    dias = np.asarray(dias, dtype=np.int64)
+    if dias.size == 0:
+        return None
+
+    # Única pasada sobre los días: conteo por día; semanas y meses se obtienen
+    # sumando esos días, que son muchos menos que los commits
+    dias = np.maximum(dias, dias.max() - MAX_DIAS_SERIE)
+    primer_dia = int(dias.min())
+    por_dia = np.bincount(dias - primer_dia, weights=conteos)
+    if conteos is not None:
+        por_dia = por_dia.astype(np.int64)
+    dias_abs = np.arange(primer_dia, primer_dia + por_dia.size, dtype=np.int64)
+    fechas = dias_abs.astype('datetime64[D]')
+
+    # El 1970-01-01 fue jueves: desplazar 3 días deja las semanas en lunes
+    semanas = (dias_abs + 3) // 7
+    meses = fechas.astype('datetime64[M]').astype(np.int64)
+
+    return {
+        'dia': {'inicio': str(fechas[0]), 'conteos': por_dia.tolist()},
+        'semana': _serie(semanas, por_dia, str(np.datetime64(int(semanas[0]) * 7 - 3, 'D'))),
+        'mes': _serie(meses, por_dia, str(fechas[0].astype('datetime64[M]')))
+    }
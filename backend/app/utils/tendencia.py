@@ -0,0 +1,91 @@
+"""
+Tendencia histórica de LOC y complejidad: elección de las revisiones a muestrear
+y lectura de blobs directamente de la base de objetos (`git cat-file --batch`),
+sin hacer checkout de cada revisión.
+"""
+
+import subprocess
+
+import numpy as np
+
+MODOS_TENDENCIA = ('commits', 'tags')
+# Puntos máximos por corrida; si el muestreo da más, se reparten uniformemente
+MAX_PUNTOS_TENDENCIA = 200
+
+class LectorBlobs:
+    """Proceso `git cat-file --batch` persistente: un blob por pedido, sin relanzar git"""
+
+    def __init__(self, git_dir):
+        self.proceso = subprocess.Popen(
+            ['git', '--git-dir', git_dir, 'cat-file', '--batch'],
+            stdin=subprocess.PIPE, stdout=subprocess.PIPE
+        )
+
+    def leer(self, sha):
+        """Devuelve el contenido del objeto, o None si no existe"""
+        self.proceso.stdin.write(sha.encode() + b'\n')
+        self.proceso.stdin.flush()
+        cabecera = self.proceso.stdout.readline().split()
+        if len(cabecera) != 3:
+            # '<sha> missing'
+            return None
+        datos = self.proceso.stdout.read(int(cabecera[2]))
+        self.proceso.stdout.read(1)  # salto de línea final
+        return datos
+
+    def cerrar(self):
+        self.proceso.stdin.close()
+        self.proceso.wait()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        if exc[0] is not None:
+            self.proceso.kill()
+        self.cerrar()
+
+def _repartir(revisiones, maximo):
+    """Reduce la lista a `maximo` elementos equiespaciados, conservando el primero y el último"""
+    if len(revisiones) <= maximo:
+        return revisiones
+    indices = np.unique(np.linspace(0, len(revisiones) - 1, maximo).round().astype(int))
+    return [revisiones[i] for i in indices]
+
+def revisiones_por_commits(repo, cada):
+    """Uno de cada `cada` commits de la rama principal (--first-parent), más HEAD.
+
+    Devuelve [(sha, timestamp, etiqueta)] del más antiguo al más reciente.
+    """
+    salida = repo.git.rev_list('--first-parent', '--reverse', '--timestamp', 'HEAD')
+    lineas = salida.splitlines()
+    elegidas = lineas[::cada]
+    if lineas and (len(lineas) - 1) % cada:
+        elegidas.append(lineas[-1])
+    revisiones = []
+    for linea in elegidas:
+        timestamp, sha = linea.split()
+        revisiones.append((sha, int(timestamp), None))
+    return _repartir(revisiones, MAX_PUNTOS_TENDENCIA)
+
+def revisiones_por_tags(repo):
+    """El commit de cada tag (anotado o ligero), ordenado por fecha del commit"""
+    salida = repo.git.for_each_ref(
+        '--format=%(refname:short)%00%(objecttype)%00%(objectname)%00%(committerdate:unix)'
+        '%00%(*objecttype)%00%(*objectname)%00%(*committerdate:unix)',
+        'refs/tags'
+    )
+    puntos = {}
+    for linea in salida.splitlines():
+        nombre, tipo, sha, fecha, tipo_destino, sha_destino, fecha_destino = linea.split('\0')
+        if tipo != 'commit':
+            # Tag anotado: vale el objeto al que apunta (si es un commit)
+            tipo, sha, fecha = tipo_destino, sha_destino, fecha_destino
+        if tipo == 'commit':
+            # Varios tags sobre el mismo commit forman un solo punto
+            puntos.setdefault(sha, (int(fecha), []))[1].append(nombre)
+    revisiones = sorted(
+        ((sha, fecha, ', '.join(sorted(nombres))) for sha, (fecha, nombres) in puntos.items()),
+        key=lambda r: r[1]
+    )
+    return _repartir(revisiones, MAX_PUNTOS_TENDENCIA)
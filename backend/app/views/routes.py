@@ -1,19 +1,39 @@
 from flask import Blueprint, jsonify, current_app
 from ..controllers.proyecto_controller import ProyectoController
 from ..controllers.formula_controller import FormulaController
+from ..controllers.trabajo_controller import TrabajoController
 from ..controllers.reporte_controller import generar_reporte_pdf
+from ..utils.cola_trabajos import ColaTrabajos
 from flask import send_file
+import logging
+import os
+
+logger = logging.getLogger(__name__)
 
 def init_routes(app):
     """Inicializa todas las rutas"""
     
     proyecto_bp = Blueprint('proyectos', __name__, url_prefix='/api/proyectos')
     formula_bp = Blueprint('formulas', __name__, url_prefix='/api/formulas')
+    trabajo_bp = Blueprint('trabajos', __name__, url_prefix='/api/jobs')
     
     # Controllers
     proyecto_ctrl = ProyectoController(app.config)
     formula_ctrl = FormulaController()
     
+    # Cola de análisis en segundo plano
+    cola = ColaTrabajos(app, proyecto_ctrl.ejecutar_analisis, app.config.get('ANALISIS_WORKERS', 2),
+                        proyecto_ctrl.timeouts_fases(), app.config.get('ANALISIS_LEASE_SEGUNDOS', 60))
+    proyecto_ctrl.cola = cola
+    trabajo_ctrl = TrabajoController(cola)
+    # Con el reloader de Werkzeug el proceso padre solo vigila archivos: reanuda el hijo
+    padre_reloader = app.debug and os.environ.get('WERKZEUG_RUN_MAIN') != 'true'
+    if app.config.get('ANALISIS_REANUDAR', True) and not padre_reloader:
+        try:
+            cola.reanudar()
+        except Exception as e:
+            logger.warning(f"No se pudieron reanudar trabajos pendientes: {e}")
+    
     # Proyectos
     @proyecto_bp.route('', methods=['GET'])
     def listar_proyectos():
@@ -27,6 +47,14 @@ def init_routes(app):
     def crear_proyecto():
         return proyecto_ctrl.crear()
     
+    @proyecto_bp.route('/analizar-lote', methods=['POST'])
+    def analizar_lote():
+        return proyecto_ctrl.analizar_lote()
+    
+    @proyecto_bp.route('/cache', methods=['GET'])
+    def estado_cache():
+        return proyecto_ctrl.cache()
+    
     @proyecto_bp.route('/<int:id>/analizar', methods=['POST'])
     def analizar_proyecto(id):
         return proyecto_ctrl.analizar(id)
@@ -37,9 +65,23 @@ def init_routes(app):
     
     @proyecto_bp.route('/<int:id>/historico', methods=['GET'])
     def get_historico(id):
-        from ..models import HistoricoCalculo
-        historico = HistoricoCalculo.query.filter_by(proyecto_id=id).order_by(HistoricoCalculo.fecha_calculo.desc()).all()
-        return jsonify([h.to_dict() for h in historico])
+        return proyecto_ctrl.historico(id)
+    
+    @proyecto_bp.route('/<int:id>/actividad', methods=['GET'])
+    def get_actividad(id):
+        return proyecto_ctrl.actividad(id)
+    
+    @proyecto_bp.route('/<int:id>/churn', methods=['GET'])
+    def get_churn(id):
+        return proyecto_ctrl.churn(id)
+    
+    @proyecto_bp.route('/<int:id>/tendencia', methods=['GET'])
+    def get_tendencia(id):
+        return proyecto_ctrl.tendencia(id)
+    
+    @proyecto_bp.route('/<int:id>/instrumentacion', methods=['GET'])
+    def get_instrumentacion(id):
+        return proyecto_ctrl.instrumentacion(id)
     
     @proyecto_bp.route('/<int:id>/reporte-pdf', methods=['GET'])
     def descargar_reporte(id):
@@ -76,6 +118,15 @@ def init_routes(app):
     def obtener_referencias_formula(codigo):
         return formula_ctrl.obtener_referencias(codigo)
     
+    # Trabajos de análisis
+    @trabajo_bp.route('/<int:id>', methods=['GET'])
+    def obtener_trabajo(id):
+        return trabajo_ctrl.obtener(id)
+    
+    @trabajo_bp.route('/<int:id>/cancelar', methods=['POST'])
+    def cancelar_trabajo(id):
+        return trabajo_ctrl.cancelar(id)
+    
     # Health check
     @app.route('/health', methods=['GET'])
     def health():
@@ -83,3 +134,4 @@ def init_routes(app):
     
     app.register_blueprint(proyecto_bp)
     app.register_blueprint(formula_bp)
+    app.register_blueprint(trabajo_bp)
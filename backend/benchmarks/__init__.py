@@ -0,0 +1,9 @@
+"""
+Benchmarks offline del analizador: python -m benchmarks.<modulo>
+No requieren base de datos; trabajan sobre repositorios git sintéticos locales.
+"""
+import os
+
+# config.py exige credenciales al importarse; los benchmarks nunca conectan a la BD
+for _var in ('MYSQL_USER', 'MYSQL_PASSWORD', 'MYSQL_HOST', 'MYSQL_DB'):
+    os.environ.setdefault(_var, 'benchmark')
@@ -0,0 +1,255 @@
+"""
+Benchmark de las fases del analizador sobre un repositorio sintético local.
+
+Uso: python -m benchmarks.bench_analizador [--commits N] [--archivos N]
+         [--lenguajes py:50,js:30,java:20] [--lineas 20:300] [--repeticiones 3]
+         [--salida resultado.json] [--comparar base.json] [--tolerancia 0.15]
+
+Genera el repositorio con repo_sintetico (misma semilla = mismo repositorio,
+mismos SHAs) y corre GitHubAnalyzer.analyze con todas las métricas sobre su URL
+file://, con un clon nuevo en cada repetición. Por fase informa la mediana de
+los segundos, el rendimiento (commits, archivos o revisiones por segundo) y la
+memoria residente pico del proceso (sin contar git ni el pool del escáner).
+
+La tabla va a stderr y el JSON a stdout (o a --salida). Con --comparar se
+contrasta con un JSON anterior: una fase más lenta o con más memoria que la
+base por encima de la tolerancia es una regresión y el proceso sale con 1.
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+from . import repo_sintetico
+from app.utils.cache_clones import tamano_directorio
+from app.utils.escaner_fuentes import VERSION_ANALIZADOR, enumerar_fuentes
+from app.utils.github_analyzer import GitHubAnalyzer, METRICAS_DISPONIBLES
+
+# Versión del formato del JSON; --comparar rechaza resultados de otro formato
+FORMATO = 1
+# Fecha fija de los commits sintéticos: los SHAs no dependen del día de la corrida
+INICIO_TS = 1600000000
+# Fases de analyze y la unidad con que se mide su rendimiento
+UNIDADES = {
+    'clonando': 'MB',
+    'commits': 'commits',
+    'churn': 'commits',
+    'tendencia': 'revisiones',
+    'escaneando': 'archivos',
+}
+# Fases más cortas que esto son ruido de medición y no se comparan
+MIN_SEGUNDOS_COMPARAR = 0.05
+
+def _lenguajes(texto):
+    """'py:50,js:30' -> {'py': 50.0, 'js': 30.0}"""
+    pesos = {}
+    for parte in texto.split(','):
+        nombre, _, peso = parte.partition(':')
+        pesos[nombre.strip()] = float(peso or 1)
+    return pesos
+
+def _rango(texto):
+    minimo, _, maximo = texto.partition(':')
+    return int(minimo), int(maximo or minimo)
+
+def _entorno():
+    """Datos de la máquina y de la versión del código, para saber si dos corridas son comparables"""
+    raiz = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    try:
+        revision = subprocess.run(['git', '-C', raiz, 'rev-parse', '--short', 'HEAD'],
+                                  capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        revision = None
+    version_git = subprocess.run(['git', '--version'], capture_output=True, text=True).stdout.strip()
+    return {
+        'revision': revision,
+        'version_analizador': VERSION_ANALIZADOR,
+        'python': platform.python_version(),
+        'git': version_git,
+        'plataforma': platform.platform(),
+        'cpus': os.cpu_count()
+    }
+
+def _correr(url, destino, args):
+    """Un analyze completo sobre un clon nuevo; devuelve (resultado, MB del clon)"""
+    analyzer = GitHubAnalyzer(url, mirror=False, procesos=args.procesos)
+    tendencia = {'modo': 'commits', 'cada': max(1, args.commits // args.puntos_tendencia)}
+    # analyze imprime su progreso; no mezclarlo con la tabla
+    with contextlib.redirect_stdout(io.StringIO()):
+        resultado = analyzer.analyze(destino, metricas=METRICAS_DISPONIBLES, tendencia=tendencia)
+    if not resultado.get('instrumentacion'):
+        raise RuntimeError('El análisis falló; correr analyze a mano para ver el error')
+    return resultado, tamano_directorio(destino) / (1024 * 1024)
+
+def _resumen_resultado(resultado):
+    """Cifras que deben coincidir entre versiones con el mismo VERSION_ANALIZADOR"""
+    return {
+        'commits': resultado['commits']['commits_totales'],
+        'total_loc': resultado['loc']['total_lineas'],
+        'lineas_comentarios': resultado['loc']['lineas_comentarios'],
+        'archivos': resultado['loc']['archivos'],
+        'complejidad': round(resultado['complejidad_ciclomatica'], 4),
+        'churn_agregadas': resultado['churn']['lineas_agregadas'],
+        'puntos_tendencia': len(resultado['tendencia']['puntos'])
+    }
+
+def ejecutar(args):
+    tmp = tempfile.mkdtemp(prefix='bench_analizador_')
+    try:
+        inicio = time.perf_counter()
+        url = repo_sintetico.generar_repositorio(
+            f'{tmp}/origen', args.commits, inicio_ts=INICIO_TS, archivos=args.archivos,
+            lenguajes=args.lenguajes, lineas=args.lineas, cambios=args.cambios,
+            autores=args.autores, semilla=args.semilla
+        )
+        generacion = time.perf_counter() - inicio
+        rutas = list(enumerar_fuentes(f'{tmp}/origen'))
+        bytes_fuente = sum(os.path.getsize(os.path.join(tmp, 'origen', r)) for r in rutas)
+
+        corridas = []
+        for _ in range(args.repeticiones):
+            corridas.append(_correr(url, f'{tmp}/clon', args))
+            shutil.rmtree(f'{tmp}/clon', ignore_errors=True)
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+
+    instrumentaciones = [resultado['instrumentacion'] for resultado, _ in corridas]
+    fases = {}
+    for fase, unidad in UNIDADES.items():
+        segundos = [i['fases'].get(fase) for i in instrumentaciones if fase in i['fases']]
+        if not segundos:
+            continue
+        contadores = instrumentaciones[0]['contadores']
+        cantidad = {
+            'clonando': statistics.median(mb for _, mb in corridas),
+            'commits': contadores.get('commits', 0),
+            'churn': contadores.get('commits_churn', 0),
+            'tendencia': contadores.get('revisiones', 0),
+            'escaneando': contadores.get('archivos_escaneados', 0),
+        }[fase]
+        mediana = statistics.median(segundos)
+        memoria = [i['memoria_fases_mb'].get(fase) for i in instrumentaciones]
+        fases[fase] = {
+            'segundos': round(mediana, 4),
+            'segundos_min': round(min(segundos), 4),
+            'unidad': unidad,
+            'cantidad': round(cantidad, 2),
+            'por_segundo': round(cantidad / mediana, 2) if mediana else None,
+            'memoria_pico_mb': max((m for m in memoria if m is not None), default=None)
+        }
+    if 'escaneando' in fases and fases['escaneando']['segundos']:
+        fases['escaneando']['mb_por_segundo'] = round(bytes_fuente / (1024 * 1024) / fases['escaneando']['segundos'], 2)
+    if 'tendencia' in fases:
+        fases['tendencia']['blobs'] = instrumentaciones[0]['contadores'].get('blobs_escaneados', 0)
+
+    total = statistics.median(i['total_segundos'] for i in instrumentaciones)
+    return {
+        'formato': FORMATO,
+        'fecha': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'parametros': {
+            'commits': args.commits,
+            'archivos': args.archivos,
+            'lenguajes': args.lenguajes,
+            'lineas': list(args.lineas),
+            'cambios': args.cambios,
+            'autores': args.autores,
+            'semilla': args.semilla,
+            'procesos': args.procesos,
+            'puntos_tendencia': args.puntos_tendencia,
+            'repeticiones': args.repeticiones
+        },
+        'entorno': _entorno(),
+        'repositorio': {
+            'generacion_segundos': round(generacion, 2),
+            'archivos_fuente': len(rutas),
+            'mb_fuente': round(bytes_fuente / (1024 * 1024), 2)
+        },
+        'fases': fases,
+        'total': {
+            'segundos': round(total, 4),
+            'memoria_pico_mb': max((i['memoria_pico_mb'] for i in instrumentaciones if i['memoria_pico_mb']), default=None)
+        },
+        'resultado': _resumen_resultado(corridas[0][0])
+    }
+
+def imprimir(informe, salida=sys.stderr):
+    for fase, datos in informe['fases'].items():
+        por_segundo = f"{datos['por_segundo']:>12,.1f} {datos['unidad']}/s" if datos['por_segundo'] else ' ' * 20
+        memoria = f"pico {datos['memoria_pico_mb']:,.1f} MB" if datos['memoria_pico_mb'] else ''
+        print(f"{fase:<12} {datos['segundos']:8.3f}s  {datos['cantidad']:>10,} {datos['unidad']:<10} "
+              f"{por_segundo}  {memoria}", file=salida)
+    print(f"{'total':<12} {informe['total']['segundos']:8.3f}s  pico {informe['total']['memoria_pico_mb']} MB",
+          file=salida)
+
+def comparar(informe, base, tolerancia, salida=sys.stderr):
+    """Lista de regresiones de `informe` respecto de `base` (vacía si no hay)"""
+    if base.get('formato') != FORMATO:
+        raise ValueError(f"La base tiene formato {base.get('formato')}, se esperaba {FORMATO}")
+    sin_repeticiones = lambda parametros: {k: v for k, v in parametros.items() if k != 'repeticiones'}
+    if sin_repeticiones(base['parametros']) != sin_repeticiones(informe['parametros']):
+        print("ADVERTENCIA: la base se generó con otros parámetros; las cifras no son comparables", file=salida)
+    if base['resultado'] != informe['resultado']:
+        print(f"ADVERTENCIA: los resultados del análisis cambiaron: {base['resultado']} -> {informe['resultado']}",
+              file=salida)
+    regresiones = []
+    for fase, datos in informe['fases'].items():
+        anterior = base['fases'].get(fase)
+        if not anterior or max(anterior['segundos'], datos['segundos']) < MIN_SEGUNDOS_COMPARAR:
+            continue
+        if anterior['por_segundo'] and datos['por_segundo'] is not None:
+            variacion = datos['por_segundo'] / anterior['por_segundo'] - 1
+            print(f"{fase:<12} rendimiento {variacion:+.1%}", file=salida)
+            if variacion < -tolerancia:
+                regresiones.append(f"{fase}: rendimiento {variacion:+.1%}")
+        if anterior['memoria_pico_mb'] and datos['memoria_pico_mb']:
+            variacion = datos['memoria_pico_mb'] / anterior['memoria_pico_mb'] - 1
+            if variacion > tolerancia:
+                regresiones.append(f"{fase}: memoria pico {variacion:+.1%}")
+    for regresion in regresiones:
+        print(f"REGRESIÓN {regresion}", file=salida)
+    return regresiones
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--commits', type=int, default=500)
+    parser.add_argument('--archivos', type=int, default=1000)
+    parser.add_argument('--lenguajes', type=_lenguajes, default='py:40,js:25,ts:10,java:15,go:5,c:5',
+                        help=f"pesos por lenguaje ({', '.join(repo_sintetico.LENGUAJES)})")
+    parser.add_argument('--lineas', type=_rango, default='20:300', help='líneas por archivo, min:max')
+    parser.add_argument('--cambios', type=int, default=5, help='archivos reescritos por commit')
+    parser.add_argument('--autores', type=int, default=8)
+    parser.add_argument('--semilla', type=int, default=1)
+    parser.add_argument('--procesos', type=int, default=1, help='procesos del escáner')
+    parser.add_argument('--puntos-tendencia', type=int, default=20)
+    parser.add_argument('--repeticiones', type=int, default=3)
+    parser.add_argument('--salida', help='archivo JSON de resultados (por defecto, stdout)')
+    parser.add_argument('--comparar', help='JSON de una corrida anterior')
+    parser.add_argument('--tolerancia', type=float, default=0.15, help='variación admitida antes de marcar regresión')
+    args = parser.parse_args()
+
+    informe = ejecutar(args)
+    imprimir(informe)
+    texto = json.dumps(informe, indent=2, ensure_ascii=False)
+    if args.salida:
+        with open(args.salida, 'w', encoding='utf-8') as f:
+            f.write(texto + '\n')
+    else:
+        print(texto)
+
+    if args.comparar:
+        with open(args.comparar, encoding='utf-8') as f:
+            base = json.load(f)
+        if comparar(informe, base, args.tolerancia):
+            sys.exit(1)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,82 @@
+"""
+Benchmark del motor de estadísticas de commits.
+
+Uso: python -m benchmarks.bench_commits [--commits N]   (p. ej. --commits 200000)
+
+Mide commits/segundo y memoria pico (tracemalloc) de:
+  - agregador: AgregadorCommits alimentado con timestamps en memoria
+  - analyze_commits[gitpython]: recorrido de objetos Commit de GitPython
+  - analyze_commits[git]: plumbing de git + agregación con NumPy
+  - analyze_commits[git+graph]: lo mismo sobre un mirror con commit-graph
+Ambos backends corren sobre el mismo repo sintético y deben coincidir.
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import shutil
+import tempfile
+import time
+import tracemalloc
+
+from . import repo_sintetico
+from app.utils.estadisticas_commits import AgregadorCommits
+from app.utils.github_analyzer import GitHubAnalyzer, BACKENDS_COMMITS
+
+def _medir(nombre, commits, funcion):
+    tracemalloc.start()
+    inicio = time.perf_counter()
+    # analyze_commits imprime su resumen; no mezclarlo con la tabla
+    with contextlib.redirect_stdout(io.StringIO()):
+        funcion()
+    duracion = time.perf_counter() - inicio
+    _, pico = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"{nombre:<28} {commits:>9} commits  {duracion:8.3f}s  "
+          f"{commits / duracion:>12,.0f} commits/s  pico {pico / 1024:,.0f} KiB")
+
+def bench_agregador(commits):
+    ahora = int(time.time())
+
+    def correr():
+        agregador = AgregadorCommits()
+        for i in range(commits):
+            agregador.agregar(ahora - i * 60, lambda i=i: (f'{i:040x}', 'Bench', 'mensaje'))
+        agregador.resultado()
+
+    _medir('agregador', commits, correr)
+
+def bench_analyze_commits(commits):
+    tmp = tempfile.mkdtemp(prefix='bench_commits_')
+    try:
+        repo_sintetico.generar_repositorio(f'{tmp}/origen', commits)
+        resultados = {}
+        for backend in BACKENDS_COMMITS:
+            analyzer = GitHubAnalyzer(f'file://{tmp}/origen', backend_commits=backend)
+            analyzer.clone_repository(f'{tmp}/clon', bare=True)
+
+            def correr(analyzer=analyzer, backend=backend):
+                resultados[backend] = analyzer.analyze_commits()
+
+            _medir(f'analyze_commits[{backend}]', commits, correr)
+
+        # Re-análisis en modo mirror: el fetch deja escrito el commit-graph
+        analyzer = GitHubAnalyzer(f'file://{tmp}/origen', backend_commits='git')
+        analyzer.clone_repository(f'{tmp}/clon', bare=True)
+        _medir('analyze_commits[git+graph]', commits, analyzer.analyze_commits)
+        if len({json.dumps(r, sort_keys=True) for r in resultados.values()}) != 1:
+            print("ADVERTENCIA: los backends devolvieron resultados distintos")
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--commits', type=int, default=20000)
+    args = parser.parse_args()
+
+    bench_agregador(args.commits)
+    bench_analyze_commits(args.commits)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,210 @@
+"""
+Benchmark de serialización del histórico de cálculos, en segundos por cada 10k filas.
+
+Uso: python -m benchmarks.bench_serializacion [--filas 10000] [--repeticiones 5]
+         [--salida resultado.json]
+
+Compara sobre las mismas filas, en una BD SQLite temporal:
+  - texto: columnas TEXT con JSON decodificado con json.loads en cada to_dict
+    y respuesta con json (como antes de las columnas JSON)
+  - columna_json[json]: columnas JSON decodificadas una vez al leer, json
+  - columna_json[orjson]: lo mismo con orjson (si está instalado)
+  - columnar: serializacion.flujo_json, el camino de GET /historico; sin
+    objetos ni to_dict, así que solo tiene el tiempo total (en respuesta)
+Por camino mide la lectura (consulta + decodificación), to_dict y la respuesta
+(el texto que devolvería jsonify), y en una corrida aparte la memoria pico
+(tracemalloc). La tabla va a stderr y el JSON a stdout (o a --salida).
+"""
+
+import argparse
+import json
+import os
+import platform
+import random
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+
+from flask import Flask
+from flask.json.provider import DefaultJSONProvider
+from sqlalchemy import DateTime, Float, Integer, String, Text, create_engine
+from sqlalchemy.orm import DeclarativeBase, Session, mapped_column
+
+from app.models import db, HistoricoCalculo
+from app.utils import json_rapido, serializacion
+
+POR_FILAS = 10000
+NIVELES = ['excelente', 'bueno', 'aceptable', 'malo', 'critico']
+
+class _BaseTexto(DeclarativeBase):
+    pass
+
+class HistoricoTexto(_BaseTexto):
+    """HistoricoCalculo como era antes de la migración 019: JSON en columnas TEXT"""
+    __tablename__ = 'historico_calculos'
+
+    id = mapped_column(Integer, primary_key=True)
+    proyecto_id = mapped_column(Integer)
+    formula = mapped_column(String(50))
+    datos_entrada = mapped_column(Text)
+    resultado = mapped_column(Float)
+    interpretacion_json = mapped_column(Text)
+    fecha_calculo = mapped_column(DateTime)
+
+    def to_dict(self):
+        # Cada llamada vuelve a parsear las columnas JSON
+        return {
+            'id': self.id,
+            'proyecto_id': self.proyecto_id,
+            'formula': self.formula,
+            'datos_entrada': json.loads(self.datos_entrada) if self.datos_entrada else {},
+            'resultado': self.resultado,
+            'interpretacion': json.loads(self.interpretacion_json) if self.interpretacion_json else {},
+            'fecha_calculo': self.fecha_calculo.strftime('%Y-%m-%d %H:%M:%S') if self.fecha_calculo else None
+        }
+
+def _poblar(engine, filas, semilla):
+    """Filas con la forma que guarda FormulaController.calcular"""
+    azar = random.Random(semilla)
+    inicio = datetime(2026, 1, 1)
+    db.metadata.create_all(engine, tables=[HistoricoCalculo.__table__])
+    with Session(engine) as sesion:
+        sesion.bulk_insert_mappings(HistoricoCalculo, [{
+            'proyecto_id': 1,
+            'formula': azar.choice(['ICP', 'NC', 'FR', 'MTBF', 'TPR']),
+            'datos_entrada': {f'valor{j}': round(azar.uniform(0, 1000), 2) for j in range(azar.randint(2, 4))},
+            'resultado': round(azar.uniform(0, 100), 4),
+            'interpretacion_json': {
+                'nivel': azar.choice(NIVELES),
+                'descripcion': 'Descripción del rango de referencia de la norma ISO/IEC 25010',
+                'color': '#88DD00',
+                'recomendacion': 'Buen desempeño. Sin cambios urgentes.'
+            },
+            'fecha_calculo': inicio + timedelta(minutes=i)
+        } for i in range(filas)])
+        sesion.commit()
+
+def _medir(engine, proveedor, modelo):
+    with Session(engine) as sesion:
+        inicio = time.perf_counter()
+        filas = sesion.query(modelo).order_by(modelo.fecha_calculo.desc(), modelo.id.desc()).all()
+        lectura = time.perf_counter()
+        items = [h.to_dict() for h in filas]
+        conversion = time.perf_counter()
+        proveedor.dumps(items)
+        fin = time.perf_counter()
+    return {'lectura': lectura - inicio, 'to_dict': conversion - lectura, 'respuesta': fin - conversion}
+
+def _medir_columnar(app):
+    orden = [HistoricoCalculo.fecha_calculo, HistoricoCalculo.id]
+    with app.app_context():
+        inicio = time.perf_counter()
+        consulta = serializacion.consulta(HistoricoCalculo, None, [], orden)
+        for _ in serializacion.flujo_json(consulta, HistoricoCalculo, None):
+            pass  # cada parte iría al socket
+        fin = time.perf_counter()
+        db.session.remove()
+    return {'lectura': None, 'to_dict': None, 'respuesta': fin - inicio}
+
+def _memoria_pico(medir):
+    """MB de memoria Python pico de una corrida con todas las filas, sin escalar a 10k
+    (tracemalloc la hace más lenta: corrida aparte)"""
+    tracemalloc.start()
+    try:
+        medir()
+        return round(tracemalloc.get_traced_memory()[1] / (1024 * 1024), 1)
+    finally:
+        tracemalloc.stop()
+
+def ejecutar(args):
+    app = Flask(__name__)
+    estandar, rapido = DefaultJSONProvider(app), json_rapido.ProveedorJSON(app)
+    tmp = tempfile.mkdtemp(prefix='bench_serializacion_')
+    url = f'sqlite:///{tmp}/historico.sqlite'
+    app.config.update(SQLALCHEMY_DATABASE_URI=url, SQLALCHEMY_ENGINE_OPTIONS={
+        'json_serializer': json_rapido.dumps, 'json_deserializer': json_rapido.loads
+    })
+    db.init_app(app)
+    engines = [
+        create_engine(url),
+        create_engine(url, json_serializer=json.dumps, json_deserializer=json.loads),
+        create_engine(url, json_serializer=json_rapido.dumps, json_deserializer=json_rapido.loads)
+    ]
+    caminos = {
+        'texto': lambda: _medir(engines[0], estandar, HistoricoTexto),
+        'columna_json[json]': lambda: _medir(engines[1], estandar, HistoricoCalculo),
+    }
+    if json_rapido.orjson:
+        caminos['columna_json[orjson]'] = lambda: _medir(engines[2], rapido, HistoricoCalculo)
+    caminos[f'columnar[{json_rapido.BACKEND}]'] = lambda: _medir_columnar(app)
+    try:
+        _poblar(engines[0], args.filas, args.semilla)
+        medidas = {nombre: [] for nombre in caminos}
+        for _ in range(args.repeticiones):
+            for nombre, medir in caminos.items():
+                medidas[nombre].append(medir())
+        memoria = {nombre: _memoria_pico(medir) for nombre, medir in caminos.items()}
+    finally:
+        for engine in engines:
+            engine.dispose()
+        with app.app_context():
+            db.engine.dispose()
+        os.remove(f'{tmp}/historico.sqlite')
+        os.rmdir(tmp)
+
+    escala = POR_FILAS / args.filas
+    resultados = {}
+    for nombre, corridas in medidas.items():
+        fases = {fase: round(statistics.median(c[fase] for c in corridas) * escala, 4)
+                 if corridas[0][fase] is not None else None
+                 for fase in ('lectura', 'to_dict', 'respuesta')}
+        total = statistics.median(sum(v for v in c.values() if v is not None) for c in corridas) * escala
+        resultados[nombre] = {'fases': fases, 'segundos': round(total, 4),
+                              'filas_por_segundo': round(POR_FILAS / total) if total else None,
+                              'memoria_pico_mb': memoria[nombre]}
+    base = resultados['texto']['segundos']
+    for datos in resultados.values():
+        datos['aceleracion'] = round(base / datos['segundos'], 2) if datos['segundos'] else None
+
+    return {
+        'fecha': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'parametros': {'filas': args.filas, 'repeticiones': args.repeticiones, 'semilla': args.semilla},
+        'entorno': {
+            'python': platform.python_version(),
+            'orjson': getattr(json_rapido.orjson, '__version__', None),
+            'plataforma': platform.platform()
+        },
+        'unidad': f'segundos por {POR_FILAS} filas',
+        'caminos': resultados
+    }
+
+def imprimir(informe, salida=sys.stderr):
+    print(f"{'camino':<22} {'lectura':>9} {'to_dict':>9} {'respuesta':>10} {'total':>9}  ({informe['unidad']})",
+          file=salida)
+    for nombre, datos in informe['caminos'].items():
+        fases = ' '.join(f"{v:9.4f}" if v is not None else f"{'-':>9}" for v in datos['fases'].values())
+        print(f"{nombre:<22} {fases}  {datos['segundos']:9.4f}  x{datos['aceleracion']}  "
+              f"pico {datos['memoria_pico_mb']} MB", file=salida)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--filas', type=int, default=POR_FILAS)
+    parser.add_argument('--repeticiones', type=int, default=5)
+    parser.add_argument('--semilla', type=int, default=1)
+    parser.add_argument('--salida', help='archivo JSON de resultados (por defecto, stdout)')
+    args = parser.parse_args()
+
+    informe = ejecutar(args)
+    imprimir(informe)
+    texto = json.dumps(informe, indent=2, ensure_ascii=False)
+    if args.salida:
+        with open(args.salida, 'w', encoding='utf-8') as f:
+            f.write(texto + '\n')
+    else:
+        print(texto)
+
+if __name__ == '__main__':
+    main()
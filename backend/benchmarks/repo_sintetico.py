@@ -0,0 +1,157 @@
+"""Generador de repositorios git sintéticos usando git fast-import"""
+
+import os
+import random
+import subprocess
+import time
+
+# Sintaxis mínima por lenguaje para generar funciones con ramas y bucles que
+# el escáner reconozca. None en 'cierre' = bloques por indentación (Python).
+LENGUAJES = {
+    'py': {'extension': '.py', 'funcion': 'def {nombre}(x):', 'variable': 'total = 0',
+           'si': 'if x > {n} and total < {m}:', 'bucle': 'for i in range({n}):',
+           'suma': 'total += {n}', 'retorno': 'return total', 'comentario': '# {texto}', 'cierre': None},
+    'js': {'extension': '.js', 'funcion': 'function {nombre}(x) {{', 'variable': 'let total = 0;',
+           'si': 'if (x > {n} && total < {m}) {{', 'bucle': 'for (let i = 0; i < {n}; i++) {{',
+           'suma': 'total += {n};', 'retorno': 'return total;', 'comentario': '// {texto}', 'cierre': '}'},
+    'ts': {'extension': '.ts', 'funcion': 'function {nombre}(x: number): number {{', 'variable': 'let total = 0;',
+           'si': 'if (x > {n} && total < {m}) {{', 'bucle': 'for (let i = 0; i < {n}; i++) {{',
+           'suma': 'total += {n};', 'retorno': 'return total;', 'comentario': '// {texto}', 'cierre': '}'},
+    'java': {'extension': '.java', 'funcion': 'public static int {nombre}(int x) {{', 'variable': 'int total = 0;',
+             'si': 'if (x > {n} && total < {m}) {{', 'bucle': 'for (int i = 0; i < {n}; i++) {{',
+             'suma': 'total += {n};', 'retorno': 'return total;', 'comentario': '// {texto}', 'cierre': '}',
+             'cabecera': 'public class {clase} {{', 'pie': '}'},
+    'go': {'extension': '.go', 'funcion': 'func {nombre}(x int) int {{', 'variable': 'total := 0',
+           'si': 'if x > {n} && total < {m} {{', 'bucle': 'for i := 0; i < {n}; i++ {{',
+           'suma': 'total += {n}', 'retorno': 'return total', 'comentario': '// {texto}', 'cierre': '}',
+           'cabecera': 'package {clase}'},
+    'c': {'extension': '.c', 'funcion': 'int {nombre}(int x) {{', 'variable': 'int total = 0;',
+          'si': 'if (x > {n} && total < {m}) {{', 'bucle': 'for (int i = 0; i < {n}; i++) {{',
+          'suma': 'total += {n};', 'retorno': 'return total;', 'comentario': '/* {texto} */', 'cierre': '}'},
+    'rs': {'extension': '.rs', 'funcion': 'fn {nombre}(x: i32) -> i32 {{', 'variable': 'let mut total = 0;',
+           'si': 'if x > {n} && total < {m} {{', 'bucle': 'for i in 0..{n} {{',
+           'suma': 'total += {n};', 'retorno': 'total', 'comentario': '// {texto}', 'cierre': '}'},
+}
+
+# Archivos por carpeta; las carpetas de primer nivel son los estratos del muestreo
+ARCHIVOS_POR_CARPETA = 50
+CARPETAS_RAIZ = 8
+
+def _bloque_data(texto):
+    datos = texto.encode('utf-8')
+    return b'data %d\n' % len(datos) + datos + b'\n'
+
+def generar_fuente(lenguaje, lineas, azar, clase='Sintetico'):
+    """Código sintético de unas `lineas` líneas: funciones con if/for anidados,
+    comentarios y líneas en blanco, con la sintaxis de LENGUAJES[lenguaje]"""
+    sintaxis = LENGUAJES[lenguaje]
+    llaves = sintaxis['cierre'] is not None
+    salida = []
+    base = ''
+    if sintaxis.get('cabecera'):
+        salida += [sintaxis['cabecera'].format(clase=clase.lower() if lenguaje == 'go' else clase), '']
+        if sintaxis.get('pie'):
+            base = '    '
+
+    def agregar(nivel, plantilla, **valores):
+        salida.append(base + '    ' * nivel + plantilla.format(**valores))
+
+    def cerrar(nivel):
+        if llaves:
+            salida.append(base + '    ' * nivel + sintaxis['cierre'])
+
+    indice = 0
+    while len(salida) < lineas:
+        agregar(0, sintaxis['comentario'], texto=f'funcion sintetica {indice}')
+        agregar(0, sintaxis['funcion'], nombre=f'funcion_{indice}')
+        agregar(1, sintaxis['variable'])
+        for _ in range(azar.randint(1, 4)):
+            n, m = azar.randint(1, 99), azar.randint(1, 99)
+            if azar.random() < 0.5:
+                agregar(1, sintaxis['si'], n=n, m=m)
+                agregar(2, sintaxis['suma'], n=n)
+                cerrar(1)
+            else:
+                agregar(1, sintaxis['bucle'], n=n)
+                agregar(2, sintaxis['si'], n=m, m=n)
+                agregar(3, sintaxis['suma'], n=m)
+                cerrar(2)
+                cerrar(1)
+        agregar(1, sintaxis['retorno'])
+        cerrar(0)
+        salida.append('')
+        indice += 1
+    if sintaxis.get('pie'):
+        salida.append(sintaxis['pie'])
+    return '\n'.join(salida) + '\n'
+
+def _elegir_lenguajes(lenguajes, cantidad, azar):
+    """Lista de `cantidad` lenguajes según los pesos {lenguaje: peso}"""
+    desconocidos = set(lenguajes) - set(LENGUAJES)
+    if desconocidos:
+        raise ValueError(f'Lenguajes no soportados: {sorted(desconocidos)}')
+    nombres = sorted(lenguajes)
+    return azar.choices(nombres, weights=[lenguajes[n] for n in nombres], k=cantidad)
+
+def _ruta_archivo(i, lenguaje):
+    carpeta = i // ARCHIVOS_POR_CARPETA
+    return f'modulo{carpeta % CARPETAS_RAIZ}/paquete{carpeta}/archivo{i:06d}{LENGUAJES[lenguaje]["extension"]}'
+
+def generar_repositorio(destino, commits, intervalo=3600, inicio_ts=None, archivos=0, lenguajes=None,
+                        lineas=(20, 200), cambios=3, autores=1, semilla=0):
+    """Crea en destino un repositorio con `commits` commits lineales.
+
+    Los commits van de inicio_ts (por defecto: commits*intervalo segundos atrás)
+    hasta ahora, separados `intervalo` segundos. Devuelve la URL file:// del repo.
+
+    Con archivos > 0 el primer commit agrega ese número de fuentes repartidos
+    según lenguajes ({'py': 60, 'js': 40}, pesos relativos; por defecto todos
+    por igual), de entre lineas[0] y lineas[1] líneas, y cada commit siguiente
+    reescribe `cambios` de ellos (churn y tendencia tienen historial que leer).
+    Los commits se reparten entre `autores` autores. Con la misma semilla y el
+    mismo inicio_ts el repositorio (y sus SHAs) es idéntico en cada corrida.
+    """
+    os.makedirs(destino, exist_ok=True)
+    subprocess.run(['git', 'init', '-q', '-b', 'main', destino], check=True)
+    # Permitir clones con --filter=blob:none sobre file://
+    subprocess.run(['git', '-C', destino, 'config', 'uploadpack.allowFilter', 'true'], check=True)
+
+    if inicio_ts is None:
+        inicio_ts = int(time.time()) - commits * intervalo
+    azar = random.Random(semilla)
+    lenguajes_archivos = _elegir_lenguajes(lenguajes or dict.fromkeys(LENGUAJES, 1), archivos, azar)
+
+    def fuente(i):
+        lenguaje = lenguajes_archivos[i]
+        contenido = generar_fuente(lenguaje, azar.randint(*lineas), azar, clase=f'Archivo{i}')
+        return b'M 644 inline ' + _ruta_archivo(i, lenguaje).encode() + b'\n' + _bloque_data(contenido)
+
+    proceso = subprocess.Popen(
+        ['git', '-C', destino, 'fast-import', '--quiet'],
+        stdin=subprocess.PIPE
+    )
+    for i in range(1, commits + 1):
+        ts = inicio_ts + i * intervalo
+        autor = 'Bench' if autores <= 1 else f'Autor {i % autores}'
+        bloque = [
+            b'commit refs/heads/main\n',
+            b'mark :%d\n' % i,
+            b'committer %s <bench@example.com> %d +0000\n' % (autor.encode(), ts),
+            _bloque_data(f'commit sintetico {i}'),
+        ]
+        if i > 1:
+            bloque.append(b'from :%d\n' % (i - 1))
+        if archivos:
+            if i == 1:
+                bloque.extend(fuente(j) for j in range(archivos))
+            else:
+                bloque.extend(fuente(j) for j in azar.sample(range(archivos), min(cambios, archivos)))
+        bloque.append(b'M 644 inline contador.txt\n')
+        bloque.append(_bloque_data(f'{i}\n'))
+        proceso.stdin.write(b''.join(bloque))
+    proceso.stdin.close()
+    if proceso.wait() != 0:
+        raise RuntimeError('git fast-import falló')
+
+    subprocess.run(['git', '-C', destino, 'checkout', '-q', 'main'], check=True)
+    return 'file://' + os.path.abspath(destino)
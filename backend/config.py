@@ -53,6 +53,62 @@ class Config:
     # Rutas
     REPOS_DIR = os.environ.get('REPOS_DIR') or os.path.join(os.path.dirname(__file__), '..', 'repos')
     
+    # Clones simultáneos (red/disco) y escaneos simultáneos (CPU, cada uno con SCAN_PROCESOS)
+    CLONE_CONCURRENCIA = int(os.environ.get('CLONE_CONCURRENCIA', 4))
+    SCAN_CONCURRENCIA = int(os.environ.get('SCAN_CONCURRENCIA', 1))
+    # Hilos que ejecutan análisis encolados (POST /analizar responde 202 de inmediato)
+    ANALISIS_WORKERS = int(os.environ.get('ANALISIS_WORKERS', CLONE_CONCURRENCIA + SCAN_CONCURRENCIA))
+    # Reencolar al arrancar los trabajos pendientes y los 'ejecutando' cuyo dueño dejó de latir
+    ANALISIS_REANUDAR = os.environ.get('ANALISIS_REANUDAR', 'true').lower() == 'true'
+    # Segundos sin latido tras los que un trabajo 'ejecutando' se da por huérfano (el dueño late cada tercio)
+    ANALISIS_LEASE_SEGUNDOS = int(os.environ.get('ANALISIS_LEASE_SEGUNDOS', 60))
+    # Horas tras las cuales un análisis se considera desactualizado (POST /analizar-lote)
+    ANALISIS_VIGENCIA_HORAS = int(os.environ.get('ANALISIS_VIGENCIA_HORAS', 24))
+    
+    # Mantener un clon por proyecto y hacer fetch incremental en re-análisis
+    REPOS_MIRROR = os.environ.get('REPOS_MIRROR', 'true').lower() == 'true'
+    # Presupuesto de disco de REPOS_DIR: al superarlo se compactan (sin working tree)
+    # y luego se expulsan los clones menos usados recientemente (0 = sin límite)
+    REPOS_MAX_MB = int(os.environ.get('REPOS_MAX_MB', 10240))
+    REPOS_COMPACTAR = os.environ.get('REPOS_COMPACTAR', 'true').lower() == 'true'
+    # Clonar con --filter=blob:none (solo se descargan los blobs de HEAD al hacer checkout)
+    CLONE_BLOBLESS = os.environ.get('CLONE_BLOBLESS', 'true').lower() == 'true'
+    
+    # Estadísticas de commits: 'git' (plumbing, rápido) o 'gitpython' (recorre objetos Commit)
+    COMMITS_BACKEND = os.environ.get('COMMITS_BACKEND', 'git').lower()
+    
+    # Procesos del escáner de código fuente (LOC + complejidad)
+    SCAN_PROCESOS = int(os.environ.get('SCAN_PROCESOS', os.cpu_count() or 1))
+    # Archivos más grandes se omiten del escaneo (LOC y complejidad)
+    SCAN_MAX_BYTES = int(os.environ.get('SCAN_MAX_BYTES', 2 * 1024 * 1024))
+    
+    # Topes de cada proceso del escáner (0 = sin tope): memoria por encima de lo
+    # heredado del servidor y segundos de CPU para medir un solo archivo (muy por
+    # debajo de TIMEOUT_ESCANEO, que es de reloj y para toda la fase)
+    SCAN_MAX_MEMORIA_MB = int(os.environ.get('SCAN_MAX_MEMORIA_MB', 2048))
+    SCAN_MAX_CPU_SEGUNDOS = int(os.environ.get('SCAN_MAX_CPU_SEGUNDOS', 60))
+    
+    # Tiempo límite por fase del análisis, en segundos (0 = sin límite). Al
+    # vencer, el trabajo y el proyecto quedan en 'error' con el motivo
+    TIMEOUT_CLONADO = int(os.environ.get('TIMEOUT_CLONADO', 1800))
+    TIMEOUT_COMMITS = int(os.environ.get('TIMEOUT_COMMITS', 600))
+    TIMEOUT_CHURN = int(os.environ.get('TIMEOUT_CHURN', 1800))
+    TIMEOUT_TENDENCIA = int(os.environ.get('TIMEOUT_TENDENCIA', 1800))
+    TIMEOUT_ESCANEO = int(os.environ.get('TIMEOUT_ESCANEO', 1800))
+    
+    # Volcar un perfil de cProfile de cada análisis en ANALISIS_PERFIL_DIR
+    # (por corrida: {"perfil": true} en POST /analizar)
+    ANALISIS_PERFIL = os.environ.get('ANALISIS_PERFIL', 'false').lower() == 'true'
+    ANALISIS_PERFIL_DIR = os.environ.get('ANALISIS_PERFIL_DIR', os.path.join(REPOS_DIR, 'perfiles'))
+    
+    # Presupuesto por defecto del modo muestreo ({"muestreo": true} en POST /analizar)
+    MUESTREO_MAX_ARCHIVOS = int(os.environ.get('MUESTREO_MAX_ARCHIVOS', 2000))
+    MUESTREO_MAX_SEGUNDOS = float(os.environ.get('MUESTREO_MAX_SEGUNDOS', 30))
+    
+    # Caché de métricas por blob SHA compartida entre proyectos (vacío = desactivada)
+    METRICS_CACHE_PATH = os.environ.get('METRICS_CACHE_PATH', os.path.join(REPOS_DIR, '.cache_metricas.sqlite'))
+    METRICS_CACHE_MAX_MB = int(os.environ.get('METRICS_CACHE_MAX_MB', 512))
+    
 class DevelopmentConfig(Config):
     """Configuración desarrollo"""
     DEBUG = True
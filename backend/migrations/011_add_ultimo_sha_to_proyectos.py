@@ -0,0 +1,25 @@
+"""
+Migración 011: Agregar columna ultimo_sha a proyectos (último commit analizado en modo mirror)
+"""
+
+def upgrade(db):
+    """Agrega la columna ultimo_sha"""
+    try:
+        from sqlalchemy import text
+        
+        # Verificar si la columna ya existe
+        inspector = db.inspect(db.engine)
+        columns = [col['name'] for col in inspector.get_columns('proyectos')]
+        
+        if 'ultimo_sha' not in columns:
+            with db.engine.connect() as connection:
+                connection.execute(text(
+                    'ALTER TABLE proyectos ADD COLUMN ultimo_sha VARCHAR(40)'
+                ))
+                connection.commit()
+            print("✓ Columna ultimo_sha agregada a proyectos")
+        else:
+            print("  - Columna ultimo_sha ya existe")
+    
+    except Exception as e:
+        print(f"  ! Error al agregar columna: {str(e)}")
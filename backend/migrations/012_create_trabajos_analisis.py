@@ -0,0 +1,46 @@
+"""
+Migración 012: Crear tabla trabajos_analisis (cola de análisis en segundo plano)
+- proyecto_activo: igual a proyecto_id mientras el trabajo está pendiente o
+  ejecutando; su índice único garantiza un solo análisis activo por proyecto
+- propietario/latido: proceso que ejecuta el trabajo y su último latido
+- cancelacion_solicitada: cancelación pedida desde cualquier proceso
+"""
+
+def upgrade(db):
+    """Crea la tabla trabajos_analisis con sus columnas e índice único"""
+    try:
+        from sqlalchemy import text
+        
+        # Verificar si la tabla ya existe
+        inspector = db.inspect(db.engine)
+        if 'trabajos_analisis' in inspector.get_table_names():
+            print("  - Tabla trabajos_analisis ya existe")
+            return
+        
+        with db.engine.connect() as connection:
+            connection.execute(text("""
+                CREATE TABLE trabajos_analisis (
+                    id INT PRIMARY KEY AUTO_INCREMENT,
+                    proyecto_id INT NOT NULL,
+                    proyecto_activo INT NULL,
+                    estado VARCHAR(20) NOT NULL DEFAULT 'pendiente',
+                    fase VARCHAR(50) DEFAULT 'en_cola',
+                    progreso INT DEFAULT 0,
+                    parametros TEXT,
+                    resultado TEXT,
+                    error TEXT,
+                    propietario VARCHAR(100),
+                    latido DATETIME,
+                    cancelacion_solicitada BOOLEAN NOT NULL DEFAULT FALSE,
+                    fecha_creacion DATETIME DEFAULT CURRENT_TIMESTAMP,
+                    fecha_inicio DATETIME,
+                    fecha_fin DATETIME,
+                    UNIQUE KEY uq_trabajos_proyecto_activo (proyecto_activo),
+                    FOREIGN KEY (proyecto_id) REFERENCES proyectos(id)
+                ) CHARACTER SET utf8mb4 COLLATE utf8mb4_unicode_ci
+            """))
+            connection.commit()
+        print("✓ Tabla trabajos_analisis creada")
+    
+    except Exception as e:
+        print(f"  ! Error al crear tabla: {str(e)}")
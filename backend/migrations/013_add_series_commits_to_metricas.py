@@ -0,0 +1,26 @@
+"""
+Migración 013: Agregar columna series_commits a metricas_base (histogramas de commits por día/semana/mes)
+"""
+
+def upgrade(db):
+    """Agrega la columna series_commits"""
+    try:
+        from sqlalchemy import text
+        
+        # Verificar si la columna ya existe
+        inspector = db.inspect(db.engine)
+        columns = [col['name'] for col in inspector.get_columns('metricas_base')]
+        
+        if 'series_commits' not in columns:
+            with db.engine.connect() as connection:
+                # MEDIUMTEXT: la serie diaria de un repo de décadas supera los 64 KB de TEXT
+                connection.execute(text(
+                    'ALTER TABLE metricas_base ADD COLUMN series_commits MEDIUMTEXT'
+                ))
+                connection.commit()
+            print("✓ Columna series_commits agregada a metricas_base")
+        else:
+            print("  - Columna series_commits ya existe")
+    
+    except Exception as e:
+        print(f"  ! Error al agregar columna: {str(e)}")
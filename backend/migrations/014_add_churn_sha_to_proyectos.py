@@ -0,0 +1,26 @@
+"""
+Migración 014: Agregar columna churn_sha a proyectos (último commit con churn guardado)
+Las tablas churn_commits y churn_acumulado las crea db.create_all() al iniciar la app
+"""
+
+def upgrade(db):
+    """Agrega la columna churn_sha"""
+    try:
+        from sqlalchemy import text
+        
+        # Verificar si la columna ya existe
+        inspector = db.inspect(db.engine)
+        columns = [col['name'] for col in inspector.get_columns('proyectos')]
+        
+        if 'churn_sha' not in columns:
+            with db.engine.connect() as connection:
+                connection.execute(text(
+                    'ALTER TABLE proyectos ADD COLUMN churn_sha VARCHAR(40)'
+                ))
+                connection.commit()
+            print("✓ Columna churn_sha agregada a proyectos")
+        else:
+            print("  - Columna churn_sha ya existe")
+    
+    except Exception as e:
+        print(f"  ! Error al agregar columna: {str(e)}")
@@ -0,0 +1,33 @@
+"""
+Migración 015: Agregar columnas es_estimacion y estimacion a metricas_base
+(LOC/complejidad estimadas por muestreo estratificado)
+"""
+
+def upgrade(db):
+    """Agrega las columnas es_estimacion y estimacion"""
+    try:
+        from sqlalchemy import text
+        
+        # Verificar si las columnas ya existen
+        inspector = db.inspect(db.engine)
+        columns = [col['name'] for col in inspector.get_columns('metricas_base')]
+        
+        with db.engine.connect() as connection:
+            if 'es_estimacion' not in columns:
+                connection.execute(text(
+                    'ALTER TABLE metricas_base ADD COLUMN es_estimacion BOOLEAN DEFAULT FALSE'
+                ))
+                print("✓ Columna es_estimacion agregada a metricas_base")
+            else:
+                print("  - Columna es_estimacion ya existe")
+            if 'estimacion' not in columns:
+                connection.execute(text(
+                    'ALTER TABLE metricas_base ADD COLUMN estimacion TEXT'
+                ))
+                print("✓ Columna estimacion agregada a metricas_base")
+            else:
+                print("  - Columna estimacion ya existe")
+            connection.commit()
+    
+    except Exception as e:
+        print(f"  ! Error al agregar columnas: {str(e)}")
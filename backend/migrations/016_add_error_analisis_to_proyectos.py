@@ -0,0 +1,26 @@
+"""
+Migración 016: Agregar columna error_analisis a proyectos (motivo del último análisis
+fallido, cancelado o detenido por tiempo límite)
+"""
+
+def upgrade(db):
+    """Agrega la columna error_analisis"""
+    try:
+        from sqlalchemy import text
+        
+        # Verificar si la columna ya existe
+        inspector = db.inspect(db.engine)
+        columns = [col['name'] for col in inspector.get_columns('proyectos')]
+        
+        if 'error_analisis' not in columns:
+            with db.engine.connect() as connection:
+                connection.execute(text(
+                    'ALTER TABLE proyectos ADD COLUMN error_analisis TEXT'
+                ))
+                connection.commit()
+            print("✓ Columna error_analisis agregada a proyectos")
+        else:
+            print("  - Columna error_analisis ya existe")
+    
+    except Exception as e:
+        print(f"  ! Error al agregar columna: {str(e)}")
@@ -0,0 +1,26 @@
+"""
+Migración 017: Agregar columna instrumentacion a metricas_base
+(segundos por fase, archivos/bytes/commits procesados y memoria pico de cada análisis)
+"""
+
+def upgrade(db):
+    """Agrega la columna instrumentacion"""
+    try:
+        from sqlalchemy import text
+        
+        # Verificar si la columna ya existe
+        inspector = db.inspect(db.engine)
+        columns = [col['name'] for col in inspector.get_columns('metricas_base')]
+        
+        if 'instrumentacion' not in columns:
+            with db.engine.connect() as connection:
+                connection.execute(text(
+                    'ALTER TABLE metricas_base ADD COLUMN instrumentacion TEXT'
+                ))
+                connection.commit()
+            print("✓ Columna instrumentacion agregada a metricas_base")
+        else:
+            print("  - Columna instrumentacion ya existe")
+    
+    except Exception as e:
+        print(f"  ! Error al agregar columna: {str(e)}")
@@ -0,0 +1,42 @@
+"""
+Migración 018: Índices compuestos para los accesos frecuentes
+- historico_calculos (proyecto_id, fecha_calculo, id): histórico de un proyecto por fecha
+- metricas_base (proyecto_id, fecha_calculo, id): última métrica de un proyecto
+- referencias_normas (codigo_formula): referencia de cada cálculo de fórmula
+"""
+
+INDICES = [
+    ('historico_calculos', 'idx_historico_proyecto_fecha', ['proyecto_id', 'fecha_calculo', 'id']),
+    ('metricas_base', 'idx_metricas_proyecto_fecha', ['proyecto_id', 'fecha_calculo', 'id']),
+    ('referencias_normas', 'idx_referencias_codigo_formula', ['codigo_formula']),
+]
+
+def _cubierto(inspector, tabla, columnas):
+    """True si ya hay un índice (o clave única) que empieza por esas columnas"""
+    existentes = [i['column_names'] for i in inspector.get_indexes(tabla)]
+    existentes += [u['column_names'] for u in inspector.get_unique_constraints(tabla)]
+    return any(list(cols[:len(columnas)]) == columnas for cols in existentes)
+
+def upgrade(db):
+    """Crea los índices que falten"""
+    try:
+        from sqlalchemy import text
+        
+        inspector = db.inspect(db.engine)
+        tablas = set(inspector.get_table_names())
+        
+        with db.engine.connect() as connection:
+            for tabla, nombre, columnas in INDICES:
+                if tabla not in tablas:
+                    print(f"  - Tabla {tabla} no existe (la crea create_all con el índice)")
+                elif _cubierto(inspector, tabla, columnas):
+                    print(f"  - Índice sobre {tabla} ({', '.join(columnas)}) ya existe")
+                else:
+                    connection.execute(text(
+                        f'CREATE INDEX {nombre} ON {tabla} ({", ".join(columnas)})'
+                    ))
+                    print(f"✓ Índice {nombre} creado en {tabla}")
+            connection.commit()
+    
+    except Exception as e:
+        print(f"  ! Error al crear índices: {str(e)}")
@@ -0,0 +1,65 @@
+"""
+Migración 019: Columnas JSON nativas en lugar de TEXT con JSON serializado
+- metricas_base.ultimos_commits
+- historico_calculos.datos_entrada
+- historico_calculos.interpretacion_json
+
+En MySQL/TiDB cada columna se copia a una columna JSON nueva que luego toma su
+nombre (TiDB no convierte TEXT a JSON con MODIFY COLUMN); los valores que no
+son JSON válido quedan en NULL. En SQLite el tipo JSON se guarda como TEXT:
+no hay nada que convertir.
+"""
+
+COLUMNAS = [
+    ('metricas_base', 'ultimos_commits'),
+    ('historico_calculos', 'datos_entrada'),
+    ('historico_calculos', 'interpretacion_json'),
+]
+
+def upgrade(db):
+    """Convierte las columnas que aún no son JSON"""
+    try:
+        from sqlalchemy import text, JSON
+
+        if db.engine.dialect.name == 'sqlite':
+            print("  - SQLite guarda JSON como TEXT; no hay columnas que convertir")
+            return
+
+        inspector = db.inspect(db.engine)
+        tablas = set(inspector.get_table_names())
+
+        with db.engine.connect() as connection:
+            for tabla, columna in COLUMNAS:
+                if tabla not in tablas:
+                    print(f"  - Tabla {tabla} no existe (la crea create_all con columnas JSON)")
+                    continue
+                tipos = {col['name']: col['type'] for col in inspector.get_columns(tabla)}
+                if columna in tipos and isinstance(tipos[columna], JSON):
+                    print(f"  - Columna {tabla}.{columna} ya es JSON")
+                    continue
+
+                nueva = f'{columna}_json_nuevo'
+                # Una corrida interrumpida puede haber dejado la columna nueva creada (o solo ella)
+                if columna not in tipos and nueva in tipos:
+                    connection.execute(text(f'ALTER TABLE {tabla} CHANGE {nueva} {columna} JSON'))
+                    connection.commit()
+                    print(f"✓ Columna {tabla}.{columna} convertida a JSON")
+                    continue
+                if nueva not in tipos:
+                    connection.execute(text(f'ALTER TABLE {tabla} ADD COLUMN {nueva} JSON'))
+                connection.execute(text(
+                    f'UPDATE {tabla} SET {nueva} = CAST({columna} AS JSON) '
+                    f'WHERE {columna} IS NOT NULL AND JSON_VALID({columna})'
+                ))
+                invalidas = connection.execute(text(
+                    f'SELECT COUNT(*) FROM {tabla} '
+                    f'WHERE {columna} IS NOT NULL AND NOT JSON_VALID({columna})'
+                )).scalar()
+                connection.execute(text(f'ALTER TABLE {tabla} DROP COLUMN {columna}'))
+                connection.execute(text(f'ALTER TABLE {tabla} CHANGE {nueva} {columna} JSON'))
+                connection.commit()
+                print(f"✓ Columna {tabla}.{columna} convertida a JSON"
+                      + (f" ({invalidas} valores no válidos quedaron en NULL)" if invalidas else ""))
+
+    except Exception as e:
+        print(f"  ! Error al convertir columnas: {str(e)}")
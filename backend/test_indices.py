@@ -0,0 +1,110 @@
+"""
+Planes de consulta de los accesos frecuentes: falla si alguno vuelve a recorrer
+la tabla completa o a ordenar aparte (filesort / TopN / temp b-tree).
+
+Uso: python test_indices.py            BD del .env (MySQL o TiDB), como test_api.py
+     python test_indices.py sqlite://  SQLite en memoria, sin servidor
+Si falla sobre una BD existente: aplicar migrations/018_add_indices_historico_metricas.py
+"""
+
+import os
+import sys
+from datetime import datetime
+
+URI = sys.argv[1] if len(sys.argv) > 1 else None
+if URI:
+    # config.py exige credenciales al importarse; con una URI explícita no se usan
+    for _var in ('MYSQL_USER', 'MYSQL_PASSWORD', 'MYSQL_HOST', 'MYSQL_DB'):
+        os.environ.setdefault(_var, 'test')
+
+from flask import Flask
+from sqlalchemy import text
+
+from app.models import db, Proyecto, HistoricoCalculo, MetricaBase, ReferenciaNorma
+from app.utils import paginacion, serializacion
+from app.controllers.proyecto_controller import consulta_detalle
+
+def crear_app():
+    if not URI:
+        from app import create_app
+        return create_app()
+    app = Flask(__name__)
+    app.config.update(SQLALCHEMY_DATABASE_URI=URI, SQLALCHEMY_TRACK_MODIFICATIONS=False)
+    db.init_app(app)
+    with app.app_context():
+        db.create_all()
+    return app
+
+def consultas():
+    """(descripción, tabla, consulta) con la misma forma que usan controladores y rutas"""
+    orden_historico = [HistoricoCalculo.fecha_calculo, HistoricoCalculo.id]
+    historico = paginacion.condiciones_pagina([HistoricoCalculo.proyecto_id == 1], orden_historico,
+                                              paginacion.codificar_cursor([datetime(2026, 1, 1), 1000]))
+    proyectos = paginacion.condiciones_pagina([], [Proyecto.id], paginacion.codificar_cursor([1000]),
+                                              descendente=False)
+    return [
+        ('histórico de un proyecto por fecha', 'historico_calculos',
+         HistoricoCalculo.query.filter_by(proyecto_id=1).order_by(HistoricoCalculo.fecha_calculo.desc())),
+        ('borde de la página siguiente del histórico (keyset)', 'historico_calculos',
+         paginacion.consulta_borde(historico, orden_historico, 100)),
+        ('página siguiente del histórico (keyset)', 'historico_calculos',
+         serializacion.consulta(HistoricoCalculo, None, historico, orden_historico)),
+        ('página siguiente de proyectos (keyset)', 'proyectos',
+         serializacion.consulta(Proyecto, None, proyectos, [Proyecto.id], descendente=False)),
+        ('detalle de un proyecto: última métrica', 'metricas_base', consulta_detalle(1, 20)),
+        ('detalle de un proyecto: cálculos recientes', 'historico_calculos', consulta_detalle(1, 20)),
+        ('referencia de una fórmula', 'referencias_normas',
+         ReferenciaNorma.query.filter_by(codigo_formula='ICP').limit(1)),
+        ('última métrica de un proyecto', 'metricas_base',
+         MetricaBase.query.filter_by(proyecto_id=1)
+         .order_by(MetricaBase.fecha_calculo.desc(), MetricaBase.id.desc()).limit(1)),
+    ]
+
+def problemas_plan(connection, sql, tabla):
+    """Lista de problemas del plan (vacía si usa un índice y no ordena aparte) y el plan en texto"""
+    dialecto = db.engine.dialect.name
+    if dialecto == 'sqlite':
+        detalles = [fila[-1] for fila in connection.execute(text('EXPLAIN QUERY PLAN ' + sql))]
+        problemas = []
+        if not any(d.startswith(f'SEARCH {tabla} USING') for d in detalles):
+            problemas.append('recorre la tabla completa')
+        if any('TEMP B-TREE' in d for d in detalles):
+            problemas.append('ordena aparte')
+        return problemas, detalles
+
+    filas = [dict(f) for f in connection.execute(text('EXPLAIN ' + sql)).mappings()]
+    if filas and 'task' in filas[0]:
+        # TiDB: un operador por fila en la columna id
+        operadores = [f['id'] for f in filas]
+        problemas = []
+        if any(o.startswith('TableFullScan') for o in operadores):
+            problemas.append('recorre la tabla completa')
+        if any(o.startswith(('Sort', 'TopN')) for o in operadores):
+            problemas.append('ordena aparte')
+        return problemas, operadores
+
+    fila = next((f for f in filas if f.get('table') == tabla), filas[0])
+    problemas = []
+    if fila.get('type') == 'ALL' or not fila.get('key'):
+        problemas.append('recorre la tabla completa')
+    if 'filesort' in (fila.get('Extra') or ''):
+        problemas.append('ordena aparte')
+    return problemas, [f"type={fila.get('type')} key={fila.get('key')} extra={fila.get('Extra')}"]
+
+app = crear_app()
+fallos = 0
+with app.app_context(), db.engine.connect() as connection:
+    for descripcion, tabla, consulta in consultas():
+        sql = str(getattr(consulta, 'statement', consulta).compile(db.engine, compile_kwargs={'literal_binds': True}))
+        problemas, plan = problemas_plan(connection, sql, tabla)
+        if problemas:
+            fallos += 1
+            print(f"[FAIL] {descripcion}: {', '.join(problemas)}")
+        else:
+            print(f"[OK] {descripcion}")
+        print(f"    Plan: {' | '.join(plan)}")
+
+if fallos:
+    print(f"\n[FAIL] {fallos} consulta(s) sin índice adecuado")
+    sys.exit(1)
+print("\n[OK] Todos los planes usan índices")
@@ -5,6 +5,7 @@ import { proyectoService } from '../services/api';
 function DashboardMetricas({ proyecto }) {
   const [metrica, setMetrica] = useState(null);
   const [historico, setHistorico] = useState([]);
+  const [historicoTotal, setHistoricoTotal] = useState(0);
   const [loading, setLoading] = useState(true);
 
   useEffect(() => {
@@ -12,7 +13,9 @@ function DashboardMetricas({ proyecto }) {
       try {
         const response = await proyectoService.getById(proyecto.id);
         setMetrica(response.data.metrica_base);
+        // El detalle trae solo los cálculos más recientes
         setHistorico(response.data.historico || []);
+        setHistoricoTotal(response.data.historico_total || 0);
       } catch (err) {
         console.error('Error cargando datos:', err);
       } finally {
@@ -82,7 +85,8 @@ function DashboardMetricas({ proyecto }) {
             <div style={{ marginTop: '30px' }}>
               <h3 style={{ display: 'flex', alignItems: 'center', gap: '8px' }}>
                 <TrendingUp size={20} color="#667eea" />
-                Histórico de Cálculos
+                Cálculos Recientes
+                {historicoTotal > historico.length && ` (${historico.length} de ${historicoTotal})`}
               </h3>
               <div className="table-responsive">
                 <table>
@@ -23,6 +23,9 @@ const FORMULAS_NOMBRES = {
 function DetalleProyecto({ proyecto, onVolver, onAnalizar, onEliminar, loading }) {
   const [metrica, setMetrica] = useState(null);
   const [historico, setHistorico] = useState([]);
+  const [historicoSiguiente, setHistoricoSiguiente] = useState(null);
+  const [historicoTotal, setHistoricoTotal] = useState(0);
+  const [cargandoMas, setCargandoMas] = useState(false);
   const [loadingData, setLoadingData] = useState(true);
   const [modal, setModal] = useState({ isOpen: false, type: 'info', title: '', message: '', onConfirm: null });
   const [activeTab, setActiveTab] = useState('dashboard'); // 'dashboard', 'formulas', 'registro'
@@ -63,10 +66,12 @@ function DetalleProyecto({ proyecto, onVolver, onAnalizar, onEliminar, loading }
         setMetrica(metricas_fallback);
       }
       
-      // Cargar histórico
+      // Cargar histórico: solo los cálculos recientes; el resto se pide con "Cargar más"
       const historicoArray = Array.isArray(data.historico) ? data.historico : [];
-      console.log(`Histórico: ${historicoArray.length} registros`);
+      console.log(`Histórico: ${historicoArray.length} de ${data.historico_total} registros`);
       setHistorico(historicoArray);
+      setHistoricoSiguiente(data.historico_siguiente || null);
+      setHistoricoTotal(data.historico_total ?? historicoArray.length);
     } catch (err) {
       console.error('Error cargando datos:', err);
       // Si falla, usar datos del proyecto pasado como fallback
@@ -84,11 +89,26 @@ function DetalleProyecto({ proyecto, onVolver, onAnalizar, onEliminar, loading }
         setMetrica(metricas_fallback);
       }
       setHistorico([]);
+      setHistoricoSiguiente(null);
+      setHistoricoTotal(0);
     } finally {
       setLoadingData(false);
     }
   };
 
+  const cargarMasHistorico = async () => {
+    try {
+      setCargandoMas(true);
+      const { data, siguiente } = await proyectoService.getHistoricoPagina(proyecto.id, historicoSiguiente);
+      setHistorico(prev => [...prev, ...data]);
+      setHistoricoSiguiente(siguiente);
+    } catch (err) {
+      console.error('Error cargando más histórico:', err);
+    } finally {
+      setCargandoMas(false);
+    }
+  };
+
   const handleAnalizar = async () => {
     await onAnalizar(proyecto.id);
     await loadData();
@@ -270,7 +290,7 @@ function DetalleProyecto({ proyecto, onVolver, onAnalizar, onEliminar, loading }
                 onClick={() => setActiveTab('registro')}
               >
                 <Code2 size={18} />
-                Registro de Cálculos ({historico.length})
+                Registro de Cálculos ({historicoTotal})
               </button>
             </div>
 
@@ -402,6 +422,13 @@ function DetalleProyecto({ proyecto, onVolver, onAnalizar, onEliminar, loading }
                         </tbody>
                       </table>
                     </div>
+                    {historicoSiguiente && (
+                      <div style={{ textAlign: 'center', marginTop: '15px' }}>
+                        <button className="btn btn-secondary" onClick={cargarMasHistorico} disabled={cargandoMas}>
+                          {cargandoMas ? 'Cargando...' : `Cargar más (${historico.length} de ${historicoTotal})`}
+                        </button>
+                      </div>
+                    )}
                   </div>
                 ) : (
                   <div style={{ padding: '40px', textAlign: 'center', color: '#718096' }}>
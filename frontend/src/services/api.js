@@ -7,13 +7,49 @@ const API = axios.create({
   }
 });
 
+// El análisis corre en segundo plano: POST /analizar devuelve 202 con un trabajo
+// y se consulta /jobs/<id> hasta que termina
+const esperarTrabajo = async (id, intervaloMs = 2000) => {
+  for (;;) {
+    const { data: trabajo } = await API.get(`/jobs/${id}`);
+    if (trabajo.estado === 'completado') return { data: trabajo.resultado };
+    if (trabajo.estado === 'error') {
+      const err = new Error(trabajo.error);
+      err.response = { data: { error: `Error en análisis: ${trabajo.error}` } };
+      throw err;
+    }
+    await new Promise(resolve => setTimeout(resolve, intervaloMs));
+  }
+};
+
+// Los listados vienen por páginas: el cursor de la siguiente llega en X-Siguiente-Cursor
+const todasLasPaginas = async (url) => {
+  const filas = [];
+  let cursor;
+  do {
+    const respuesta = await API.get(url, { params: { limit: 500, cursor } });
+    filas.push(...respuesta.data);
+    cursor = respuesta.headers['x-siguiente-cursor'];
+  } while (cursor);
+  return { data: filas };
+};
+
 export const proyectoService = {
-  getAll: () => API.get('/proyectos'),
+  getAll: () => todasLasPaginas('/proyectos'),
+  // El detalle trae solo los cálculos más recientes (historico_siguiente apunta al resto)
   getById: (id) => API.get(`/proyectos/${id}`),
   create: (data) => API.post('/proyectos', data),
-  analizar: (id) => API.post(`/proyectos/${id}/analizar`),
+  analizar: async (id) => {
+    const { data: trabajo } = await API.post(`/proyectos/${id}/analizar`);
+    return esperarTrabajo(trabajo.id);
+  },
   delete: (id) => API.delete(`/proyectos/${id}`),
-  getHistorico: (id) => API.get(`/proyectos/${id}/historico`)
+  getHistorico: (id) => todasLasPaginas(`/proyectos/${id}/historico`),
+  // Una página de cálculos más antiguos, desde el cursor del detalle o de la página anterior
+  getHistoricoPagina: async (id, cursor, limit = 50) => {
+    const respuesta = await API.get(`/proyectos/${id}/historico`, { params: { limit, cursor } });
+    return { data: respuesta.data, siguiente: respuesta.headers['x-siguiente-cursor'] || null };
+  }
 };
 
 export const formulaService = {